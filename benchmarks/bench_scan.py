@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark for AWS WasteFinder
+Fills moto with realistic fleets and measures each scanner and a full run()
+(credentials check, region discovery, scan, report assembly and report files):
+wall time, peak memory and number of AWS API calls.
+
+Usage:
+    python benchmarks/bench_scan.py --scale 0.01                   # quick smoke run
+    python benchmarks/bench_scan.py --output baseline.json         # full-size baseline
+    python benchmarks/bench_scan.py --compare baseline.json        # fail on API-call regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# moto needs credentials to be present, they are never sent anywhere
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import boto3
+from moto import mock_aws
+
+from wasteFinder import SCANNERS, ApiStats, AWSWasteFinder
+
+# Full-size fleet, spread evenly over the benchmark regions
+FLEET = {
+    'volumes': 10000,
+    'snapshots': 100000,
+    'load_balancers': 2000,
+    'log_groups': 5000,
+    'db_instances': 300,
+}
+
+DEFAULT_REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1']
+
+
+def populate(region, sizes):
+    """Create the benchmark fleet for one region"""
+    ec2 = boto3.client('ec2', region_name=region)
+    volume_ids = []
+    for i in range(sizes['volumes']):
+        volume = ec2.create_volume(AvailabilityZone=f'{region}a', Size=10 + i % 500, VolumeType='gp3')
+        volume_ids.append(volume['VolumeId'])
+    for i in range(sizes['snapshots']):
+        ec2.create_snapshot(VolumeId=volume_ids[i % len(volume_ids)])
+
+    vpc_id = ec2.create_vpc(CidrBlock='10.0.0.0/16')['Vpc']['VpcId']
+    subnets = [
+        ec2.create_subnet(VpcId=vpc_id, CidrBlock=f'10.0.{i}.0/24', AvailabilityZone=f'{region}{az}')
+        ['Subnet']['SubnetId']
+        for i, az in enumerate('ab')
+    ]
+    elbv2 = boto3.client('elbv2', region_name=region)
+    for i in range(sizes['load_balancers']):
+        lb = elbv2.create_load_balancer(Name=f'bench-lb-{i}', Subnets=subnets)['LoadBalancers'][0]
+        tg = elbv2.create_target_group(Name=f'bench-tg-{i}', Protocol='HTTP', Port=80, VpcId=vpc_id)
+        elbv2.create_listener(
+            LoadBalancerArn=lb['LoadBalancerArn'], Protocol='HTTP', Port=80,
+            DefaultActions=[{'Type': 'forward', 'TargetGroupArn': tg['TargetGroups'][0]['TargetGroupArn']}]
+        )
+
+    logs = boto3.client('logs', region_name=region)
+    for i in range(sizes['log_groups']):
+        logs.create_log_group(logGroupName=f'/bench/{i}')
+
+    rds = boto3.client('rds', region_name=region)
+    for i in range(sizes['db_instances']):
+        rds.create_db_instance(
+            DBInstanceIdentifier=f'bench-db-{i}', DBInstanceClass='db.t3.micro', Engine='mysql',
+            MasterUsername='admin', MasterUserPassword='password123', AllocatedStorage=20,
+        )
+
+
+def measure(fn):
+    """Run fn() and return (result, seconds, peak MiB, API calls by operation)"""
+    stats = ApiStats()
+    scanner = AWSWasteFinder(stats=stats)
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(scanner)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        'seconds': round(elapsed, 3),
+        'peak_mib': round(peak / (1024 ** 2), 2),
+        'api_calls': stats.total_calls,
+        'api_calls_by_operation': {
+            f"{row['service']}:{row['operation']}": row['calls'] for row in stats.group('service', 'operation')
+        },
+    }
+
+
+def run_benchmark(regions, scale):
+    sizes = {name: max(1, int(count * scale / len(regions))) for name, count in FLEET.items()}
+    results = {'scale': scale, 'regions': regions, 'fleet_per_region': sizes, 'scanners': {}}
+
+    with mock_aws():
+        print(f"Populating {len(regions)} regions with {sizes} each...")
+        start = time.perf_counter()
+        for region in regions:
+            populate(region, sizes)
+        print(f"  done in {time.perf_counter() - start:.1f}s\n")
+
+        for name, spec in SCANNERS.items():
+            def scan_one(scanner, method=spec.method):
+                return sum(len(list(getattr(scanner, method)(region))) for region in regions)
+            findings, stats = measure(scan_one)
+            stats['findings'] = findings
+            results['scanners'][name] = stats
+            print(f"  {name:<24} {stats['seconds']:>8.2f}s {stats['peak_mib']:>8.1f} MiB "
+                  f"{stats['api_calls']:>7} calls {findings:>7} findings")
+
+        def run_all(scanner):
+            # Region discovery answers with the benchmark regions; the report files go to a scratch directory
+            scanner.get_all_regions = lambda: list(regions)
+            cwd = os.getcwd()
+            with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+                os.chdir(scratch)
+                try:
+                    scanner.run()
+                finally:
+                    os.chdir(cwd)
+            return scanner.finding_count
+        findings, stats = measure(run_all)
+        stats['findings'] = findings
+        results['run'] = stats
+        print(f"  {'full scan':<24} {stats['seconds']:>8.2f}s {stats['peak_mib']:>8.1f} MiB "
+              f"{stats['api_calls']:>7} calls {findings:>7} findings")
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """Print deltas against a baseline; return False if API calls regressed beyond tolerance"""
+    ok = True
+    rows = [(name, current['scanners'][name], baseline['scanners'].get(name)) for name in current['scanners']]
+    rows.append(('full scan', current['run'], baseline.get('run')))
+    print(f"\nComparison against baseline (tolerance {tolerance:.0%} on API calls):")
+    for name, now, before in rows:
+        if not before:
+            print(f"  {name:<24} (not in baseline)")
+            continue
+        calls_delta = now['api_calls'] - before['api_calls']
+        time_delta = now['seconds'] - before['seconds']
+        regressed = now['api_calls'] > before['api_calls'] * (1 + tolerance)
+        ok = ok and not regressed
+        print(f"  {name:<24} calls {before['api_calls']:>7} -> {now['api_calls']:<7} ({calls_delta:+})"
+              f"  time {time_delta:+.2f}s{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark WasteFinder scanners against a moto-backed fleet.')
+    parser.add_argument('--scale', type=float, default=1.0, help='fraction of the full fleet to create (default: 1.0)')
+    parser.add_argument('--regions', default=','.join(DEFAULT_REGIONS), help='comma-separated regions')
+    parser.add_argument('--output', metavar='PATH', help='write results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a previous JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed API-call growth (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    # Scanners log moto's unimplemented corners as warnings; keep the table readable
+    logging.disable(logging.WARNING)
+    results = run_benchmark([r.strip() for r in args.regions.split(',') if r.strip()], args.scale)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(results, json.load(f), args.tolerance):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
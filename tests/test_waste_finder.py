@@ -3,6 +3,8 @@ Unit tests for AWS WasteFinder
 Uses moto library to mock AWS services - no real AWS credentials needed
 """
 
+import io
+import json
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
@@ -15,7 +17,24 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from moto import mock_aws
 import boto3
 
-from wasteFinder import AWSWasteFinder
+from wasteFinder import (
+    AWSWasteFinder, ClientPool, RegionInventory, INVENTORY_LOADERS, MetricBatch,
+    ScanTask, TaskScheduler, main, FindingsPipeline, JsonlSink, InventoryCache,
+    read_account_ids, list_organization_accounts, assume_role_session_factory, TokenBucket, RateLimiter, AdaptiveConcurrency,
+    ApiStats, Finding, VolumeFinding, AddressFinding, PriceList,
+    Report, REPORT_FORMATS, write_report, write_metrics, ConfigInventoryBackend, SCANNERS, select_scanners, ScanTimeout,
+    ScanJournal, BaselineDiff, ScanSnapshot, WasteFinderService, render_metrics,
+)
+
+
+def metric_data(values_by_metric):
+    """Build a get_metric_data side effect returning fixed values per MetricName"""
+    def side_effect(**kwargs):
+        return {'MetricDataResults': [
+            {'Id': q['Id'], 'Values': values_by_metric.get(q['MetricStat']['Metric']['MetricName'], [])}
+            for q in kwargs['MetricDataQueries']
+        ]}
+    return side_effect
 
 
 class TestAWSWasteFinder:
@@ -203,7 +222,7 @@ class TestEdgeCases:
         scanner = AWSWasteFinder()
         
         # Scanning an invalid region should handle the error gracefully
-        with patch('boto3.client') as mock_client:
+        with patch.object(scanner.clients, 'get') as mock_client:
             mock_client.side_effect = Exception("API Error")
             # Should not raise, just log the error
             try:
@@ -295,12 +314,10 @@ class TestIntegration:
         scanner = AWSWasteFinder()
         
         # Mock both RDS paginator and CloudWatch
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             # Create a mock CloudWatch client that returns 0 connections
             mock_cw = MagicMock()
-            mock_cw.get_metric_statistics.return_value = {
-                'Datapoints': [{'Maximum': 0}]
-            }
+            mock_cw.get_metric_data.side_effect = metric_data({'DatabaseConnections': [0]})
             
             # Create a mock RDS client with paginator
             mock_rds = MagicMock()
@@ -338,11 +355,9 @@ class TestIntegration:
         scanner = AWSWasteFinder()
         
         # Mock CloudWatch to return active connections
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             mock_cw = MagicMock()
-            mock_cw.get_metric_statistics.return_value = {
-                'Datapoints': [{'Maximum': 5}]  # Has connections
-            }
+            mock_cw.get_metric_data.side_effect = metric_data({'DatabaseConnections': [5]})  # Has connections
             
             mock_rds = MagicMock()
             mock_paginator = MagicMock()
@@ -376,12 +391,10 @@ class TestIntegration:
         """Test that Read Replicas are not flagged even with 0 connections"""
         scanner = AWSWasteFinder()
         
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             # Mock CloudWatch return 0 connections
             mock_cw = MagicMock()
-            mock_cw.get_metric_statistics.return_value = {
-                'Datapoints': [{'Maximum': 0}]
-            }
+            mock_cw.get_metric_data.side_effect = metric_data({'DatabaseConnections': [0]})
             
             # Mock RDS with a read replica
             mock_rds = MagicMock()
@@ -426,19 +439,14 @@ class TestIntegration:
         nat = ec2.create_nat_gateway(SubnetId=subnet['Subnet']['SubnetId'], AllocationId=eip['AllocationId'])
         nat_id = nat['NatGateway']['NatGatewayId']
         
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             mock_cw = MagicMock()
             
-            # Mock get_metric_statistics to handle multiple calls
-            def side_effect(*args, **kwargs):
-                metric_name = kwargs.get('MetricName')
-                if metric_name == 'BytesOutToDestination':
-                    return {'Datapoints': [{'Sum': 0}]}  # 0 Outbound
-                elif metric_name == 'BytesInFromDestination':
-                    return {'Datapoints': [{'Sum': 500}]} # 500 Inbound
-                return {}
-            
-            mock_cw.get_metric_statistics.side_effect = side_effect
+            # 0 Outbound, 500 Inbound
+            mock_cw.get_metric_data.side_effect = metric_data({
+                'BytesOutToDestination': [0],
+                'BytesInFromDestination': [500],
+            })
             
             # Create mock EC2 to return our NAT GW
             mock_ec2 = MagicMock()
@@ -447,13 +455,13 @@ class TestIntegration:
             # We need to mock ONLY CloudWatch but keep real EC2/Moto functionality? 
             # Or just mock everything. Mocking everything is safer for consistent behavior here.
             mock_ec2_client = MagicMock()
-            mock_ec2_client.describe_nat_gateways.return_value = {
+            mock_ec2_client.get_paginator.return_value.paginate.return_value = [{
                 'NatGateways': [{
                     'NatGatewayId': nat_id,
                     'SubnetId': 'subnet-123',
                     'State': 'available'
                 }]
-            }
+            }]
 
             def get_client(service, region_name=None):
                 if service == 'cloudwatch':
@@ -475,25 +483,24 @@ class TestIntegration:
         scanner = AWSWasteFinder()
         
         # Mock CloudWatch to return 0 for BOTH metrics
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             mock_cw = MagicMock()
             
-            # Helper to return 0 for both metrics
-            def get_metric_side_effect(*args, **kwargs):
-                metric_name = kwargs.get('MetricName')
-                return {'Datapoints': [{'Sum': 0}]}
-
-            mock_cw.get_metric_statistics.side_effect = get_metric_side_effect
+            # Return 0 for both metrics
+            mock_cw.get_metric_data.side_effect = metric_data({
+                'BytesOutToDestination': [0],
+                'BytesInFromDestination': [0],
+            })
             
             # Mock EC2 client to return a NAT Gateway
             mock_ec2_client = MagicMock()
-            mock_ec2_client.describe_nat_gateways.return_value = {
+            mock_ec2_client.get_paginator.return_value.paginate.return_value = [{
                 'NatGateways': [{
                     'NatGatewayId': 'nat-test-idle',
                     'SubnetId': 'subnet-123',
                     'State': 'available'
                 }]
-            }
+            }]
 
             def get_client(service, region_name=None):
                 if service == 'cloudwatch':
@@ -516,25 +523,24 @@ class TestIntegration:
         scanner = AWSWasteFinder()
         
         # Mock CloudWatch to return 0 for BOTH metrics
-        with patch('boto3.client') as mock_boto:
+        with patch.object(scanner.clients, 'get') as mock_boto:
             mock_cw = MagicMock()
             
-            # Helper to return 0 for both metrics
-            def get_metric_side_effect(*args, **kwargs):
-                metric_name = kwargs.get('MetricName')
-                return {'Datapoints': [{'Sum': 0}]}
-
-            mock_cw.get_metric_statistics.side_effect = get_metric_side_effect
+            # Return 0 for both metrics
+            mock_cw.get_metric_data.side_effect = metric_data({
+                'BytesOutToDestination': [0],
+                'BytesInFromDestination': [0],
+            })
             
             # Mock EC2 client to return a NAT Gateway
             mock_ec2_client = MagicMock()
-            mock_ec2_client.describe_nat_gateways.return_value = {
+            mock_ec2_client.get_paginator.return_value.paginate.return_value = [{
                 'NatGateways': [{
                     'NatGatewayId': 'nat-test-idle',
                     'SubnetId': 'subnet-123',
                     'State': 'available'
                 }]
-            }
+            }]
 
             def get_client(service, region_name=None):
                 if service == 'cloudwatch':
@@ -549,4 +555,1631 @@ class TestIntegration:
             
             # Should find 1 waste item because it is truly idle
             assert len(findings) == 1
-            assert findings[0]['id'] == 'nat-test-idle'
\ No newline at end of file
+            assert findings[0]['id'] == 'nat-test-idle'
+
+
+class TestClientPool:
+    """Tests for the shared boto3 client pool"""
+
+    @mock_aws
+    def test_reuses_client_per_service_and_region(self):
+        """Test that a client is built once per (service, region)"""
+        pool = ClientPool()
+
+        assert pool.get('ec2', 'us-east-1') is pool.get('ec2', 'us-east-1')
+        assert pool.get('ec2', 'us-east-1') is not pool.get('ec2', 'us-west-2')
+        assert pool.get('ec2', 'us-east-1') is not pool.get('rds', 'us-east-1')
+
+    @mock_aws
+    def test_add_hook_applies_to_new_clients(self):
+        """Test that hooks added later run for clients created afterwards"""
+        pool = ClientPool()
+        seen = []
+        pool.add_hook(lambda client, service, region: seen.append((service, region)))
+
+        pool.get('ec2', 'us-east-1')
+        pool.get('ec2', 'us-east-1')
+
+        assert seen == [('ec2', 'us-east-1')]
+
+    def test_one_session_per_thread(self):
+        """Test that each worker thread gets its own boto3 Session"""
+        import threading
+
+        pool = ClientPool(session_factory=MagicMock)
+        sessions = []
+
+        def worker():
+            sessions.append(pool.session())
+            sessions.append(pool.session())
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sessions[0] is sessions[1]
+        assert sessions[2] is sessions[3]
+        assert sessions[0] is not sessions[2]
+
+    def test_connection_pool_matches_worker_count(self):
+        """Test that the shared client config sizes the connection pool to the workers"""
+        scanner = AWSWasteFinder(max_workers=12)
+        assert scanner.clients.config.max_pool_connections == 12
+
+
+class TestRegionInventory:
+    """Tests for the per-region shared inventory"""
+
+    @mock_aws
+    def test_loaders_keep_only_projected_fields(self):
+        """Test that inventories hold only the fields scanners read"""
+        boto3.client('ec2', region_name='us-east-1').create_volume(
+            AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2'
+        )
+        inventory = RegionInventory(ClientPool(), 'us-east-1')
+
+        volume, = inventory.get('volumes')
+        assert set(volume) == {'VolumeId', 'State', 'Size', 'VolumeType', 'CreateTime'}
+        assert inventory.get('addresses') == []
+
+    def test_filters_and_page_sizes_sent_to_server(self):
+        """Test that listings push status filters and page sizes to the API"""
+        sagemaker = MagicMock()
+        sagemaker.get_paginator.return_value.paginate.return_value = [{'NotebookInstances': [
+            {'NotebookInstanceName': 'nb', 'NotebookInstanceStatus': 'InService', 'Url': 'https://example'},
+        ]}]
+        inventory = RegionInventory(MagicMock(get=MagicMock(return_value=sagemaker)), 'us-east-1')
+
+        assert inventory.get('notebook_instances') == [
+            {'NotebookInstanceName': 'nb', 'NotebookInstanceStatus': 'InService'}
+        ]
+        sagemaker.get_paginator.assert_called_with('list_notebook_instances')
+        sagemaker.get_paginator.return_value.paginate.assert_called_with(
+            StatusEquals='InService', PaginationConfig={'PageSize': 100}
+        )
+
+    def test_inventory_fetched_once(self):
+        """Test that an inventory is loaded lazily and only once"""
+        loader = MagicMock(return_value=[{'VolumeId': 'vol-1'}])
+        with patch.dict(INVENTORY_LOADERS, {'volumes': loader}):
+            inventory = RegionInventory(MagicMock(), 'us-east-1')
+            assert loader.call_count == 0
+
+            assert inventory.get('volumes') == [{'VolumeId': 'vol-1'}]
+            inventory.get('volumes')
+
+        assert loader.call_count == 1
+
+    def test_release_frees_unneeded_inventories(self):
+        """Test that an inventory is dropped once its last dependent scanner is done"""
+        loader = MagicMock(return_value=[])
+        dependencies = {'a': ('volumes',), 'b': ('volumes',)}
+        with patch.dict(INVENTORY_LOADERS, {'volumes': loader}):
+            inventory = RegionInventory(MagicMock(), 'us-east-1', ['a', 'b'], dependencies)
+            inventory.get('volumes')
+
+            inventory.release('a')
+            inventory.get('volumes')
+            assert loader.call_count == 1
+
+            inventory.release('b')
+            inventory.get('volumes')
+            assert loader.call_count == 2
+
+    @mock_aws
+    def test_scan_region_describes_volumes_once(self):
+        """Test that the EBS and snapshot scanners share one describe_volumes pass"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')
+
+        scanner = AWSWasteFinder()
+        calls = []
+        scanner.clients.get('ec2', 'us-east-1').meta.events.register(
+            'before-call.ec2.DescribeVolumes', lambda **kwargs: calls.append(1)
+        )
+
+        findings = scanner.scan_region('us-east-1')
+
+        assert len([f for f in findings if f['type'] == 'EBS Volume']) == 1
+        assert len(calls) == 1
+
+
+class TestMetricBatch:
+    """Tests for batched CloudWatch GetMetricData lookups"""
+
+    def _batch(self, cloudwatch, count):
+        now = datetime.now()
+        batch = MetricBatch(cloudwatch, now - timedelta(days=7), now)
+        for i in range(count):
+            batch.add(f"db-{i}", 'AWS/RDS', 'DatabaseConnections',
+                      [{'Name': 'DBInstanceIdentifier', 'Value': f"db-{i}"}], 'Maximum')
+        return batch
+
+    def test_chunks_queries_at_api_limit(self):
+        """Test that queries are sent in chunks of at most 500"""
+        cloudwatch = MagicMock()
+        cloudwatch.get_metric_data.side_effect = metric_data({'DatabaseConnections': [1]})
+
+        results = self._batch(cloudwatch, 1200).execute()
+
+        sizes = [len(c.kwargs['MetricDataQueries']) for c in cloudwatch.get_metric_data.call_args_list]
+        assert sizes == [500, 500, 200]
+        assert len(results) == 1200
+        assert results['db-1199'] == [1]
+
+    def test_follows_next_token(self):
+        """Test that paged results are merged back onto the right resource"""
+        cloudwatch = MagicMock()
+        cloudwatch.get_metric_data.side_effect = [
+            {'MetricDataResults': [{'Id': 'q0', 'Values': [0]}], 'NextToken': 'page-2'},
+            {'MetricDataResults': [{'Id': 'q0', 'Values': [3]}, {'Id': 'q1', 'Values': [0]}]},
+        ]
+
+        results = self._batch(cloudwatch, 2).execute()
+
+        assert cloudwatch.get_metric_data.call_args_list[1].kwargs['NextToken'] == 'page-2'
+        assert results == {'db-0': [0, 3], 'db-1': [0]}
+
+    def test_no_queries_makes_no_calls(self):
+        """Test that an empty batch does not call CloudWatch"""
+        cloudwatch = MagicMock()
+        assert self._batch(cloudwatch, 0).execute() == {}
+        cloudwatch.get_metric_data.assert_not_called()
+
+
+class TestTaskScheduler:
+    """Tests for the (region, scanner) task scheduler"""
+
+    def test_yields_failures(self):
+        """Test that a failing task is reported without stopping the others"""
+        def fn(task):
+            if task.scanner == 'bad':
+                raise RuntimeError('boom')
+            return task.scanner
+
+        tasks = [ScanTask('us-east-1', name) for name in ('good', 'bad', 'also-good')]
+        outcomes = {task.scanner: future.exception() for task, future in TaskScheduler(2).run(tasks, fn)}
+
+        assert outcomes['good'] is None and outcomes['also-good'] is None
+        assert isinstance(outcomes['bad'], RuntimeError)
+
+    @mock_aws
+    def test_run_collects_findings_from_all_tasks(self, tmp_path, monkeypatch):
+        """Test that run() schedules every (region, scanner) pair and totals the findings"""
+        monkeypatch.chdir(tmp_path)
+        for region in ('us-east-1', 'us-west-2'):
+            ec2 = boto3.client('ec2', region_name=region)
+            ec2.create_volume(AvailabilityZone=f'{region}a', Size=100, VolumeType='gp2')
+        boto3.client('ec2', region_name='us-east-1').allocate_address(Domain='vpc')
+
+        scanner = AWSWasteFinder(max_workers=4)
+        with patch.object(scanner, 'get_all_regions', return_value=['us-east-1', 'us-west-2']):
+            scanner.run()
+
+        types = sorted(f['type'] for f in scanner.findings)
+        assert types == ['EBS Volume', 'EBS Volume', 'Elastic IP']
+        assert scanner.total_waste == 23.6
+
+    def test_cli_rejects_invalid_worker_count(self):
+        """Test that --workers must be a positive integer"""
+        with pytest.raises(SystemExit):
+            main(['--workers', '0'])
+
+
+class TestLoadBalancerScan:
+    """Tests for the bulk ELBv2 target-health path"""
+
+    def _vpc(self, ec2):
+        vpc_id = ec2.create_vpc(CidrBlock='10.0.0.0/16')['Vpc']['VpcId']
+        subnets = [
+            ec2.create_subnet(VpcId=vpc_id, CidrBlock=f'10.0.{i}.0/24', AvailabilityZone=f'us-east-1{az}')
+            ['Subnet']['SubnetId']
+            for i, az in enumerate('ab')
+        ]
+        return vpc_id, subnets
+
+    @mock_aws
+    def test_flags_only_load_balancers_without_healthy_targets(self):
+        """Test idle LBs are flagged and LBs with a healthy target are not"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        elbv2 = boto3.client('elbv2', region_name='us-east-1')
+        vpc_id, subnets = self._vpc(ec2)
+
+        idle = elbv2.create_load_balancer(Name='idle-lb', Subnets=subnets)['LoadBalancers'][0]
+        busy = elbv2.create_load_balancer(Name='busy-lb', Subnets=subnets)['LoadBalancers'][0]
+        tg = elbv2.create_target_group(Name='busy-tg', Protocol='HTTP', Port=80, VpcId=vpc_id)['TargetGroups'][0]
+        elbv2.create_listener(
+            LoadBalancerArn=busy['LoadBalancerArn'], Protocol='HTTP', Port=80,
+            DefaultActions=[{'Type': 'forward', 'TargetGroupArn': tg['TargetGroupArn']}]
+        )
+        instance_id = ec2.run_instances(ImageId='ami-12345678', MinCount=1, MaxCount=1)['Instances'][0]['InstanceId']
+        elbv2.register_targets(TargetGroupArn=tg['TargetGroupArn'], Targets=[{'Id': instance_id}])
+
+        scanner = AWSWasteFinder()
+        findings = scanner.scan_load_balancers('us-east-1')
+
+        assert [f['id'] for f in findings] == [idle['LoadBalancerName']]
+
+    @mock_aws
+    def test_lists_target_groups_once_per_region(self):
+        """Test that target groups are listed once rather than once per LB"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        elbv2 = boto3.client('elbv2', region_name='us-east-1')
+        _, subnets = self._vpc(ec2)
+        for i in range(3):
+            elbv2.create_load_balancer(Name=f'lb-{i}', Subnets=subnets)
+
+        scanner = AWSWasteFinder()
+        calls = []
+        scanner.clients.get('elbv2', 'us-east-1').meta.events.register(
+            'before-call.elastic-load-balancing-v2.DescribeTargetGroups', lambda **kwargs: calls.append(1)
+        )
+        findings = scanner.scan_load_balancers('us-east-1')
+
+        assert len(findings) == 3
+        assert len(calls) == 1
+
+
+class TestRateLimiting:
+    """Tests for token-bucket rate limiting and AIMD concurrency"""
+
+    def test_token_bucket_limits_rate_after_burst(self):
+        """Test that calls beyond the burst wait for tokens to refill"""
+        import time
+
+        bucket = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        # Two tokens are free, the next two need ~0.05s each
+        assert elapsed >= 0.08
+
+    def test_aimd_halves_on_throttle_and_grows_on_success(self):
+        """Test multiplicative decrease and bounded additive increase"""
+        concurrency = AdaptiveConcurrency({'ec2': 4}, ceiling_factor=2, increase_every=2)
+
+        concurrency.on_throttle('ec2', 'us-east-1')
+        assert concurrency.limit('ec2', 'us-east-1') == 2
+        assert concurrency.limit('ec2', 'us-west-2') == 4
+
+        for _ in range(20):
+            concurrency.on_success('ec2', 'us-east-1')
+        assert concurrency.limit('ec2', 'us-east-1') == 8
+
+        for _ in range(5):
+            concurrency.on_throttle('ec2', 'us-east-1')
+        assert concurrency.limit('ec2', 'us-east-1') == 1
+
+    def test_throttle_errors_reduce_concurrency(self):
+        """Test that a throttled attempt seen by the retry hook lowers the limit"""
+        concurrency = AdaptiveConcurrency({'ec2': 4})
+        concurrency._needs_retry('ec2', 'us-east-1', response=(None, {'Error': {'Code': 'RequestLimitExceeded'}}))
+        concurrency._needs_retry('ec2', 'us-east-1', response=(None, {'Error': {'Code': 'InvalidParameter'}}))
+
+        assert concurrency.limit('ec2', 'us-east-1') == 2
+
+    def test_limits_calls_in_flight(self):
+        """Test that no more than the limit of calls to a service run at once in one region"""
+        import threading
+        import time
+
+        concurrency = AdaptiveConcurrency({'elbv2': 2})
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def call(region):
+            concurrency.acquire('elbv2', region)
+            try:
+                with lock:
+                    state['active'] += 1
+                    state['peak'] = max(state['peak'], state['active'])
+                time.sleep(0.02)
+                with lock:
+                    state['active'] -= 1
+            finally:
+                concurrency.release()
+
+        threads = [threading.Thread(target=call, args=('us-east-1',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert state['peak'] == 2
+        assert concurrency._in_flight == {('elbv2', 'us-east-1'): 0}
+
+    @mock_aws
+    def test_pooled_clients_release_slots(self):
+        """Test that every attempt gives its slot back, failed calls included"""
+        scanner = AWSWasteFinder()
+        ec2 = scanner.clients.get('ec2', 'us-east-1')
+        ec2.describe_volumes()
+        with pytest.raises(Exception):
+            ec2.delete_volume(VolumeId='vol-missing')
+
+        assert scanner.concurrency._in_flight == {('ec2', 'us-east-1'): 0}
+
+    @mock_aws
+    def test_pooled_clients_use_rate_limiter(self):
+        """Test that pooled clients take a token per request and use adaptive retries"""
+        scanner = AWSWasteFinder()
+        ec2 = scanner.clients.get('ec2', 'us-east-1')
+        bucket = scanner.rate_limiter.bucket('ec2', 'us-east-1')
+
+        ec2.describe_volumes()
+
+        assert bucket._tokens < bucket.burst
+        assert ec2.meta.config.retries['mode'] == 'adaptive'
+
+
+class TestAsyncEngine:
+    """Tests for the asyncio scan engine"""
+
+    @pytest.fixture
+    def moto_server(self, monkeypatch):
+        """A moto server that boto3 and aiobotocore clients both reach through AWS_ENDPOINT_URL"""
+        pytest.importorskip('aiobotocore')
+        pytest.importorskip('flask')
+        pytest.importorskip('flask_cors')
+        from moto.server import ThreadedMotoServer
+
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        monkeypatch.setenv('AWS_ENDPOINT_URL', f'http://{host}:{port}')
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+        monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        yield
+        server.stop()
+
+    def test_asyncio_engine_matches_threaded_engine(self, moto_server):
+        """Test that both engines produce the same findings from the same account"""
+        regions = ['us-east-1', 'eu-west-1']
+        for region in regions:
+            ec2 = boto3.client('ec2', region_name=region)
+            elbv2 = boto3.client('elbv2', region_name=region)
+            ec2.create_volume(AvailabilityZone=f'{region}a', Size=20, VolumeType='gp3')
+            ec2.allocate_address(Domain='vpc')
+            vpc_id, subnets = TestLoadBalancerScan()._vpc(ec2)
+            ec2.create_nat_gateway(SubnetId=subnets[0], AllocationId=ec2.allocate_address(Domain='vpc')['AllocationId'])
+            elbv2.create_load_balancer(Name='idle-lb', Subnets=subnets)
+            busy = elbv2.create_load_balancer(Name='busy-lb', Subnets=subnets)['LoadBalancers'][0]
+            tg = elbv2.create_target_group(Name='busy-tg', Protocol='HTTP', Port=80, VpcId=vpc_id)['TargetGroups'][0]
+            elbv2.create_listener(
+                LoadBalancerArn=busy['LoadBalancerArn'], Protocol='HTTP', Port=80,
+                DefaultActions=[{'Type': 'forward', 'TargetGroupArn': tg['TargetGroupArn']}]
+            )
+            instance_id = ec2.run_instances(ImageId='ami-12345678', MinCount=1, MaxCount=1)['Instances'][0]['InstanceId']
+            elbv2.register_targets(TargetGroupArn=tg['TargetGroupArn'], Targets=[{'Id': instance_id}])
+        boto3.client('rds', region_name='us-east-1').create_db_instance(
+            DBInstanceIdentifier='idle-db', DBInstanceClass='db.t3.micro', Engine='mysql',
+            MasterUsername='admin', MasterUserPassword='password123', AllocatedStorage=20,
+        )
+
+        def scan(engine):
+            pipeline = AWSWasteFinder(max_workers=4, engine=engine).scan_regions(regions, progress=False)
+            return sorted((f['region'], f['type'], f['id'], f['monthly_cost']) for f in pipeline.findings)
+
+        threaded = scan('threads')
+        assert {finding_type for _, finding_type, _, _ in threaded} == {
+            'EBS Volume', 'Elastic IP', 'Load Balancer', 'NAT Gateway', 'RDS Instance'
+        }
+        assert 'busy-lb' not in {finding_id for _, _, finding_id, _ in threaded}
+        assert scan('asyncio') == threaded
+
+    def test_slots_cap_calls_per_service(self):
+        """Test that coroutines wait for a slot under the service's concurrency limit"""
+        import asyncio
+        from wasteFinder import AsyncConcurrency
+
+        slots = AsyncConcurrency(AdaptiveConcurrency({'rds': 3}))
+        state = {'active': 0, 'peak': 0}
+
+        async def call():
+            await slots.acquire('rds', 'us-east-1')
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+            await slots.release()
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(10)))
+
+        asyncio.run(main())
+
+        assert state['peak'] == 3
+        assert slots._in_flight == {('rds', 'us-east-1'): 0}
+
+    def test_cancels_tasks_past_their_deadline(self):
+        """Test that a task still fetching at its deadline is cancelled while the others finish"""
+        import asyncio
+        import time
+        from unittest.mock import AsyncMock
+        from wasteFinder import AsyncScanEngine
+
+        cancelled = []
+
+        async def prepare(task):
+            try:
+                await asyncio.sleep(0 if task.scanner != 'hung' else 30)
+            except asyncio.CancelledError:
+                cancelled.append(task.scanner)
+                raise
+
+        tasks = [ScanTask('us-east-1', name) for name in ('fast', 'hung')]
+        due = time.monotonic() + 0.2
+        engine = AsyncScanEngine(MagicMock(close=AsyncMock()))
+
+        start = time.perf_counter()
+        outcomes = {task.scanner: future for task, future in engine.run(tasks, lambda task: 1, lambda task: due, prepare)}
+
+        assert time.perf_counter() - start < 5
+        assert outcomes['fast'].result() == 1
+        assert isinstance(outcomes['hung'].exception(), ScanTimeout)
+        assert cancelled == ['hung']
+        engine.clients.close.assert_awaited_once()
+
+    def test_rejects_unknown_engine(self):
+        """Test that an unknown engine name is rejected"""
+        with pytest.raises(ValueError):
+            AWSWasteFinder(engine='gevent')
+
+
+class TestStreamingPipeline:
+    """Tests for streaming findings and incremental totals"""
+
+    def test_pipeline_keeps_running_totals_without_findings(self):
+        """Test that totals are maintained when findings are not retained"""
+        pipeline = FindingsPipeline(keep=False)
+        pipeline.emit({'type': 'EBS Volume', 'id': 'vol-1', 'monthly_cost': 10.0})
+        pipeline.emit({'type': 'EBS Volume', 'id': 'vol-2', 'monthly_cost': 5.0})
+        pipeline.emit({'type': 'Elastic IP', 'id': '1.2.3.4', 'monthly_cost': 3.6})
+
+        assert pipeline.findings is None
+        assert pipeline.count == 3
+        assert pipeline.total_cost == pytest.approx(18.6)
+        assert pipeline.by_type == {'EBS Volume': [2, 15.0], 'Elastic IP': [1, 3.6]}
+
+    def test_jsonl_sink_writes_each_finding_immediately(self, tmp_path):
+        """Test that a finding is readable from the JSONL file before the sink closes"""
+        import json
+
+        path = tmp_path / 'findings.jsonl'
+        sink = JsonlSink(str(path))
+        sink.write({'type': 'Elastic IP', 'id': '1.2.3.4', 'monthly_cost': 3.6})
+
+        assert json.loads(path.read_text().splitlines()[0])['id'] == '1.2.3.4'
+        sink.close()
+
+    @mock_aws
+    def test_run_streams_findings_in_summary_mode(self, tmp_path, monkeypatch):
+        """Test a streaming run writes JSONL and reports totals without keeping findings"""
+        import json
+
+        monkeypatch.chdir(tmp_path)
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=100, VolumeType='gp2')
+        ec2.allocate_address(Domain='vpc')
+
+        scanner = AWSWasteFinder()
+        with patch.object(scanner, 'get_all_regions', return_value=['us-east-1']):
+            scanner.run(jsonl_path='findings.jsonl', keep_findings=False)
+
+        lines = [json.loads(line) for line in (tmp_path / 'findings.jsonl').read_text().splitlines()]
+        assert sorted(f['type'] for f in lines) == ['EBS Volume', 'Elastic IP']
+        assert scanner.findings == []
+        assert scanner.finding_count == 2
+        assert scanner.total_waste == pytest.approx(13.6)
+
+
+class TestInventoryCache:
+    """Tests for the persistent inventory cache"""
+
+    def test_round_trips_datetimes(self, tmp_path):
+        """Test that cached inventories come back with datetime fields intact"""
+        from datetime import timezone
+
+        cache = InventoryCache(str(tmp_path / 'cache.sqlite'))
+        created = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        cache.put('123', 'us-east-1', 'volumes', {}, [{'VolumeId': 'vol-1', 'CreateTime': created}])
+
+        items = cache.get('123', 'us-east-1', 'volumes', {})
+        assert items == [{'VolumeId': 'vol-1', 'CreateTime': created}]
+        assert cache.get('456', 'us-east-1', 'volumes', {}) is None
+        assert cache.get('123', 'us-east-1', 'volumes', {'Filters': []}) is None
+
+    def test_expiry_and_refresh(self, tmp_path):
+        """Test that --max-age and --refresh force a miss"""
+        path = str(tmp_path / 'cache.sqlite')
+        InventoryCache(path).put('123', 'us-east-1', 'snapshots', {}, [{'SnapshotId': 'snap-1'}])
+
+        assert InventoryCache(path).get('123', 'us-east-1', 'snapshots', {}) == [{'SnapshotId': 'snap-1'}]
+        assert InventoryCache(path, max_age=-1).get('123', 'us-east-1', 'snapshots', {}) is None
+        assert InventoryCache(path, refresh=True).get('123', 'us-east-1', 'snapshots', {}) is None
+
+    def test_region_inventory_reuses_cache_across_runs(self, tmp_path):
+        """Test that a second scan within the TTL does not call AWS"""
+        cache = InventoryCache(str(tmp_path / 'cache.sqlite'))
+        loader = MagicMock(return_value=[{'LogGroupName': '/app'}])
+        with patch.dict(INVENTORY_LOADERS, {'log_groups': loader}):
+            first = RegionInventory(MagicMock(), 'us-east-1', cache=cache, account='123')
+            second = RegionInventory(MagicMock(), 'us-east-1', cache=cache, account='123')
+
+            assert first.get('log_groups') == second.get('log_groups')
+
+        assert loader.call_count == 1
+
+    def test_database_errors_fall_back_to_aws(self, tmp_path):
+        """Test that a failing cache is a miss, not a lost region"""
+        cache = InventoryCache(str(tmp_path / 'cache.sqlite'))
+        assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        cache._conn.close()
+        loader = MagicMock(return_value=[{'LogGroupName': '/app'}])
+        with patch.dict(INVENTORY_LOADERS, {'log_groups': loader}):
+            inventory = RegionInventory(MagicMock(), 'us-east-1', cache=cache, account='123')
+            assert inventory.get('log_groups') == [{'LogGroupName': '/app'}]
+
+
+class TestMultiAccount:
+    """Tests for multi-account scans through AssumeRole"""
+
+    def test_read_account_ids_skips_comments(self, tmp_path):
+        """Test parsing of an accounts file"""
+        path = tmp_path / 'accounts.txt'
+        path.write_text("# production\n111111111111\n\n222222222222  # staging\n")
+
+        assert read_account_ids(str(path)) == ['111111111111', '222222222222']
+
+    @mock_aws
+    def test_lists_active_organization_accounts(self):
+        """Test account discovery through organizations:ListAccounts"""
+        org = boto3.client('organizations', region_name='us-east-1')
+        org.create_organization(FeatureSet='ALL')
+        org.create_account(AccountName='dev', Email='dev@example.com')
+
+        account_ids = list_organization_accounts(boto3.Session(region_name='us-east-1'))
+
+        assert len(account_ids) == 2
+        assert all(len(a) == 12 for a in account_ids)
+
+    @mock_aws
+    def test_run_accounts_merges_findings_with_account_ids(self, tmp_path, monkeypatch):
+        """Test that each account is scanned with assumed credentials into one report"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        other_account = '222222222222'
+
+        # Caller account: one orphaned volume
+        boto3.client('ec2', region_name='us-east-1').create_volume(
+            AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2'
+        )
+        # Other account: one unattached Elastic IP, created through the assumed role
+        session = assume_role_session_factory(other_account, 'ScanRole')()
+        session.client('ec2', region_name='us-east-1').allocate_address(Domain='vpc')
+
+        scanner = AWSWasteFinder()
+        with patch.object(AWSWasteFinder, 'get_all_regions', return_value=['us-east-1']):
+            scanner.run_accounts(['123456789012', other_account], 'ScanRole', processes=1)
+
+        by_account = {f['account']: f['type'] for f in scanner.findings}
+        assert by_account == {'123456789012': 'EBS Volume', other_account: 'Elastic IP'}
+        assert scanner.total_waste == pytest.approx(4.6)
+
+
+class TestApiStats:
+    """Tests for API call instrumentation"""
+
+    @mock_aws
+    def test_records_calls_by_scanner_and_operation(self):
+        """Test that calls made during a scan are attributed to the scanner that made them"""
+        boto3.client('ec2', region_name='us-east-1').create_volume(
+            AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2'
+        )
+        stats = ApiStats()
+        scanner = AWSWasteFinder(stats=stats)
+        scanner.scan_regions(['us-east-1'], progress=False)
+
+        calls = {(r['scanner'], r['operation']): r for r in stats.group('scanner', 'operation')}
+        # Volumes are shared inventory, charged to whichever volume scanner asked first
+        assert sum(r['calls'] for (_, op), r in calls.items() if op == 'DescribeVolumes') == 1
+        assert calls[('eip', 'DescribeAddresses')]['calls'] == 1
+        assert calls[('rds', 'DescribeDBInstances')]['bytes'] > 0
+        assert stats.total_calls == sum(r['calls'] for r in calls.values())
+
+    def test_counts_throttles_and_merges_snapshots(self):
+        """Test throttle counting from the retry hook and merging worker snapshots"""
+        operation = MagicMock()
+        operation.name = 'DescribeVolumes'
+        context = {'wastefinder_stats': (None, 'ebs')}
+        stats = ApiStats()
+        stats._needs_retry('ec2', 'us-east-1', response=(None, {'Error': {'Code': 'Throttling'}}),
+                           operation=operation, request_dict={'context': context})
+        stats._needs_retry('ec2', 'us-east-1', response=(None, {}), operation=operation,
+                           request_dict={'context': context})
+
+        merged = ApiStats()
+        merged.merge(stats.snapshot())
+        merged.merge(stats.snapshot())
+
+        row, = merged.group('scanner')
+        assert row['scanner'] == 'ebs'
+        assert row['throttles'] == 2
+
+    def test_percentiles(self):
+        """Test latency percentiles estimated from the histogram buckets"""
+        source = ApiStats()
+        row = source._row(('ec2', 'DescribeVolumes', 'us-east-1', '-'))
+        for i in range(1, 101):
+            source._observe(row, i / 1000)
+        stats = ApiStats()
+        stats.merge(source.snapshot())
+
+        row, = stats.group('service')
+        assert (row['p50_ms'], row['p95_ms'], row['p99_ms']) == (50.0, 95.0, 99.0)
+        assert row['seconds'] == pytest.approx(5.05)
+        assert sum(row['buckets']) == 100
+
+    @mock_aws
+    def test_stats_json_flag_writes_file(self, tmp_path, monkeypatch):
+        """Test that --stats-json writes the statistics after the scan"""
+        monkeypatch.chdir(tmp_path)
+        with patch.object(AWSWasteFinder, 'get_all_regions', return_value=['us-east-1']):
+            main(['--no-cache', '--no-checkpoint', '--stats', '--stats-json', 'stats.json'])
+
+        report = json.loads((tmp_path / 'stats.json').read_text())
+        assert report['totals']['calls'] > 0
+        assert {'by_scanner', 'by_region', 'by_operation', 'calls'} <= set(report)
+
+
+class TestFinding:
+    """Tests for the compact finding records"""
+
+    def test_mapping_interface_renders_display_strings(self):
+        """Test that a finding reads like the old finding dict"""
+        from datetime import datetime, timedelta, timezone
+
+        created = datetime.now(timezone.utc) - timedelta(days=12)
+        finding = VolumeFinding('vol-1', 'us-east-1', 8.0, 100, 'gp3', created)
+
+        assert dict(finding) == {
+            'type': 'EBS Volume',
+            'id': 'vol-1',
+            'region': 'us-east-1',
+            'details': '100 GB (gp3)',
+            'age': '12 days orphaned',
+            'monthly_cost': 8.0,
+            'action': 'aws ec2 delete-volume --volume-id vol-1 --region us-east-1',
+        }
+        assert 'account' not in finding
+        finding.account = '111111111111'
+        assert finding['account'] == '111111111111'
+        assert finding.get('missing') is None
+
+    def test_compact_interned_and_picklable(self):
+        """Test that findings have no per-instance dict, share strings and survive pickling"""
+        import pickle
+
+        region = ''.join(['eu-', 'west-1'])
+        a = AddressFinding('1.2.3.4', region, 3.6, None)
+        b = AddressFinding('5.6.7.8', 'eu-west-1', 3.6, 'eipalloc-1')
+
+        assert not hasattr(a, '__dict__')
+        assert a.region is b.region
+        assert a['action'] == 'aws ec2 release-address --public-ip 1.2.3.4 --region eu-west-1'
+        assert pickle.loads(pickle.dumps(b)) == b
+        assert isinstance(b, Finding)
+
+
+def price_offer(offer_code, products):
+    """Build a minimal Price List bulk offer: products is a list of (attributes, family, unit, usd)"""
+    offer = {'offerCode': offer_code, 'products': {}, 'terms': {'OnDemand': {}}}
+    for i, (attributes, family, unit, usd) in enumerate(products):
+        sku = f'SKU{i}'
+        offer['products'][sku] = {'sku': sku, 'productFamily': family, 'attributes': attributes}
+        offer['terms']['OnDemand'][sku] = {f'{sku}.TERM': {'priceDimensions': {
+            f'{sku}.TERM.RATE': {'unit': unit, 'beginRange': '0', 'pricePerUnit': {'USD': usd}},
+        }}}
+    return offer
+
+
+class TestPriceList:
+    """Tests for the offline AWS Price List store"""
+
+    def test_ingests_json_offer_with_engine_and_deployment(self, tmp_path):
+        """Test compiling an RDS offer into monthly per-region prices"""
+        path = tmp_path / 'rds.json'
+        rds = {'regionCode': 'eu-west-1', 'instanceType': 'db.t3.micro', 'databaseEngine': 'MySQL'}
+        path.write_text(json.dumps(price_offer('AmazonRDS', [
+            (dict(rds, deploymentOption='Single-AZ'), 'Database Instance', 'Hrs', '0.018'),
+            (dict(rds, deploymentOption='Multi-AZ'), 'Database Instance', 'Hrs', '0.036'),
+            (dict(rds, databaseEngine='DocumentDB'), 'Database Instance', 'Hrs', '1.0'),
+        ])))
+        prices = PriceList(str(tmp_path / 'prices.sqlite'))
+
+        assert prices.ingest(str(path)) == 2
+        assert prices.monthly('AmazonRDS', 'eu-west-1', 'rds:db.t3.micro', 'mysql', 'Single-AZ') == pytest.approx(13.14)
+        assert prices.monthly('AmazonRDS', 'eu-west-1', 'rds:db.t3.micro', 'mysql', 'Multi-AZ') == pytest.approx(26.28)
+        assert prices.monthly('AmazonRDS', 'us-east-1', 'rds:db.t3.micro', 'mysql', 'Single-AZ') is None
+
+        prices.monthly('AmazonRDS', 'eu-west-1', 'rds:db.t3.micro', 'mysql', 'Single-AZ')
+        assert prices.monthly.cache_info().hits == 1
+
+    def test_prices_licensed_engines_by_edition_and_license_model(self, tmp_path):
+        """Test that Oracle and SQL Server prices are kept apart by edition and license model"""
+        path = tmp_path / 'rds.json'
+        rds = {'regionCode': 'eu-west-1', 'instanceType': 'db.m5.large', 'deploymentOption': 'Single-AZ'}
+        path.write_text(json.dumps(price_offer('AmazonRDS', [
+            (dict(rds, databaseEngine='SQL Server', databaseEdition='Enterprise', licenseModel='License included'),
+             'Database Instance', 'Hrs', '1.0'),
+            (dict(rds, databaseEngine='SQL Server', databaseEdition='Express', licenseModel='License included'),
+             'Database Instance', 'Hrs', '0.2'),
+            (dict(rds, databaseEngine='Oracle', databaseEdition='Standard Two', licenseModel='License included'),
+             'Database Instance', 'Hrs', '0.5'),
+            (dict(rds, databaseEngine='Oracle', databaseEdition='Standard Two', licenseModel='Bring your own license'),
+             'Database Instance', 'Hrs', '0.1'),
+        ])))
+        prices = PriceList(str(tmp_path / 'prices.sqlite'))
+        prices.ingest(str(path))
+        scanner = AWSWasteFinder(prices=prices)
+
+        def idle_db(engine, license_model=None):
+            db = {'DBInstanceIdentifier': 'db', 'DBInstanceClass': 'db.m5.large', 'Engine': engine,
+                  'DBInstanceStatus': 'available', 'MultiAZ': False}
+            if license_model:
+                db['LicenseModel'] = license_model
+            inventory = MagicMock()
+            inventory.get.side_effect = {'db_instances': [db], 'db_connections': {'db': []}}.get
+            return scanner.scan_rds_instances('eu-west-1', inventory)[0]['monthly_cost']
+
+        assert idle_db('sqlserver-ee', 'license-included') == pytest.approx(730.0)
+        assert idle_db('oracle-se2-cdb') == pytest.approx(365.0)
+        assert idle_db('oracle-se2', 'bring-your-own-license') == pytest.approx(73.0)
+
+    def test_drops_price_database_without_license_models(self, tmp_path):
+        """Test that a price table compiled before license models is discarded instead of failing lookups"""
+        import sqlite3
+
+        path = str(tmp_path / 'prices.sqlite')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE prices (service, region, key, engine, deployment, monthly,"
+                     " PRIMARY KEY (service, region, key, engine, deployment))")
+        conn.execute("INSERT INTO prices VALUES ('AmazonVPC', 'eu-west-1', 'elastic_ip', '', '', 3.6)")
+        conn.commit()
+        conn.close()
+
+        assert PriceList(path).monthly('AmazonVPC', 'eu-west-1', 'elastic_ip') is None
+
+    def test_streams_json_offer_in_small_chunks(self, tmp_path):
+        """Test that the incremental reader handles values split across reads and skips other term types"""
+        from wasteFinder import _JsonStream
+
+        ebs = {'regionCode': 'eu-west-1', 'volumeApiName': 'gp3', 'usagetype': 'EU-EBS:VolumeUsage.gp3'}
+        offer = price_offer('AmazonEC2', [
+            (ebs, 'Storage', 'GB-Mo', '0.088'),
+            (dict(ebs, volumeApiName='gp2'), 'Storage', 'GB-Mo', '0.11'),
+            ({'regionCode': 'eu-west-1', 'instanceType': 'm5.large'}, 'Compute Instance', 'Hrs', '0.107'),
+        ])
+        offer['terms'] = {'Reserved': {'SKU0': {'R': {'priceDimensions': {}}}}, **offer['terms'],
+                          'Spot': {'SKU0': [1, 2.5, {'x': None}]}}
+        offer['version'] = 20240101
+        path = tmp_path / 'ec2.json'
+        path.write_text(json.dumps(offer, indent=2))
+        prices = PriceList(str(tmp_path / 'prices.sqlite'))
+
+        with patch.object(_JsonStream, 'CHUNK', 7):
+            assert prices.ingest(str(path)) == 2
+        assert prices.monthly('AmazonEC2', 'eu-west-1', 'ebs:gp3') == pytest.approx(0.088)
+
+    def test_ingests_csv_offer(self, tmp_path):
+        """Test the CSV offer format, which has metadata lines before the header"""
+        path = tmp_path / 'ec2.csv'
+        path.write_text(
+            '"FormatVersion","v1.0"\n"Disclaimer","..."\n'
+            '"SKU","TermType","Unit","PricePerUnit","StartingRange","Product Family","serviceCode",'
+            '"Region Code","Volume API Name","usageType"\n'
+            '"A","OnDemand","GB-Mo","0.11","0","Storage","AmazonEC2","eu-west-1","gp2","EU-EBS:VolumeUsage.gp2"\n'
+            '"B","Reserved","GB-Mo","0.01","0","Storage","AmazonEC2","eu-west-1","gp3","EU-EBS:VolumeUsage.gp3"\n'
+        )
+        prices = PriceList(str(tmp_path / 'prices.sqlite'))
+
+        assert prices.ingest(str(path)) == 1
+        assert prices.monthly('AmazonEC2', 'eu-west-1', 'ebs:gp2') == pytest.approx(0.11)
+
+    @mock_aws
+    def test_scanners_use_regional_prices(self):
+        """Test that scanners prefer the price list and fall back to built-in prices"""
+        for region in ('eu-west-1', 'us-east-1'):
+            boto3.client('ec2', region_name=region).create_volume(
+                AvailabilityZone=f'{region}a', Size=10, VolumeType='gp2'
+            )
+        prices = PriceList(':memory:')
+        prices._connect().execute(
+            "INSERT INTO prices VALUES ('AmazonEC2', 'eu-west-1', 'ebs:gp2', '', '', '', 0.11)"
+        )
+        scanner = AWSWasteFinder(prices=prices)
+
+        assert scanner.scan_ebs_volumes('eu-west-1')[0]['monthly_cost'] == pytest.approx(1.1)
+        assert scanner.scan_ebs_volumes('us-east-1')[0]['monthly_cost'] == pytest.approx(1.0)
+
+
+class TestReports:
+    """Tests for the multi-format report writer"""
+
+    @staticmethod
+    def sample_findings():
+        from datetime import datetime, timezone
+        volume = VolumeFinding('vol-1', 'us-east-1', 8.0, 100, 'gp3', datetime.now(timezone.utc))
+        address = AddressFinding('1.2.3.4', 'eu-west-1', 3.6, 'eipalloc-<1>|x')
+        return [volume, address, dict(volume, id='vol-2')]
+
+    def test_groups_once_in_first_seen_order(self):
+        """Test that the report groups findings by type"""
+        report = Report(self.sample_findings(), 19.6)
+
+        assert list(report.by_type) == ['EBS Volume', 'Elastic IP']
+        assert [f['id'] for f in report.findings()] == ['vol-1', 'vol-2', '1.2.3.4']
+        assert report.count == 3
+        assert not report.multi_account
+
+    def test_every_format_writes_a_file(self, tmp_path, monkeypatch):
+        """Test that save_report writes one parseable file per requested format"""
+        import csv
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('wasteFinder._UMASK', 0o022)
+        scanner = AWSWasteFinder(report_formats=list(REPORT_FORMATS))
+        scanner.findings = self.sample_findings()
+        scanner.total_waste = 19.6
+        scanner.save_report()
+
+        files = {path.suffix: path for path in tmp_path.iterdir()}
+        assert set(files) == {'.txt', '.json', '.csv', '.ndjson', '.md', '.html'}
+
+        document = json.loads(files['.json'].read_text())
+        assert document['total_resources'] == 3
+        assert document['by_type']['EBS Volume'] == {'count': 2, 'monthly_cost': 16.0}
+        assert document['findings'][2]['details'] == 'Allocation: eipalloc-<1>|x'
+
+        rows = list(csv.DictReader(files['.csv'].open(newline='')))
+        assert [r['id'] for r in rows] == ['vol-1', 'vol-2', '1.2.3.4']
+        assert rows[0]['yearly_cost'] == '96.0'
+
+        assert len(files['.ndjson'].read_text().splitlines()) == 3
+        assert 'eipalloc-<1>\\|x' in files['.md'].read_text()
+        assert 'eipalloc-&lt;1&gt;|x' in files['.html'].read_text()
+        assert 'Total Resources: 3' in files['.txt'].read_text()
+        assert all(path.stat().st_mode & 0o777 == 0o644 for path in files.values())
+
+    def test_reports_follow_the_umask(self, tmp_path, monkeypatch):
+        """Test that atomically written files get the mode open() would give them under the umask"""
+        monkeypatch.setattr('wasteFinder._UMASK', 0o077)
+        path = write_report(Report(self.sample_findings(), 19.6), str(tmp_path / 'report.txt'))
+        metrics = write_metrics(str(tmp_path / 'wastefinder.prom'), 'wastefinder_info 1\n')
+
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        assert os.stat(metrics).st_mode & 0o777 == 0o600
+
+    def test_cli_rejects_formats_with_summary_only(self, capsys):
+        """Test that --format is a usage error when --summary-only keeps no findings to write"""
+        with pytest.raises(SystemExit):
+            main(['--summary-only', '--format', 'json'])
+        assert '--summary-only' in capsys.readouterr().err
+
+    def test_failed_write_leaves_no_partial_file(self, tmp_path, monkeypatch):
+        """Test that a renderer error leaves neither the report nor its temporary file"""
+        def broken(report, out):
+            out.write('partial')
+            raise RuntimeError('disk full')
+
+        monkeypatch.setitem(REPORT_FORMATS, 'text', ('txt', broken))
+        with pytest.raises(RuntimeError):
+            write_report(Report(self.sample_findings(), 19.6), str(tmp_path / 'report.txt'))
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestRegionDiscovery:
+    """Tests for region filtering and the empty-region probe"""
+
+    @mock_aws
+    def test_skips_disabled_and_filters_regions(self, capsys):
+        """Test OptInStatus filtering and --regions / --exclude-regions"""
+        assert 'ap-east-1' not in AWSWasteFinder().get_all_regions()
+
+        scanner = AWSWasteFinder(regions=['eu-west-1', 'ap-east-1', 'us-west-2'], exclude_regions=['us-west-2'])
+        assert scanner.get_all_regions() == ['eu-west-1']
+        assert 'ap-east-1' in capsys.readouterr().out
+
+    def test_probe_drops_regions_without_resources(self):
+        """Test that regions Resource Explorer reports as empty are not scanned"""
+        explorer = MagicMock()
+        explorer.list_indexes.return_value = {'Indexes': [
+            {'Region': 'us-east-1', 'Type': 'AGGREGATOR'},
+            {'Region': 'eu-west-1', 'Type': 'LOCAL'},
+            {'Region': 'ap-south-1', 'Type': 'LOCAL'},
+        ]}
+        explorer.search.side_effect = lambda QueryString, MaxResults: {
+            'Resources': [{'Arn': 'arn'}] if 'region:eu-west-1 ' in QueryString else []
+        }
+        scanner = AWSWasteFinder()
+
+        with patch.object(scanner.clients, 'get', return_value=explorer):
+            # af-south-1 has no index, so an empty search there proves nothing
+            regions = scanner.probe_regions(['us-east-1', 'eu-west-1', 'ap-south-1', 'af-south-1'])
+        assert regions == ['eu-west-1', 'af-south-1']
+        assert 'resourcetype:ec2:volume' in explorer.search.call_args.kwargs['QueryString']
+        assert all('af-south-1' not in call.kwargs['QueryString'] for call in explorer.search.call_args_list)
+        explorer.list_indexes.assert_called_once_with()
+
+    def test_probe_keeps_every_region_without_aggregator(self):
+        """Test the fallback when Resource Explorer is not set up"""
+        explorer = MagicMock()
+        explorer.list_indexes.return_value = {'Indexes': []}
+        scanner = AWSWasteFinder()
+
+        with patch.object(scanner.clients, 'get', return_value=explorer):
+            assert scanner.probe_regions(['us-east-1', 'eu-west-1']) == ['us-east-1', 'eu-west-1']
+        explorer.search.assert_not_called()
+
+
+class TestScannerRegistry:
+    """Tests for the scanner registry and --only / --skip"""
+
+    def test_every_scanner_is_registered(self):
+        """Test that each iter_* method is a registered scanner"""
+        methods = sorted(name for name in dir(AWSWasteFinder) if name.startswith('iter_'))
+        assert sorted(spec.method for spec in SCANNERS.values()) == methods
+        assert select_scanners(skip=['snapshots', 'rds']) == ['ebs', 'eip', 'load_balancers', 'nat', 'sagemaker', 'logs']
+        assert select_scanners(only=['eip', 'ebs']) == ['ebs', 'eip']
+        with pytest.raises(ValueError):
+            select_scanners(only=['s3'])
+        with pytest.raises(ValueError):
+            select_scanners(only=['ebs'], skip=['ebs'])
+
+    @mock_aws
+    def test_only_selected_scanners_call_aws(self):
+        """Test that a pre-deploy style run pays only for the scanners it selected"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')
+        ec2.allocate_address(Domain='vpc')
+        stats = ApiStats()
+        scanner = AWSWasteFinder(stats=stats, scanners=['ebs', 'eip'])
+
+        pipeline = scanner.scan_regions(['us-east-1'], progress=False)
+
+        assert sorted(f.TYPE for f in pipeline.findings) == ['EBS Volume', 'Elastic IP']
+        operations = {row['operation'] for row in stats.group('operation')}
+        assert operations == {'DescribeVolumes', 'DescribeAddresses'}
+
+    def test_probe_searches_selected_resource_types(self):
+        """Test that the empty-region probe only looks for what the selected scanners scan"""
+        explorer = MagicMock()
+        explorer.list_indexes.return_value = {'Indexes': [{'Region': 'us-east-1', 'Type': 'AGGREGATOR'}]}
+        explorer.search.return_value = {'Resources': []}
+        scanner = AWSWasteFinder(scanners=['eip'])
+
+        with patch.object(scanner.clients, 'get', return_value=explorer):
+            scanner.probe_regions(['us-east-1', 'eu-west-1'])
+        query = explorer.search.call_args.kwargs['QueryString']
+        assert 'resourcetype:ec2:elastic-ip' in query
+        assert 'ec2:volume' not in query
+
+    def test_cli_validates_and_lists_scanners(self, capsys):
+        """Test --only validation and --list-scanners"""
+        with pytest.raises(SystemExit):
+            main(['--only', 'ebs,s3'])
+        assert 'unknown scanner s3' in capsys.readouterr().err
+
+        main(['--list-scanners'])
+        out = capsys.readouterr().out
+        assert 'rds:DescribeDBInstances' in out
+        assert len(out.splitlines()) == len(SCANNERS) + 1
+
+
+class TestDeadlines:
+    """Tests for --region-timeout and --scan-deadline"""
+
+    def test_scheduler_abandons_tasks_past_their_deadline(self):
+        """Test that a hung task is given up at its deadline while the others finish"""
+        import threading
+        import time
+
+        release = threading.Event()
+        started = []
+
+        def fn(task):
+            started.append(task.scanner)
+            if task.scanner == 'hung':
+                release.wait(10)
+            return task.scanner
+
+        tasks = [ScanTask('us-east-1', name) for name in ('hung', 'quick')]
+        tasks.append(ScanTask('eu-west-1', 'late'))
+        due = time.monotonic() + 0.3
+        deadline = lambda task: time.monotonic() - 1 if task.region == 'eu-west-1' else due
+
+        start = time.perf_counter()
+        try:
+            outcomes = {task.scanner: future for task, future in TaskScheduler(4).run(tasks, fn, deadline)}
+            elapsed = time.perf_counter() - start
+        finally:
+            release.set()
+
+        assert outcomes['quick'].result() == 'quick'
+        assert isinstance(outcomes['hung'].exception(), ScanTimeout)
+        assert isinstance(outcomes['late'].exception(), ScanTimeout)
+        assert 'late' not in started
+        assert elapsed < 2
+
+    @mock_aws
+    def test_scan_finishes_with_partial_results(self, capsys):
+        """Test that a hung scanner marks its region incomplete and the other findings are kept"""
+        import threading
+
+        boto3.client('ec2', region_name='us-east-1').create_volume(
+            AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2'
+        )
+        release = threading.Event()
+
+        def hung(region, inventory=None):
+            release.wait(10)
+            yield from ()
+
+        scanner = AWSWasteFinder(scanners=['ebs', 'eip'], region_timeout=1)
+        try:
+            with patch.object(scanner, 'iter_elastic_ips', hung):
+                pipeline = scanner.scan_regions(['us-east-1'])
+        finally:
+            release.set()
+
+        assert [f['type'] for f in pipeline.findings] == ['EBS Volume']
+        assert scanner.incomplete == [{'account': None, 'region': 'us-east-1', 'scanners': ['eip']}]
+        assert 'us-east-1: Incomplete' in capsys.readouterr().out
+
+        report = Report(pipeline.findings, pipeline.total_cost, incomplete=scanner.incomplete)
+        out = io.StringIO()
+        REPORT_FORMATS['json'][1](report, out)
+        assert json.loads(out.getvalue())['incomplete'][0]['scanners'] == ['eip']
+        out = io.StringIO()
+        REPORT_FORMATS['text'][1](report, out)
+        assert 'INCOMPLETE SCAN' in out.getvalue()
+
+    @mock_aws
+    def test_calls_past_deadline_are_refused(self):
+        """Test that an abandoned task's next AWS call fails instead of running"""
+        import time
+        from wasteFinder import _scan_context
+
+        scanner = AWSWasteFinder(scan_deadline=30)
+        ec2 = scanner.clients.get('ec2', 'us-east-1')
+        assert scanner.clients.config.read_timeout == 30
+
+        _scan_context.deadline = time.monotonic() - 1
+        try:
+            with pytest.raises(ScanTimeout):
+                ec2.describe_volumes()
+        finally:
+            _scan_context.deadline = None
+        ec2.describe_volumes()
+
+    def test_retries_stop_at_the_deadline(self, monkeypatch):
+        """Test that a failing call is not retried past its task's deadline"""
+        import time
+        from botocore.awsrequest import AWSResponse
+        from wasteFinder import _scan_context
+
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+        monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+        attempts = []
+
+        def unavailable(request, **kwargs):
+            attempts.append(time.monotonic())
+            return AWSResponse(request.url, 503, {}, MagicMock(stream=lambda: iter([b''])))
+
+        scanner = AWSWasteFinder(scan_deadline=30)
+        ec2 = scanner.clients.get('ec2', 'us-east-1')
+        ec2.meta.events.register('before-send', unavailable)
+
+        start = time.monotonic()
+        _scan_context.deadline = start + 0.5
+        try:
+            with pytest.raises(ScanTimeout):
+                ec2.describe_volumes()
+        finally:
+            _scan_context.deadline = None
+
+        # Ten attempts with exponential backoff would take far longer
+        assert time.monotonic() - start < 3
+        assert all(attempt < start + 0.5 for attempt in attempts)
+        assert scanner.concurrency._in_flight[('ec2', 'us-east-1')] == 0
+
+    def test_abandoned_tasks_do_not_delay_exit(self):
+        """Test that the process exits at the deadline instead of waiting for a hung task"""
+        import subprocess
+        import time
+
+        code = (
+            "import time, wasteFinder\n"
+            "tasks = [wasteFinder.ScanTask('us-east-1', 'hung')]\n"
+            "due = time.monotonic() + 0.2\n"
+            "for task, future in wasteFinder.TaskScheduler(2).run(tasks, lambda task: time.sleep(30), lambda task: due):\n"
+            "    print(type(future.exception()).__name__)\n"
+        )
+        start = time.monotonic()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=60)
+
+        assert result.stdout.strip() == 'ScanTimeout'
+        assert time.monotonic() - start < 5
+
+
+class TestScanJournal:
+    """Tests for checkpointing and --resume"""
+
+    def test_records_units_with_findings(self, tmp_path):
+        """Test that findings round-trip through the journal with their raw fields"""
+        from datetime import timezone
+
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        volume = VolumeFinding('vol-1', 'us-east-1', 8.0, 100, 'gp2', created)
+        volume.account = '111111111111'
+        journal = ScanJournal(path=str(tmp_path / 'run.sqlite'))
+        journal.record('111111111111', 'us-east-1', 'ebs', [volume])
+        journal.record('111111111111', 'us-east-1', 'eip', [])
+        journal.close()
+
+        reopened = ScanJournal(**journal.options())
+        assert reopened.completed('111111111111') == {('us-east-1', 'ebs'), ('us-east-1', 'eip')}
+        restored, = reopened.findings('111111111111', 'us-east-1', 'ebs')
+        assert type(restored) is VolumeFinding
+        assert restored.created == created
+        assert restored.as_dict() == volume.as_dict()
+        assert list(reopened.findings('111111111111', 'us-east-1', 'eip')) == []
+
+    def test_streams_findings_in_batches(self, tmp_path, monkeypatch):
+        """Test that a unit's findings reach the journal as they stream, but only count once it finishes"""
+        monkeypatch.setattr(ScanJournal, 'BATCH', 2)
+        journal = ScanJournal(path=str(tmp_path / 'run.sqlite'))
+        unit = journal.unit(None, 'us-east-1', 'eip')
+        for i in range(5):
+            unit.add(AddressFinding(f'10.0.0.{i}', 'us-east-1', 3.6, f'eipalloc-{i}'))
+        assert journal._conn.execute("SELECT COUNT(*) FROM findings").fetchone()[0] == 4
+        assert journal.completed(None) == set()
+
+        # A retry of the unfinished unit starts from scratch
+        unit = journal.unit(None, 'us-east-1', 'eip')
+        for i in range(3):
+            unit.add(AddressFinding(f'10.0.1.{i}', 'us-east-1', 3.6, f'eipalloc-{i}'))
+        unit.finish()
+        assert journal.completed(None) == {('us-east-1', 'eip')}
+        assert [f['id'] for f in journal.findings(None, 'us-east-1', 'eip')] == ['10.0.1.0', '10.0.1.1', '10.0.1.2']
+        with pytest.raises(FileNotFoundError):
+            ScanJournal('missing-run', resume=True)
+
+    @mock_aws
+    def test_resume_scans_only_missing_units(self, tmp_path):
+        """Test that finished units are replayed and only the rest are scanned"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')
+        ec2.allocate_address(Domain='vpc')
+        journal = ScanJournal(path=str(tmp_path / 'run.sqlite'))
+        # An interrupted attempt finished the volume scan only
+        earlier = VolumeFinding('vol-earlier', 'us-east-1', 1.0, 10, 'gp2', datetime(2024, 1, 1))
+        journal.record(None, 'us-east-1', 'ebs', [earlier])
+
+        scanner = AWSWasteFinder(scanners=['ebs', 'eip'], journal=journal)
+        with patch.object(scanner, 'iter_ebs_volumes', side_effect=AssertionError('rescanned')):
+            pipeline = scanner.scan_regions(['us-east-1'], progress=False)
+
+        assert sorted(f['type'] for f in pipeline.findings) == ['EBS Volume', 'Elastic IP']
+        assert [f['id'] for f in pipeline.findings if f['type'] == 'EBS Volume'] == ['vol-earlier']
+        assert set(journal.completed(None)) == {('us-east-1', 'ebs'), ('us-east-1', 'eip')}
+
+    def test_cli_rejects_unknown_run(self, tmp_path, monkeypatch, capsys):
+        """Test that --resume needs an existing journal"""
+        monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+        with pytest.raises(SystemExit):
+            main(['--resume', 'no-such-run'])
+        assert 'No journal for run no-such-run' in capsys.readouterr().err
+
+
+class TestBaselineDiff:
+    """Tests for --baseline diff mode"""
+
+    def findings(self, *specs):
+        found = []
+        for finding_id, region, cost in specs:
+            finding = AddressFinding(finding_id, region, cost, f'eipalloc-{finding_id}')
+            finding.account = '111111111111'
+            found.append(finding)
+        return found
+
+    def test_new_resolved_and_changed(self, tmp_path):
+        """Test the three kinds of change against a JSON report baseline"""
+        path = str(tmp_path / 'baseline.json')
+        previous = self.findings(('1.1.1.1', 'us-east-1', 3.6), ('2.2.2.2', 'us-east-1', 3.6),
+                                 ('3.3.3.3', 'eu-west-1', 3.6))
+        write_report(Report(previous, 10.8), path, 'json')
+
+        diff = BaselineDiff(path)
+        pipeline = FindingsPipeline([diff])
+        for finding in self.findings(('1.1.1.1', 'us-east-1', 7.2), ('2.2.2.2', 'us-east-1', 3.6),
+                                     ('4.4.4.4', 'us-east-1', 3.6)):
+            pipeline.emit(finding)
+
+        assert [f['id'] for f in diff.new] == ['4.4.4.4']
+        assert [(before, f['id']) for before, f in diff.changed] == [(3.6, '1.1.1.1')]
+        assert [row['id'] for row in diff.resolved()] == ['3.3.3.3']
+        assert diff.total_cost == pytest.approx(10.8)
+
+    def test_resolved_only_where_this_run_looked(self, tmp_path, capsys):
+        """Test that findings outside the scanned regions, scanners or finished units are not reported resolved"""
+        path = tmp_path / 'baseline.ndjson'
+        rows = [
+            {'type': 'Elastic IP', 'id': '1.1.1.1', 'region': 'us-east-1', 'monthly_cost': 3.6},
+            {'type': 'Elastic IP', 'id': '2.2.2.2', 'region': 'eu-west-1', 'monthly_cost': 3.6},
+            {'type': 'EBS Volume', 'id': 'vol-1', 'region': 'us-east-1', 'monthly_cost': 8.0},
+            {'type': 'Elastic IP', 'id': '3.3.3.3', 'region': 'ap-south-1', 'monthly_cost': 3.6},
+        ]
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        scanner = AWSWasteFinder(scanners=['eip'], exclude_regions=['eu-west-1'], baseline=BaselineDiff(str(path)))
+        scanner.incomplete = [{'account': '111111111111', 'region': 'ap-south-1', 'scanners': ['eip']}]
+
+        # Accounts are ignored when the baseline has none
+        scanner.baseline.write(self.findings(('9.9.9.9', 'us-east-1', 3.6))[0])
+        assert [row['id'] for row in scanner.baseline.resolved(scanner._coverage())] == ['1.1.1.1']
+
+        scanner._print_changes()
+        out = capsys.readouterr().out
+        assert 'NEW (1)' in out and 'RESOLVED (1)' in out and 'COST CHANGED (0)' in out
+        assert 'vol-1' not in out
+
+    @mock_aws
+    def test_failed_scanner_resolves_nothing(self, tmp_path):
+        """Test that a scanner that errored in a region does not report that region's findings resolved"""
+        from botocore.exceptions import ClientError as BotoClientError
+
+        path = tmp_path / 'baseline.ndjson'
+        rows = [{'type': 'Elastic IP', 'id': ip, 'region': region, 'monthly_cost': 3.6}
+                for ip, region in (('1.1.1.1', 'us-east-1'), ('2.2.2.2', 'eu-west-1'))]
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        scanner = AWSWasteFinder(scanners=['eip'], baseline=BaselineDiff(str(path)))
+        scanner.account_id = '123456789012'
+
+        def loader(clients, region, **params):
+            if region == 'eu-west-1':
+                raise BotoClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'DescribeAddresses')
+            return []
+
+        with patch.dict(INVENTORY_LOADERS, {'addresses': loader}):
+            scanner.scan_regions(['us-east-1', 'eu-west-1'], FindingsPipeline([scanner.baseline]), progress=False)
+
+        assert scanner.failed_units == {('123456789012', 'eu-west-1', 'eip')}
+        assert [row['id'] for row in scanner.baseline.resolved(scanner._coverage())] == ['1.1.1.1']
+
+    def test_cli_rejects_unreadable_baseline(self, tmp_path, capsys):
+        """Test that a missing or malformed baseline is a usage error"""
+        (tmp_path / 'bad.json').write_text('{"not": "a report"}')
+        for path in (tmp_path / 'missing.json', tmp_path / 'bad.json'):
+            with pytest.raises(SystemExit):
+                main(['--baseline', str(path)])
+        assert 'cannot read baseline' in capsys.readouterr().err
+
+
+class TestServe:
+    """Tests for --serve: scheduled scans and the results API"""
+
+    def test_snapshot_filters_by_region_and_type(self):
+        """Test index-based filtering and totals"""
+        findings = [
+            AddressFinding('1.1.1.1', 'us-east-1', 3.6, 'eipalloc-1'),
+            AddressFinding('2.2.2.2', 'eu-west-1', 3.6, 'eipalloc-2'),
+            VolumeFinding('vol-1', 'us-east-1', 8.0, 100, 'gp2', datetime(2024, 1, 1)),
+        ]
+        now = datetime.now()
+        snapshot = ScanSnapshot(findings, now - timedelta(seconds=5), now, regions=['us-east-1', 'eu-west-1'])
+
+        document = json.loads(snapshot.findings_json(region={'us-east-1'}, type={'Elastic IP'}))
+        assert [f['id'] for f in document['findings']] == ['1.1.1.1']
+        assert document['monthly_waste'] == 3.6
+        assert json.loads(snapshot.findings_json())['count'] == 3
+
+        summary = snapshot.summary(region={'us-east-1', 'ap-south-1'})
+        assert summary['total_resources'] == 2
+        assert summary['by_type'] == {'Elastic IP': {'count': 1, 'monthly_cost': 3.6},
+                                      'EBS Volume': {'count': 1, 'monthly_cost': 8.0}}
+        assert summary['duration_seconds'] == 5.0
+
+    @mock_aws
+    def test_serves_latest_scan_with_warm_metadata(self):
+        """Test the HTTP API around two scans that share region discovery"""
+        from urllib.error import HTTPError
+        from urllib.request import urlopen
+
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.allocate_address(Domain='vpc')
+        service = WasteFinderService(AWSWasteFinder(), port=0)
+        host, port = service.start()
+
+        def get(path):
+            with urlopen(f"http://{host}:{port}{path}") as response:
+                return json.loads(response.read())
+
+        try:
+            with pytest.raises(HTTPError) as error:
+                get('/health')
+            assert error.value.code == 503
+
+            with patch.object(service.scanner, 'get_all_regions', return_value=['us-east-1']) as discover:
+                service.scan()
+                ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')
+                service.scan()
+            assert discover.call_count == 1
+
+            assert get('/health')['status'] == 'ok'
+            found = get('/findings?type=EBS%20Volume&type=Elastic%20IP')['findings']
+            assert sorted(f['type'] for f in found) == ['EBS Volume', 'Elastic IP']
+            assert get('/findings?region=eu-west-1')['count'] == 0
+            assert get('/summary?type=Elastic%20IP')['monthly_waste'] == 3.6
+            with pytest.raises(HTTPError) as error:
+                get('/nothing')
+            assert error.value.code == 404
+        finally:
+            service.stop()
+
+    def test_cli_rejects_report_options(self, capsys):
+        """Test that options serve mode would ignore are usage errors"""
+        for extra in (['--format', 'json'], ['--jsonl', 'out.jsonl'], ['--summary-only'], ['--stats']):
+            with pytest.raises(SystemExit):
+                main(['--serve', *extra])
+        assert 'cannot be combined' in capsys.readouterr().err
+
+
+class TestMetrics:
+    """Tests for the Prometheus metrics export"""
+
+    def test_render_labels_totals_and_counters(self):
+        """Test the exposition text built from scan totals, task times and API counters"""
+        stats = ApiStats()
+        row = stats._row(('ec2', 'DescribeVolumes', 'us-east-1', 'ebs'))
+        row.update(calls=3, throttles=1)
+        for latency in (0.02, 0.03, 0.2):
+            stats._observe(row, latency)
+        now = datetime.now()
+        text = render_metrics(
+            {('EBS Volume', 'us-east-1', '123456789012'): [2, 16.0],
+             ('Elastic IP', 'eu-west-1', 'acct "x"'): [1, 3.6]},
+            durations={('123456789012', 'us-east-1', 'ebs'): 1.25},
+            incomplete=[{'account': '123456789012', 'region': 'eu-west-1', 'scanners': ['rds']}],
+            stats=stats, started=now - timedelta(seconds=4), finished=now,
+        )
+
+        lines = text.splitlines()
+        assert '# TYPE wastefinder_api_calls_total counter' in lines
+        assert 'wastefinder_findings{account="123456789012",region="us-east-1",type="EBS Volume"} 2' in lines
+        assert 'wastefinder_monthly_cost_dollars{account="123456789012",region="us-east-1",type="EBS Volume"} 16.0' in lines
+        assert 'wastefinder_monthly_cost_dollars{account="acct \\"x\\"",region="eu-west-1",type="Elastic IP"} 3.6' in lines
+        assert 'wastefinder_scanner_duration_seconds{account="123456789012",region="us-east-1",scanner="ebs"} 1.25' in lines
+        assert 'wastefinder_region_incomplete{account="123456789012",region="eu-west-1",scanner="rds"} 1' in lines
+        assert 'wastefinder_api_throttles_total{service="ec2",operation="DescribeVolumes",region="us-east-1"} 1' in lines
+        assert 'wastefinder_scan_duration_seconds 4.0' in lines
+        assert '# TYPE wastefinder_api_call_duration_seconds histogram' in lines
+        labels = 'service="ec2",operation="DescribeVolumes",region="us-east-1"'
+        assert f'wastefinder_api_call_duration_seconds_bucket{{{labels},le="0.05"}} 2' in lines
+        assert f'wastefinder_api_call_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f'wastefinder_api_call_duration_seconds_count{{{labels}}} 3' in lines
+
+    @mock_aws
+    def test_metrics_file_and_endpoint(self, tmp_path, monkeypatch):
+        """Test --metrics-file after a one-shot scan and /metrics after a served scan"""
+        from urllib.request import urlopen
+
+        monkeypatch.chdir(tmp_path)
+        boto3.client('ec2', region_name='us-east-1').allocate_address(Domain='vpc')
+        with patch.object(AWSWasteFinder, 'get_all_regions', return_value=['us-east-1']):
+            main(['--no-cache', '--no-checkpoint', '--metrics-file', 'waste.prom'])
+        text = (tmp_path / 'waste.prom').read_text()
+        assert 'wastefinder_findings{account="123456789012",region="us-east-1",type="Elastic IP"} 1' in text
+        assert 'wastefinder_scanner_duration_seconds{account="123456789012",region="us-east-1",scanner="eip"}' in text
+        assert 'wastefinder_api_calls_total{service="ec2",operation="DescribeAddresses",region="us-east-1"} 1' in text
+
+        service = WasteFinderService(AWSWasteFinder(stats=ApiStats()), port=0)
+        host, port = service.start()
+        try:
+            with patch.object(service.scanner, 'get_all_regions', return_value=['us-east-1']):
+                service.scan()
+            with urlopen(f"http://{host}:{port}/metrics") as response:
+                assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+                served = response.read().decode()
+        finally:
+            service.stop()
+        assert 'wastefinder_monthly_cost_dollars{account="123456789012",region="us-east-1",type="Elastic IP"} 3.6' in served
+        assert 'wastefinder_last_scan_timestamp_seconds ' in served
+
+
+class StubConfig:
+    """
+    Local stand-in for the AWS Config aggregator APIs. Every (account, region)
+    holding items is a successfully updated source unless `sources` lists the
+    (account, region, status) statuses to report.
+    """
+
+    def __init__(self, items, sources=None):
+        self.items = items
+        self.sources = sources
+        self.calls = 0
+
+    def describe_configuration_aggregator_sources_status(self, ConfigurationAggregatorName):
+        sources = self.sources
+        if sources is None:
+            sources = {(item['accountId'], item['awsRegion'], 'SUCCEEDED') for item in self.items}
+        return {'AggregatedSourceStatusList': [
+            {'SourceId': account, 'SourceType': 'ACCOUNT', 'AwsRegion': region, 'LastUpdateStatus': status}
+            for account, region, status in sorted(sources)
+        ]}
+
+    def select_aggregate_resource_config(self, Expression, ConfigurationAggregatorName, Limit, NextToken=None):
+        import re
+
+        if 'GROUP BY' in Expression:
+            counts = {}
+            for item in self.items:
+                key = (item['accountId'], item['awsRegion'])
+                counts[key] = counts.get(key, 0) + 1
+            return {'Results': [json.dumps({'accountId': account, 'awsRegion': region, 'COUNT(*)': count})
+                                for (account, region), count in sorted(counts.items())]}
+        self.calls += 1
+        resource_type = re.search(r"resourceType = '([^']+)'", Expression).group(1)
+        account = re.search(r"accountId = '([^']+)'", Expression)
+        matches = [
+            item for item in self.items
+            if item['resourceType'] == resource_type and (not account or item['accountId'] == account.group(1))
+        ]
+        start = int(NextToken or 0)
+        page = {'Results': [json.dumps(item) for item in matches[start:start + Limit]]}
+        if start + Limit < len(matches):
+            page['NextToken'] = str(start + Limit)
+        return page
+
+
+def config_volume(volume_id, region, state='available', account='123456789012'):
+    return {
+        'resourceType': 'AWS::EC2::Volume', 'resourceId': volume_id, 'awsRegion': region, 'accountId': account,
+        'configuration': {'size': 50, 'volumeType': 'gp3', 'state': state, 'createTime': '2024-01-01T00:00:00.000Z'},
+    }
+
+
+def config_address(public_ip, region, account='123456789012'):
+    return {
+        'resourceType': 'AWS::EC2::EIP', 'resourceId': public_ip, 'awsRegion': region, 'accountId': account,
+        'configuration': {'publicIp': public_ip, 'allocationId': f'eipalloc-{public_ip}'},
+    }
+
+
+class TestConfigBackend:
+    """Tests for the AWS Config aggregator inventory backend"""
+
+    def test_one_paginated_query_serves_every_region(self, monkeypatch):
+        """Test that inventories are queried once and split by region"""
+        stub = StubConfig([
+            config_volume('vol-1', 'us-east-1'),
+            config_volume('vol-2', 'eu-west-1', state='in-use'),
+            config_volume('vol-3', 'eu-west-1'),
+            config_volume('vol-4', 'eu-west-1', account='222222222222'),
+        ])
+        monkeypatch.setattr(ConfigInventoryBackend, 'PAGE_SIZE', 2)
+        backend = ConfigInventoryBackend('org', clients=MagicMock(get=MagicMock(return_value=stub)))
+
+        eu = backend.load('volumes', 'eu-west-1', '123456789012')
+        assert [v['VolumeId'] for v in eu] == ['vol-2', 'vol-3']
+        assert eu[0]['State'] == 'in-use'
+        assert eu[0]['CreateTime'].year == 2024
+        assert [v['VolumeId'] for v in backend.load('volumes', 'us-east-1', '123456789012')] == ['vol-1']
+        assert stub.calls == 2
+        assert backend.load('snapshots', 'us-east-1', '123456789012') is None
+
+    def test_uncovered_regions_use_describe_calls(self):
+        """Test that regions Config does not record or could not update are not reported empty"""
+        stub = StubConfig(
+            [config_volume('vol-1', 'us-east-1'), config_volume('vol-2', 'eu-west-1'),
+             config_volume('vol-3', 'us-west-2', account='222222222222')],
+            sources={('123456789012', 'us-east-1', 'SUCCEEDED'), ('123456789012', 'eu-west-1', 'FAILED'),
+                     ('222222222222', 'us-west-2', 'SUCCEEDED'), ('123456789012', 'ap-south-1', 'SUCCEEDED')},
+        )
+        backend = ConfigInventoryBackend('org', clients=MagicMock(get=MagicMock(return_value=stub)))
+
+        assert [v['VolumeId'] for v in backend.load('volumes', 'us-east-1', '123456789012')] == ['vol-1']
+        # The source failed to update, nothing is recorded, or only another account is covered
+        assert backend.load('volumes', 'eu-west-1', '123456789012') is None
+        assert backend.load('volumes', 'ap-south-1', '123456789012') is None
+        assert backend.load('volumes', 'us-west-2', '123456789012') is None
+        # A pool without an account ID sees every account in the aggregator
+        assert [v['VolumeId'] for v in backend.load('volumes', 'us-west-2')] == ['vol-3']
+
+    def test_cli_queries_config_through_the_scanner_clients(self):
+        """Test that Config calls share the scanner's rate limits, statistics and deadline hooks"""
+        with patch.object(AWSWasteFinder, 'run', autospec=True) as run:
+            main(['--backend', 'config', '--config-region', 'us-east-1', '--no-cache', '--no-checkpoint'])
+        scanner = run.call_args[0][0]
+
+        assert scanner.backend.clients is scanner.clients
+
+    @mock_aws
+    def test_scanners_fall_back_to_describe_calls(self):
+        """Test Config answers for volumes while other inventories still use Describe calls"""
+        ec2 = boto3.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=10, VolumeType='gp2')
+        ec2.allocate_address(Domain='vpc')
+        stub = StubConfig([config_volume('vol-config', 'us-east-1'), config_address('198.51.100.7', 'us-east-1')])
+        backend = ConfigInventoryBackend('org', clients=MagicMock(get=MagicMock(return_value=stub)))
+        scanner = AWSWasteFinder(backend=backend)
+
+        assert [f['id'] for f in scanner.scan_ebs_volumes('us-east-1')] == ['vol-config']
+        assert [f['id'] for f in scanner.scan_elastic_ips('us-east-1')] == ['198.51.100.7']
+
+        # Config is not recording in us-east-1: both inventories come from Describe calls
+        stub = StubConfig([config_volume('vol-config', 'eu-west-1')])
+        backend = ConfigInventoryBackend('org', clients=MagicMock(get=MagicMock(return_value=stub)))
+        scanner = AWSWasteFinder(backend=backend)
+        assert len(scanner.scan_ebs_volumes('us-east-1')) == 1
+        assert len(scanner.scan_elastic_ips('us-east-1')) == 1
+
+        failing = ConfigInventoryBackend('org', clients=MagicMock(get=MagicMock(side_effect=RuntimeError('denied'))))
+        scanner = AWSWasteFinder(backend=failing)
+        assert len(scanner.scan_ebs_volumes('us-east-1')) == 1
+        assert len(scanner.scan_elastic_ips('us-east-1')) == 1
+
+
+class TestStartup:
+    """Tests that the CLI starts without loading the AWS SDK"""
+
+    REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Generous enough for slow CI machines; importing boto3 alone takes a large share of this
+    STARTUP_BUDGET = 1.0
+
+    def run_cli(self, *args):
+        import subprocess
+        import time
+
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.join(self.REPO, 'wasteFinder.py'), *args],
+            capture_output=True, text=True,
+        )
+        return result, time.perf_counter() - start
+
+    def test_import_does_not_load_sdk(self):
+        """Test that importing the module leaves boto3, botocore, asyncio and aiobotocore unloaded"""
+        import subprocess
+
+        code = (
+            "import sys, wasteFinder\n"
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'boto3', 'botocore', 'asyncio', 'aiobotocore'}))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=self.REPO)
+
+        assert result.stdout.strip() == '[]'
+
+    def test_version_and_usage_errors_are_fast(self):
+        """Test --version and argument errors within the startup budget"""
+        result, elapsed = self.run_cli('--version')
+        assert result.returncode == 0
+        assert elapsed < self.STARTUP_BUDGET
+
+        result, elapsed = self.run_cli('--workers', '0')
+        assert result.returncode == 2
+        assert elapsed < self.STARTUP_BUDGET
+
+    def test_sdk_loads_with_first_client_pool(self):
+        """Test that the real botocore ClientError is in place once a scan can start"""
+        import wasteFinder
+        from botocore.exceptions import ClientError
+
+        ClientPool()
+        assert wasteFinder.ClientError is ClientError
@@ -10,12 +10,26 @@ License: MIT
 
 __version__ = "1.3.0"
 
-import boto3
+import argparse
+import bisect
+import contextlib
+import contextvars
+import csv
+import functools
+import html
+import json
 import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+from collections.abc import Mapping
 from datetime import datetime, timedelta, timezone
-from botocore.exceptions import ClientError
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # Configure logging - set to DEBUG for troubleshooting
 logging.basicConfig(
@@ -24,6 +38,2577 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The process umask, read once at startup (reading it means setting it), so files
+# written through a temporary file get the same mode a plain open() would give them
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+class ClientError(Exception):
+    """Placeholder for botocore's ClientError until _load_sdk() imports the SDK"""
+
+
+def _load_sdk():
+    """
+    Import boto3 and botocore on first use instead of at module import, so
+    --help, --version and argument errors never pay for the SDK. Safe to call
+    repeatedly; returns the boto3 module.
+    """
+    global ClientError
+    import boto3
+    from botocore.exceptions import ClientError
+    return boto3
+
+
+@functools.lru_cache(maxsize=None)
+def _data_loader():
+    """One botocore data loader per process, so each service model is read and parsed once"""
+    from botocore.loaders import create_loader
+    return create_loader()
+
+
+class ClientPool:
+    """
+    Shared, thread-safe cache of boto3 clients keyed by (account, service, region).
+
+    boto3 Sessions are not thread-safe, so every worker thread builds clients from
+    its own Session. The clients themselves are safe to share once created, so each
+    (account, service, region) is only constructed once per run.
+    """
+
+    # botocore's default connect and read timeouts, in seconds
+    DEFAULT_TIMEOUT = 60
+    
+    def __init__(self, max_workers=5, account='default', session_factory=None, hooks=None, timeout=None):
+        boto3 = _load_sdk()
+        from botocore.config import Config
+        self.account = account
+        self.config = Config(**self.config_options(max_workers, timeout))
+        self._session_factory = session_factory or boto3.Session
+        self._hooks = list(hooks or [])
+        self._local = threading.local()
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def config_options(cls, max_connections, timeout=None):
+        """Client Config options, also used for AsyncClientPool's AioConfig"""
+        # Adaptive retry mode adds client-side rate limiting and backs off on throttling;
+        # `timeout` caps each connect and read so a hung endpoint cannot outlast a scan budget
+        timeout = min(timeout or cls.DEFAULT_TIMEOUT, cls.DEFAULT_TIMEOUT)
+        return {
+            'max_pool_connections': max_connections,
+            'retries': {'mode': 'adaptive', 'max_attempts': 10},
+            'connect_timeout': timeout,
+            'read_timeout': timeout,
+        }
+
+    def add_hook(self, hook):
+        """Register hook(client, service, region), called for every client created from now on"""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def session(self):
+        """Return the boto3 Session owned by the calling thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._session_factory()
+            # Sessions share the process-wide loader instead of re-reading service models
+            botocore_session = getattr(session, '_session', None)
+            if botocore_session is not None:
+                botocore_session.register_component('data_loader', _data_loader())
+            self._local.session = session
+        return session
+
+    def get(self, service, region_name=None):
+        """Return a cached client, creating it on first use"""
+        key = (self.account, service, region_name)
+        client = self._clients.get(key)
+        if client is None:
+            client = self.session().client(service, region_name=region_name, config=self.config)
+            with self._lock:
+                # Another thread may have won the race; keep the first client
+                if key in self._clients:
+                    return self._clients[key]
+                for hook in self._hooks:
+                    hook(client, service, region_name)
+                self._clients[key] = client
+        return client
+
+
+class AsyncClientPool:
+    """
+    aiobotocore counterpart of ClientPool, used by AsyncScanEngine.
+
+    Clients are keyed by (service, region), created on first use inside the
+    running event loop and closed together by close(). Credentials come from
+    the default chain, or from a Session built by `session_factory` (e.g. an
+    assumed role), frozen when the pool is created for one scan.
+    """
+
+    def __init__(self, max_connections=10, account='default', session_factory=None, hooks=None, timeout=None):
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import get_session
+        _load_sdk()
+        self.account = account
+        self.config = AioConfig(**ClientPool.config_options(max_connections, timeout))
+        self._session = get_session()
+        self._session.register_component('data_loader', _data_loader())
+        if session_factory is not None:
+            credentials = session_factory().get_credentials().get_frozen_credentials()
+            self._session.set_credentials(credentials.access_key, credentials.secret_key, credentials.token)
+        self._hooks = list(hooks or [])
+        self._clients = {}
+        self._contexts = []
+
+    def add_hook(self, hook):
+        """Register hook(client, service, region), called for every client created from now on"""
+        self._hooks.append(hook)
+
+    async def get(self, service, region_name=None):
+        """Return a cached client, creating it on first use"""
+        key = (service, region_name)
+        client = self._clients.get(key)
+        if client is None:
+            context = self._session.create_client(service, region_name=region_name, config=self.config)
+            client = await context.__aenter__()
+            # Another coroutine may have won the race while this one waited; keep the first client
+            if key in self._clients:
+                await context.__aexit__(None, None, None)
+                return self._clients[key]
+            for hook in self._hooks:
+                hook(client, service, region_name)
+            self._clients[key] = client
+            self._contexts.append(context)
+        return client
+
+    async def close(self):
+        """Close every client (and its connection pool)"""
+        contexts, self._contexts = self._contexts, []
+        self._clients.clear()
+        for context in contexts:
+            await context.__aexit__(None, None, None)
+
+
+@functools.lru_cache(maxsize=None)
+def _projection(key, fields):
+    """Compiled JMESPath keeping only `fields` of every item under `key`"""
+    import jmespath
+    return jmespath.compile(f"{key}[].{{{', '.join(f'{field}: {field}' for field in fields)}}}")
+
+
+def _compact(item):
+    # JMESPath projections return null for absent fields; drop them so `'X' not in item` checks still work
+    return {field: value for field, value in item.items() if value is not None}
+
+
+def _paginate(client, operation, key, fields=None, **kwargs):
+    """
+    Collect every item under `key` across all pages of a paginated operation.
+    With `fields`, only those fields of each item are kept.
+    """
+    items = []
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        if fields is None:
+            items.extend(page[key])
+        else:
+            # Same projection PageIterator.search() applies, compiled once and run page by page
+            items.extend(_compact(item) for item in _projection(key, fields).search(page) or ())
+    return items
+
+
+# What an inventory lists: the operation returning it, the key its items sit under,
+# the fields scanners read, and whether the operation is paginated
+InventoryListing = namedtuple('InventoryListing', ['service', 'operation', 'key', 'fields', 'paginated'],
+                              defaults=(True,))
+
+INVENTORY_LISTINGS = {
+    # Unfiltered: the snapshot scanner needs every volume ID, not only available ones
+    'volumes': InventoryListing('ec2', 'describe_volumes', 'Volumes',
+                                ('VolumeId', 'State', 'Size', 'VolumeType', 'CreateTime')),
+    'snapshots': InventoryListing('ec2', 'describe_snapshots', 'Snapshots',
+                                  ('SnapshotId', 'VolumeId', 'VolumeSize', 'StartTime')),
+    # DescribeAddresses has no pagination: every address comes back in one response
+    'addresses': InventoryListing('ec2', 'describe_addresses', 'Addresses',
+                                  ('PublicIp', 'AllocationId', 'AssociationId'), paginated=False),
+    'nat_gateways': InventoryListing('ec2', 'describe_nat_gateways', 'NatGateways', ('NatGatewayId', 'SubnetId')),
+    'load_balancers': InventoryListing('elbv2', 'describe_load_balancers', 'LoadBalancers',
+                                       ('LoadBalancerArn', 'LoadBalancerName', 'Type')),
+    'target_groups': InventoryListing('elbv2', 'describe_target_groups', 'TargetGroups',
+                                      ('TargetGroupArn', 'LoadBalancerArns')),
+    'classic_load_balancers': InventoryListing('elb', 'describe_load_balancers', 'LoadBalancerDescriptions',
+                                               ('LoadBalancerName', 'Instances')),
+    'notebook_instances': InventoryListing('sagemaker', 'list_notebook_instances', 'NotebookInstances',
+                                           ('NotebookInstanceName', 'NotebookInstanceStatus', 'InstanceType',
+                                            'LastModifiedTime')),
+    'log_groups': InventoryListing('logs', 'describe_log_groups', 'logGroups',
+                                   ('logGroupName', 'retentionInDays', 'storedBytes')),
+    # DescribeDBInstances has no status filter; the scanner skips instances that are not available
+    'db_instances': InventoryListing('rds', 'describe_db_instances', 'DBInstances',
+                                     ('DBInstanceIdentifier', 'DBInstanceClass', 'Engine', 'LicenseModel',
+                                      'DBInstanceStatus', 'MultiAZ', 'ReadReplicaSourceDBInstanceIdentifier')),
+}
+
+
+def _load_listing(listing, clients, region, **params):
+    client = clients.get(listing.service, region)
+    if listing.paginated:
+        return _paginate(client, listing.operation, listing.key, listing.fields, **params)
+    response = getattr(client, listing.operation)(**params)
+    return [_compact(item) for item in _projection(listing.key, listing.fields).search(response) or ()]
+
+
+async def _paginate_async(client, operation, key, fields, **kwargs):
+    """_paginate() for an aiobotocore client"""
+    items = []
+    async for page in client.get_paginator(operation).paginate(**kwargs):
+        items.extend(_compact(item) for item in _projection(key, fields).search(page) or ())
+    return items
+
+
+async def _load_listing_async(listing, clients, region, **params):
+    """_load_listing() through an AsyncClientPool"""
+    client = await clients.get(listing.service, region)
+    if listing.paginated:
+        return await _paginate_async(client, listing.operation, listing.key, listing.fields, **params)
+    response = await getattr(client, listing.operation)(**params)
+    return [_compact(item) for item in _projection(listing.key, listing.fields).search(response) or ()]
+
+
+# Inventory name -> loader(clients, region, **params) returning the resources, reduced to the fields scanners read
+INVENTORY_LOADERS = {name: functools.partial(_load_listing, listing) for name, listing in INVENTORY_LISTINGS.items()}
+
+
+def _page_size(size):
+    return {'PaginationConfig': {'PageSize': size}}
+
+
+# Request parameters passed to each loader (also part of the cache key): server-side
+# filters, and the largest page size each API accepts so listings take the fewest calls
+INVENTORY_PARAMS = {
+    'volumes': _page_size(500),
+    'snapshots': dict(_page_size(1000), OwnerIds=['self']),
+    'nat_gateways': dict(_page_size(1000), Filters=[{'Name': 'state', 'Values': ['available']}]),
+    'load_balancers': _page_size(400),
+    'target_groups': _page_size(400),
+    'classic_load_balancers': _page_size(400),
+    'notebook_instances': dict(_page_size(100), StatusEquals='InService'),
+    'log_groups': _page_size(50),
+    'db_instances': _page_size(100),
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _json_object_hook(value):
+    if '__datetime__' in value and len(value) == 1:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+
+def _cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'wastefinder')
+
+
+class InventoryCache:
+    """
+    On-disk SQLite cache of inventory results for incremental rescans.
+
+    Rows are keyed by (account, region, API, parameters) and expire after a
+    per-API TTL (CACHE_TTL), or after `max_age` seconds when given. With
+    `refresh` set every lookup misses, so a run re-fetches and rewrites the
+    cache. Only Describe/List inventories are cached; CloudWatch metrics and
+    target health are always queried live.
+
+    The cache is shared by the multi-account worker processes, so it is opened
+    in WAL mode with a long busy timeout, and it is best-effort: a database
+    error is logged and treated as a miss rather than failing the scan.
+    """
+
+    # Seconds a cached inventory stays valid; snapshots change slowly and are the costliest to page
+    CACHE_TTL = {
+        'snapshots': 6 * 3600,
+        'log_groups': 3600,
+        'db_instances': 3600,
+    }
+    DEFAULT_TTL = 900
+
+    def __init__(self, path=None, max_age=None, refresh=False):
+        if path is None:
+            path = os.path.join(_cache_dir(), 'inventory.sqlite')
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_age = max_age
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS inventory ("
+            " account TEXT, region TEXT, api TEXT, params TEXT,"
+            " fetched_at REAL, payload TEXT,"
+            " PRIMARY KEY (account, region, api, params))"
+        )
+        self._conn.commit()
+
+    def ttl(self, api):
+        if self.max_age is not None:
+            return self.max_age
+        return self.CACHE_TTL.get(api, self.DEFAULT_TTL)
+
+    def get(self, account, region, api, params):
+        """Return the cached result, or None when missing, expired or refreshing"""
+        if self.refresh:
+            return None
+        key = (account, region, api, json.dumps(params, sort_keys=True))
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT fetched_at, payload FROM inventory"
+                    " WHERE account = ? AND region = ? AND api = ? AND params = ?", key
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Inventory cache read failed for {api} in {region}: {e}")
+            return None
+        if row is None or time.time() - row[0] > self.ttl(api):
+            return None
+        return json.loads(row[1], object_hook=_json_object_hook)
+
+    def put(self, account, region, api, params, items):
+        payload = json.dumps(items, default=_json_default)
+        key = (account, region, api, json.dumps(params, sort_keys=True))
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO inventory VALUES (?, ?, ?, ?, ?, ?)",
+                    key + (time.time(), payload)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"Inventory cache write failed for {api} in {region}: {e}")
+
+    def options(self):
+        """Constructor arguments, so worker processes can open the same cache"""
+        return {'path': self.path, 'max_age': self.max_age, 'refresh': self.refresh}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+HOURS_PER_MONTH = 730
+
+# AWS Price List database engine names -> RDS API engine names
+PRICE_LIST_ENGINES = {
+    'mysql': 'mysql',
+    'postgresql': 'postgres',
+    'mariadb': 'mariadb',
+    'oracle': 'oracle',
+    'sql server': 'sqlserver',
+    'aurora mysql': 'aurora-mysql',
+    'aurora postgresql': 'aurora-postgresql',
+}
+
+# Price List load balancer product families -> ELBv2 Type values
+PRICE_LIST_LOAD_BALANCERS = {
+    'Load Balancer': 'classic',
+    'Load Balancer-Application': 'application',
+    'Load Balancer-Network': 'network',
+    'Load Balancer-Gateway': 'gateway',
+}
+
+
+# Price List databaseEdition values -> RDS API engine suffixes (oracle-se2, sqlserver-ee)
+PRICE_LIST_EDITIONS = {
+    'enterprise': 'ee',
+    'standard': 'se',
+    'standard one': 'se1',
+    'standard two': 'se2',
+    'express': 'ex',
+    'web': 'web',
+}
+
+# Price List licenseModel values -> RDS API LicenseModel values; open-source engines have none
+PRICE_LIST_LICENSES = {
+    'license included': 'license-included',
+    'bring your own license': 'bring-your-own-license',
+}
+
+
+def _licensed_engine(engine):
+    return engine.startswith(('oracle', 'sqlserver'))
+
+
+def _rds_engine(engine):
+    """RDS engine as priced: Oracle container databases (oracle-ee-cdb) cost the same as their edition"""
+    return engine[:-len('-cdb')] if engine.endswith('-cdb') else engine
+
+
+def _rds_license(engine, license_model):
+    """
+    License model an RDS instance is priced under: Oracle and SQL Server are
+    license-included unless the instance says it brings its own license, and
+    other engines have no license dimension.
+    """
+    if not _licensed_engine(engine):
+        return ''
+    return 'bring-your-own-license' if license_model == 'bring-your-own-license' else 'license-included'
+
+
+def _price_key(service, attributes):
+    """
+    Map one Price List product to the (key, engine, deployment, license) a
+    scanner looks up, or None for products no scanner prices.
+    """
+    family = attributes.get('productFamily', '')
+    usage = attributes.get('usagetype', '')
+    if service == 'AmazonEC2':
+        if family == 'Storage' and attributes.get('volumeApiName'):
+            return f"ebs:{attributes['volumeApiName']}", '', '', ''
+        if family == 'Storage Snapshot' and usage.endswith('EBS:SnapshotUsage'):
+            return 'snapshot', '', '', ''
+        if family == 'NAT Gateway' and usage.endswith('NatGateway-Hours'):
+            return 'nat_gateway', '', '', ''
+    if service == 'AmazonVPC' and usage.endswith('IdleAddress'):
+        return 'elastic_ip', '', '', ''
+    if service == 'AWSELB' and family in PRICE_LIST_LOAD_BALANCERS and usage.endswith('LoadBalancerUsage'):
+        return f"lb:{PRICE_LIST_LOAD_BALANCERS[family]}", '', '', ''
+    if service == 'AmazonSageMaker' and 'Notebk:' in usage:
+        return f"notebook:{usage.split('Notebk:', 1)[1]}", '', '', ''
+    if service == 'AmazonRDS' and family == 'Database Instance' and attributes.get('instanceType'):
+        engine = PRICE_LIST_ENGINES.get(attributes.get('databaseEngine', '').lower())
+        if engine and _licensed_engine(engine):
+            # Editions and license models are priced apart; RDS names the edition in the engine
+            edition = PRICE_LIST_EDITIONS.get(attributes.get('databaseEdition', '').lower())
+            license_model = PRICE_LIST_LICENSES.get(attributes.get('licenseModel', '').lower())
+            if not edition or not license_model:
+                return None
+            return (f"rds:{attributes['instanceType']}", f"{engine}-{edition}",
+                    attributes.get('deploymentOption', ''), license_model)
+        if engine:
+            return f"rds:{attributes['instanceType']}", engine, attributes.get('deploymentOption', ''), ''
+    if service == 'AmazonCloudWatch' and usage.endswith('TimedStorage-ByteHrs'):
+        return 'logs_storage', '', '', ''
+    return None
+
+
+def _monthly_price(unit, price):
+    return price * HOURS_PER_MONTH if unit.lower() in ('hrs', 'hours', 'hour') else price
+
+
+def _csv_attribute(column):
+    """Price List CSV column name -> JSON attribute name ('Volume API Name' -> 'volumeApiName')"""
+    words = column.split()
+    return words[0].lower() + ''.join(word.capitalize() for word in words[1:])
+
+
+class _JsonStream:
+    """
+    Incremental reader for a JSON document too large to load, such as the
+    multi-GB AmazonEC2 offer file. Objects are walked member by member with
+    `members()`; each member's value is then either decoded with `value()`
+    or walked further. Only one member value is held in memory at a time.
+    """
+
+    CHUNK = 1 << 20
+    _WHITESPACE = ' \t\r\n'
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self._f.read(self.CHUNK)
+        self._eof = not chunk
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise ValueError("unexpected end of JSON document")
+            self._fill()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self._pos} of the buffered JSON")
+        self._pos += 1
+
+    def value(self):
+        """Decode the next value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                self._fill()
+                continue
+            # A number cut at the end of the buffer decodes too early
+            if end == len(self._buf) and not self._eof:
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def members(self):
+        """Yield the keys of the next object; the caller consumes each value before asking for the next key"""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"expected ',' or '}}' in JSON object, got {separator!r}")
+
+    def skip(self):
+        """Consume the next value without holding all of it in memory"""
+        if self._peek() == '{':
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+
+class PriceList:
+    """
+    Offline AWS pricing compiled from Price List bulk offer files.
+
+    `ingest()` reads offer files (JSON or CSV, as downloaded from the AWS
+    Price List bulk API) and keeps only the on-demand prices scanners use, as
+    monthly USD in a SQLite table keyed by (service, region, key, engine,
+    deployment, license). The database is opened on the first lookup and hot keys are
+    served from an LRU cache, so runs without a compiled price list pay nothing.
+    """
+
+    def __init__(self, path=None, cache_size=4096):
+        self.path = path or os.path.join(_cache_dir(), 'prices.sqlite')
+        self._conn = None
+        self._lock = threading.Lock()
+        self.monthly = functools.lru_cache(maxsize=cache_size)(self._monthly)
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(prices)")]
+            if columns and 'license' not in columns:
+                # Compiled before prices had a license model; the offers must be ingested again
+                logger.warning(f"Price database {self.path} predates license-model pricing; re-run --ingest-prices")
+                self._conn.execute("DROP TABLE prices")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prices ("
+                " service TEXT, region TEXT, key TEXT, engine TEXT, deployment TEXT, license TEXT, monthly REAL,"
+                " PRIMARY KEY (service, region, key, engine, deployment, license)) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def exists(self):
+        return self.path == ':memory:' or os.path.exists(self.path)
+
+    def _monthly(self, service, region, key, engine='', deployment='', license=''):
+        """Monthly USD price, or None when the price list has no entry"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT monthly FROM prices WHERE service = ? AND region = ? AND key = ?"
+                " AND engine = ? AND deployment = ? AND license = ?",
+                (service, region, key, engine, deployment, license)
+            ).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, path):
+        """Compile one offer file into the price list; returns the number of prices stored"""
+        rows = self._read_csv(path) if path.lower().endswith('.csv') else self._read_json(path)
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            for row in rows:
+                # A few SKUs still share a key (e.g. Aurora standard and I/O-optimized); keep the cheapest
+                conn.execute(
+                    "INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (service, region, key, engine, deployment, license)"
+                    " DO UPDATE SET monthly = MIN(monthly, excluded.monthly)", row
+                )
+                count += 1
+            conn.commit()
+        self.monthly.cache_clear()
+        return count
+
+    @staticmethod
+    def _row(service, attributes, unit, price):
+        region = attributes.get('regionCode')
+        key = _price_key(service, attributes)
+        if not region or key is None:
+            return None
+        return (service, region) + key + (_monthly_price(unit, price),)
+
+    def _read_json(self, path):
+        """
+        Stream a JSON offer: products no scanner prices are dropped as they are
+        read, and only the OnDemand terms of the products kept are decoded.
+        Offer files list products before terms, as the Price List API writes them.
+        """
+        with open(path) as f:
+            stream = _JsonStream(f)
+            offer_code = None
+            products = {}
+            for name in stream.members():
+                if name == 'offerCode':
+                    offer_code = stream.value()
+                elif name == 'products':
+                    for sku in stream.members():
+                        product = stream.value()
+                        attributes = dict(product.get('attributes', {}), productFamily=product.get('productFamily', ''))
+                        service = attributes.get('servicecode') or offer_code
+                        if attributes.get('regionCode') and _price_key(service, attributes) is not None:
+                            products[sku] = (service, attributes)
+                elif name == 'terms':
+                    for term_type in stream.members():
+                        if term_type != 'OnDemand':
+                            stream.skip()
+                            continue
+                        for sku in stream.members():
+                            if sku not in products:
+                                stream.value()
+                                continue
+                            service, attributes = products[sku]
+                            for term in stream.value().values():
+                                for dimension in term.get('priceDimensions', {}).values():
+                                    # Tiered prices: the first tier is what an idle resource pays
+                                    if dimension.get('beginRange', '0') != '0':
+                                        continue
+                                    row = self._row(service, attributes, dimension.get('unit', ''),
+                                                    float(dimension['pricePerUnit'].get('USD', 0)))
+                                    if row:
+                                        yield row
+                        # Nothing after the OnDemand terms is needed
+                        return
+                else:
+                    stream.skip()
+
+    def _read_csv(self, path):
+        with open(path, newline='') as f:
+            # Offer CSVs start with a few metadata lines before the header
+            reader = csv.reader(f)
+            for header in reader:
+                if 'SKU' in header:
+                    break
+            columns = [_csv_attribute(column) for column in header]
+            for values in reader:
+                attributes = dict(zip(columns, values))
+                if attributes.get('termtype') != 'OnDemand' or attributes.get('startingrange', '0') not in ('0', ''):
+                    continue
+                row = self._row(attributes.get('servicecode', ''), attributes, attributes.get('unit', ''),
+                                float(attributes.get('priceperunit') or 0))
+                if row:
+                    yield row
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _config_value(value):
+    # Some Config configuration items wrap enum values as {"value": ...}
+    return value.get('value') if isinstance(value, dict) else value
+
+
+def _config_time(value):
+    # Config returns UTC as '...000Z', which fromisoformat only accepts from Python 3.11
+    return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+
+
+def _config_volume(item):
+    config = item.get('configuration', {})
+    return {
+        'VolumeId': item['resourceId'],
+        'Size': config.get('size'),
+        'VolumeType': config.get('volumeType'),
+        'State': _config_value(config.get('state')),
+        'CreateTime': _config_time(config['createTime']),
+    }
+
+
+def _config_address(item):
+    config = item.get('configuration', {})
+    address = {'PublicIp': config.get('publicIp'), 'AllocationId': config.get('allocationId')}
+    if config.get('associationId'):
+        address['AssociationId'] = config['associationId']
+    return address
+
+
+def _config_db_instance(item):
+    config = item.get('configuration', {})
+    db = {
+        'DBInstanceIdentifier': config.get('dBInstanceIdentifier', item['resourceId']),
+        'DBInstanceClass': config.get('dBInstanceClass'),
+        'Engine': config.get('engine'),
+        'LicenseModel': config.get('licenseModel'),
+        'DBInstanceStatus': config.get('dBInstanceStatus'),
+        'MultiAZ': config.get('multiAZ', False),
+    }
+    if config.get('readReplicaSourceDBInstanceIdentifier'):
+        db['ReadReplicaSourceDBInstanceIdentifier'] = config['readReplicaSourceDBInstanceIdentifier']
+    return db
+
+
+# Inventories the Config backend can answer: (resource type, configuration fields, converter)
+CONFIG_QUERIES = {
+    'volumes': ('AWS::EC2::Volume', ('size', 'volumeType', 'state', 'createTime'), _config_volume),
+    'addresses': ('AWS::EC2::EIP', ('publicIp', 'allocationId', 'associationId'), _config_address),
+    'db_instances': (
+        'AWS::RDS::DBInstance',
+        ('dBInstanceIdentifier', 'dBInstanceClass', 'engine', 'licenseModel', 'dBInstanceStatus', 'multiAZ',
+         'readReplicaSourceDBInstanceIdentifier'),
+        _config_db_instance,
+    ),
+}
+
+
+class ConfigInventoryBackend:
+    """
+    Inventory backend answering Describe-style listings from an AWS Config aggregator.
+
+    Each supported inventory (CONFIG_QUERIES) is fetched with one paginated
+    SelectAggregateResourceConfig query covering every region and account in
+    the aggregator, then split by region. Config only answers for the regions
+    it covers: aggregator sources that last updated successfully, where Config
+    has recorded anything at all. Uncovered regions, inventories Config cannot
+    answer, and any query that fails return None so RegionInventory falls back
+    to the Describe calls. Config records changes with a short delay, so
+    resources changed in the last few minutes may be stale.
+
+    `clients` should be the scanner's ClientPool (with the caller's
+    credentials), so Config calls go through its rate limits and hooks.
+    """
+
+    PAGE_SIZE = 100  # API maximum
+
+    def __init__(self, aggregator=None, clients=None, region=None):
+        self.clients = clients or ClientPool()
+        self.region = region
+        self._aggregator = aggregator
+        self._results = {}
+        self._covered = None
+        self._lock = threading.Lock()
+        self._failed = False
+
+    @property
+    def aggregator(self):
+        """The configured aggregator, or the account's first one"""
+        if self._aggregator is None:
+            config = self.clients.get('config', self.region)
+            aggregators = config.describe_configuration_aggregators()['ConfigurationAggregators']
+            if not aggregators:
+                raise LookupError("no AWS Config aggregator found")
+            self._aggregator = aggregators[0]['ConfigurationAggregatorName']
+        return self._aggregator
+
+    def _select(self, expression):
+        """Every result of one aggregate advanced query, across all pages"""
+        config = self.clients.get('config', self.region)
+        kwargs = {'Expression': expression, 'ConfigurationAggregatorName': self.aggregator, 'Limit': self.PAGE_SIZE}
+        while True:
+            response = config.select_aggregate_resource_config(**kwargs)
+            for result in response['Results']:
+                yield json.loads(result)
+            if not response.get('NextToken'):
+                return
+            kwargs['NextToken'] = response['NextToken']
+
+    def _query(self, name, account):
+        resource_type, fields, convert = CONFIG_QUERIES[name]
+        expression = (
+            "SELECT resourceId, awsRegion, accountId, "
+            + ", ".join(f"configuration.{field}" for field in fields)
+            + f" WHERE resourceType = '{resource_type}'"
+        )
+        if account:
+            expression += f" AND accountId = '{account}'"
+        by_region = {}
+        for item in self._select(expression):
+            by_region.setdefault(item['awsRegion'], []).append(convert(item))
+        return by_region
+
+    def _coverage(self):
+        """
+        Accounts Config has current data for, by region: (account, region) pairs
+        with recorded resources whose aggregator source (the account, or the
+        organization) last updated successfully.
+        """
+        config = self.clients.get('config', self.region)
+        updated = set()
+        kwargs = {'ConfigurationAggregatorName': self.aggregator}
+        while True:
+            response = config.describe_configuration_aggregator_sources_status(**kwargs)
+            for source in response['AggregatedSourceStatusList']:
+                if source.get('LastUpdateStatus') == 'SUCCEEDED':
+                    # An organization source covers every account in the region
+                    account = source['SourceId'] if source.get('SourceType') == 'ACCOUNT' else None
+                    updated.add((account, source['AwsRegion']))
+            if not response.get('NextToken'):
+                break
+            kwargs['NextToken'] = response['NextToken']
+        covered = {}
+        for item in self._select("SELECT accountId, awsRegion, COUNT(*) GROUP BY accountId, awsRegion"):
+            region = item['awsRegion']
+            if (item['accountId'], region) in updated or (None, region) in updated:
+                covered.setdefault(region, set()).add(item['accountId'])
+        return covered
+
+    def covers(self, region, account=None):
+        """Whether Config can answer for the region (for any account when `account` is None)"""
+        accounts = self._covered.get(region, ())
+        return bool(accounts) if account is None else account in accounts
+
+    def options(self):
+        """Constructor arguments, so worker processes can query the same aggregator"""
+        return {'aggregator': self._aggregator, 'region': self.region}
+
+    def load(self, name, region, account=None):
+        """Return the inventory for one region, or None to use the Describe calls"""
+        if name not in CONFIG_QUERIES or self._failed:
+            return None
+        # Only real account IDs narrow the query; unnamed pools see the whole aggregator
+        account = account if account and account.isdigit() else None
+        with self._lock:
+            key = (name, account)
+            if key not in self._results:
+                try:
+                    if self._covered is None:
+                        self._covered = self._coverage()
+                    self._results[key] = self._query(name, account)
+                except Exception as e:
+                    logger.warning(f"AWS Config query failed, using Describe calls instead: {e}")
+                    self._failed = True
+                    return None
+        if not self.covers(region, account):
+            return None
+        return self._results[key].get(region, [])
+
+
+class RegionInventory:
+    """
+    Describe/List results for one region, shared by every scanner in that region.
+
+    Each inventory is fetched lazily and at most once; threads asking for an
+    inventory that is already being fetched wait for that fetch instead of
+    issuing their own. When built with the list of scanners that will run,
+    an inventory is dropped as soon as the last scanner depending on it is done.
+    With an InventoryCache, fresh cached results are used instead of AWS calls;
+    with a backend (e.g. ConfigInventoryBackend), inventories it can answer
+    come from it instead. `derived` maps further names to fn(inventory),
+    computing an inventory from others with more AWS calls (metrics, target
+    health); those always come live from AWS.
+    """
+
+    def __init__(self, clients, region, scanners=None, dependencies=None, cache=None, account=None,
+                 backend=None, derived=None):
+        self.clients = clients
+        self.region = region
+        self.cache = cache
+        self.backend = backend
+        self.derived = derived or {}
+        self.account = account or clients.account
+        self._data = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._dependencies = dependencies or {}
+        self._pending = {}
+        for scanner in scanners or []:
+            for name in self._dependencies.get(scanner, ()):
+                self._pending[name] = self._pending.get(name, 0) + 1
+
+    def get(self, name):
+        """Return the named inventory, fetching it on first use"""
+        if name in self._data:
+            return self._data[name]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._data:
+                self._data[name] = self._load(name)
+            return self._data[name]
+
+    def _load(self, name):
+        if name in self.derived:
+            return self.derived[name](self)
+        items = self._stored(name)
+        if items is None:
+            items = INVENTORY_LOADERS[name](self.clients, self.region, **INVENTORY_PARAMS.get(name, {}))
+            self._store(name, items)
+        return items
+
+    def _stored(self, name):
+        """The inventory from the backend or a fresh cache entry, or None if AWS must be asked"""
+        if self.backend is not None:
+            items = self.backend.load(name, self.region, self.account)
+            if items is not None:
+                return items
+        if self.cache is not None:
+            return self.cache.get(self.account, self.region, name, INVENTORY_PARAMS.get(name, {}))
+        return None
+
+    def _store(self, name, items):
+        if self.cache is not None:
+            self.cache.put(self.account, self.region, name, INVENTORY_PARAMS.get(name, {}), items)
+
+    def release(self, scanner):
+        """Mark a scanner as finished and free inventories nobody else needs"""
+        with self._lock:
+            for name in self._dependencies.get(scanner, ()):
+                if name not in self._pending:
+                    continue
+                self._pending[name] -= 1
+                if self._pending[name] <= 0:
+                    del self._pending[name]
+                    self._data.pop(name, None)
+
+
+class AsyncRegionInventory(RegionInventory):
+    """
+    RegionInventory for AsyncScanEngine.
+
+    Inventories are fetched by coroutines on aiobotocore clients, concurrently
+    and at most once each. prefetch() awaits everything a scanner depends on;
+    the scanner then reads them through the same get() it uses with the
+    threaded engine, which raises the error a fetch hit for the scanner to
+    handle as usual. `derived` functions are coroutines here. The backend and
+    cache block, so they run on `executor` threads.
+    """
+
+    def __init__(self, *args, executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor or _DaemonExecutor()
+
+    def get(self, name):
+        """Return a prefetched inventory"""
+        return self._data[name].result()
+
+    async def fetch(self, name):
+        """Return the named inventory, fetching it on first use"""
+        import asyncio
+        if name not in self._data:
+            self._data[name] = asyncio.ensure_future(self._load_async(name))
+        # Shielded: a scanner giving up at its deadline must not cancel the fetch for the others
+        return await asyncio.shield(self._data[name])
+
+    async def prefetch(self, scanner):
+        """Fetch every inventory `scanner` depends on; failures surface from get()"""
+        import asyncio
+        names = self._dependencies.get(scanner, ())
+        await asyncio.gather(*(self.fetch(name) for name in names), return_exceptions=True)
+
+    async def _load_async(self, name):
+        import asyncio
+        if name in self.derived:
+            return await self.derived[name](self)
+        items = await asyncio.wrap_future(self.executor.submit(self._stored, name))
+        if items is None:
+            items = await _load_listing_async(INVENTORY_LISTINGS[name], self.clients, self.region,
+                                              **INVENTORY_PARAMS.get(name, {}))
+            await asyncio.wrap_future(self.executor.submit(self._store, name, items))
+        return items
+
+
+class MetricBatch:
+    """
+    Collects CloudWatch metric queries and resolves them through GetMetricData.
+
+    Queries are sent in chunks of up to 500 (the API limit per request), each chunk
+    follows NextToken until exhausted, and the datapoints are mapped back to the
+    key each query was added under. This replaces one GetMetricStatistics round
+    trip per resource with one GetMetricData call per 500 metrics.
+    """
+
+    MAX_QUERIES = 500
+
+    def __init__(self, cloudwatch, start_time, end_time, period=86400):
+        self.cloudwatch = cloudwatch
+        self.start_time = start_time
+        self.end_time = end_time
+        self.period = period
+        self._queries = []
+
+    def add(self, key, namespace, metric_name, dimensions, stat):
+        """Queue a metric query; its datapoints are returned under `key`"""
+        self._queries.append((key, {
+            'Metric': {
+                'Namespace': namespace,
+                'MetricName': metric_name,
+                'Dimensions': dimensions,
+            },
+            'Period': self.period,
+            'Stat': stat,
+        }))
+
+    def _requests(self):
+        """Yield ({query ID: key}, GetMetricData arguments) for each chunk of queued queries"""
+        for offset in range(0, len(self._queries), self.MAX_QUERIES):
+            chunk = self._queries[offset:offset + self.MAX_QUERIES]
+            keys_by_id = {}
+            queries = []
+            for index, (key, metric_stat) in enumerate(chunk):
+                query_id = f"q{index}"
+                keys_by_id[query_id] = key
+                queries.append({'Id': query_id, 'MetricStat': metric_stat, 'ReturnData': True})
+
+            yield keys_by_id, {
+                'MetricDataQueries': queries,
+                'StartTime': self.start_time,
+                'EndTime': self.end_time,
+            }
+
+    @staticmethod
+    def _collect(results, keys_by_id, response):
+        for result in response.get('MetricDataResults', []):
+            key = keys_by_id.get(result['Id'])
+            if key is not None:
+                results[key].extend(result.get('Values', []))
+
+    def execute(self):
+        """Run all queued queries and return {key: [datapoint values]}"""
+        results = {key: [] for key, _ in self._queries}
+        for keys_by_id, kwargs in self._requests():
+            while True:
+                response = self.cloudwatch.get_metric_data(**kwargs)
+                self._collect(results, keys_by_id, response)
+                next_token = response.get('NextToken')
+                if not next_token:
+                    break
+                kwargs['NextToken'] = next_token
+        return results
+
+    async def execute_async(self):
+        """execute() for an aiobotocore CloudWatch client"""
+        results = {key: [] for key, _ in self._queries}
+        for keys_by_id, kwargs in self._requests():
+            while True:
+                response = await self.cloudwatch.get_metric_data(**kwargs)
+                self._collect(results, keys_by_id, response)
+                next_token = response.get('NextToken')
+                if not next_token:
+                    break
+                kwargs['NextToken'] = next_token
+        return results
+
+
+# Error codes AWS uses to signal API throttling
+THROTTLE_CODES = frozenset([
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestLimitExceeded',
+    'RequestThrottled', 'RequestThrottledException', 'TooManyRequestsException', 'SlowDown',
+])
+
+
+def _error_code(response):
+    """Return the AWS error code from a botocore (http_response, parsed) pair, if any"""
+    if not response:
+        return None
+    parsed = response[1] or {}
+    return parsed.get('Error', {}).get('Code')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token and return 0 if one is available, else return the seconds until one will be"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        delay = self._take()
+        while delay:
+            time.sleep(delay)
+            delay = self._take()
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits without blocking the event loop"""
+        import asyncio
+        delay = self._take()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = self._take()
+
+
+class RateLimiter:
+    """
+    Per-(service, region) token buckets seeded with known API quotas.
+
+    Attached to every pooled client; each HTTP attempt (including botocore's own
+    retries) takes a token before it is sent.
+    """
+
+    def __init__(self, limits, default=(10, 20)):
+        self.limits = limits
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, service, region):
+        key = (service, region)
+        with self._lock:
+            if key not in self._buckets:
+                rate, burst = self.limits.get(service, self.default)
+                self._buckets[key] = TokenBucket(rate, burst)
+            return self._buckets[key]
+
+    def attach(self, client, service, region):
+        bucket = self.bucket(service, region)
+        client.meta.events.register('before-send', lambda **kwargs: bucket.acquire())
+
+    def attach_async(self, client, service, region):
+        """attach() for aiobotocore clients"""
+        bucket = self.bucket(service, region)
+        client.meta.events.register('before-send', lambda **kwargs: bucket.acquire_async())
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limits on in-flight API calls per (service, region).
+
+    Attached to every pooled client; each HTTP attempt waits for a free slot
+    before it is sent and gives it back once its response (or error) is in,
+    before any retry backoff. Every `increase_every` successful calls raise a
+    limit by one, up to `ceiling_factor` times its starting value; any
+    throttled call halves it (never below one).
+    """
+
+    def __init__(self, initial=None, default=2, ceiling_factor=4, increase_every=20):
+        self.initial = initial or {}
+        self.default = default
+        self.ceiling_factor = ceiling_factor
+        self.increase_every = increase_every
+        self._limits = {}
+        self._successes = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        # The slot held by the calling thread's current attempt, if any
+        self._held = threading.local()
+
+    def _start(self, service):
+        return self.initial.get(service, self.default)
+
+    def limit(self, service, region):
+        return self._limits.get((service, region), self._start(service))
+
+    def ceiling(self, service):
+        """The most calls to `service` that may ever be in flight in one region"""
+        return self._start(service) * self.ceiling_factor
+
+    def acquire(self, service, region, deadline=None):
+        """
+        Block until a call to `service` in `region` may start, and hold its slot
+        on this thread. Raises ScanTimeout if the time.monotonic() `deadline`
+        passes first.
+        """
+        key = (service, region)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        with self._slot_free:
+            if not self._slot_free.wait_for(lambda: self._in_flight.get(key, 0) < self.limit(service, region),
+                                            timeout):
+                raise ScanTimeout("scan task deadline reached waiting for a free API call slot")
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._held.key = key
+
+    def release(self):
+        """Give back the slot held by this thread, if any"""
+        key = getattr(self._held, 'key', None)
+        if key is None:
+            return
+        self._held.key = None
+        with self._slot_free:
+            self._in_flight[key] -= 1
+            self._slot_free.notify_all()
+
+    def on_success(self, service, region):
+        key = (service, region)
+        with self._lock:
+            self._successes[key] = self._successes.get(key, 0) + 1
+            if self._successes[key] >= self.increase_every:
+                self._successes[key] = 0
+                self._limits[key] = min(self.limit(service, region) + 1, self.ceiling(service))
+                self._slot_free.notify_all()
+
+    def on_throttle(self, service, region):
+        key = (service, region)
+        with self._lock:
+            self._successes[key] = 0
+            self._limits[key] = max(1, self.limit(service, region) // 2)
+        logger.debug(f"Throttled by {service} in {region}; concurrency now {self._limits[key]}")
+
+    def _after_call(self, service, region, http_response=None, **kwargs):
+        if http_response is not None and http_response.status_code < 300:
+            self.on_success(service, region)
+
+    def _needs_retry(self, service, region, response=None, **kwargs):
+        # Emitted after every attempt, whatever its outcome
+        self.release()
+        if _error_code(response) in THROTTLE_CODES:
+            self.on_throttle(service, region)
+
+    def attach(self, client, service, region):
+        region = region or client.meta.region_name
+        events = client.meta.events
+        events.register('before-send', lambda **kwargs: self.acquire(service, region, _scan_deadline()))
+        events.register('after-call', lambda **kwargs: self._after_call(service, region, **kwargs))
+        events.register('needs-retry', lambda **kwargs: self._needs_retry(service, region, **kwargs))
+        # An error raised after the attempt was sent (e.g. while parsing) skips needs-retry
+        events.register('after-call-error', lambda **kwargs: self.release())
+
+
+class AsyncConcurrency:
+    """
+    AdaptiveConcurrency's per-(service, region) slots for the coroutines of
+    one event loop, attached to AsyncClientPool clients.
+
+    The limits are the shared AdaptiveConcurrency's, and successes and
+    throttles still feed it; only the waiting is done on an asyncio condition,
+    so thousands of calls can queue for a slot without a thread each.
+    """
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self._in_flight = {}
+        self._slot_free = None
+        # The slot held by the current asyncio task's attempt, if any
+        self._held = contextvars.ContextVar('wastefinder_slot', default=None)
+
+    def _condition(self):
+        # Created on first use, inside the event loop it belongs to
+        if self._slot_free is None:
+            import asyncio
+            self._slot_free = asyncio.Condition()
+        return self._slot_free
+
+    async def acquire(self, service, region):
+        """Wait until a call to `service` in `region` may start, and hold its slot in this task"""
+        key = (service, region)
+        slot_free = self._condition()
+        async with slot_free:
+            await slot_free.wait_for(lambda: self._in_flight.get(key, 0) < self.concurrency.limit(service, region))
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._held.set(key)
+
+    async def release(self):
+        """Give back the slot held by this task, if any"""
+        key = self._held.get()
+        if key is None:
+            return
+        self._held.set(None)
+        slot_free = self._condition()
+        async with slot_free:
+            self._in_flight[key] -= 1
+            slot_free.notify_all()
+
+    async def _after_call(self, service, region, http_response=None, **kwargs):
+        if http_response is not None and http_response.status_code < 300:
+            limit = self.concurrency.limit(service, region)
+            self.concurrency.on_success(service, region)
+            if self.concurrency.limit(service, region) > limit:
+                slot_free = self._condition()
+                async with slot_free:
+                    slot_free.notify_all()
+
+    async def _needs_retry(self, service, region, response=None, **kwargs):
+        await self.release()
+        if _error_code(response) in THROTTLE_CODES:
+            self.concurrency.on_throttle(service, region)
+
+    def attach(self, client, service, region):
+        region = region or client.meta.region_name
+        events = client.meta.events
+        events.register('before-send', lambda **kwargs: self.acquire(service, region))
+        events.register('after-call', lambda **kwargs: self._after_call(service, region, **kwargs))
+        events.register('needs-retry', lambda **kwargs: self._needs_retry(service, region, **kwargs))
+        events.register('after-call-error', lambda **kwargs: self.release())
+
+
+class _ScanContext:
+    """
+    threading.local stand-in whose attributes are ContextVars: per thread as
+    before, and also per asyncio task, so coroutines scanning side by side on
+    one event loop each keep their own scanner, deadline and error
+    """
+
+    def __init__(self, *names):
+        object.__setattr__(self, '_vars', {name: contextvars.ContextVar(f'wastefinder_{name}', default=None)
+                                           for name in names})
+
+    def __getattr__(self, name):
+        try:
+            return self._vars[name].get()
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self._vars[name].set(value)
+
+
+# The scanner running on the current thread or asyncio task, for per-scanner API stats
+_scan_context = _ScanContext('scanner', 'deadline', 'error')
+
+
+def _current_scanner():
+    return getattr(_scan_context, 'scanner', None)
+
+
+def _scan_deadline():
+    return getattr(_scan_context, 'deadline', None)
+
+
+def _scan_failed(error):
+    """Note that the scanner on this thread hit an error: its results are partial, not proof of absence"""
+    _scan_context.error = error
+
+
+# Upper bounds (seconds) of the API latency histogram buckets; one more bucket counts slower calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _percentile(buckets, pct):
+    """Percentile estimated from LATENCY_BUCKETS counts, interpolating linearly within its bucket"""
+    rank = sum(buckets) * pct / 100
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            if i == len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[-1]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - seen) / count
+        seen += count
+    return 0.0
+
+
+class ApiStats:
+    """
+    AWS API call statistics collected from botocore event hooks.
+
+    Calls are keyed by (service, operation, region, scanner). Each key keeps
+    the number of calls, retries, throttled attempts, failed calls, bytes
+    received, total call time and a histogram of call latencies (retries
+    included) over LATENCY_BUCKETS, from which percentiles are estimated.
+    Memory depends only on the number of keys, not on the number of calls.
+    Inventory listings are charged to the scanner that first needed them.
+    """
+
+    COUNTERS = ('calls', 'retries', 'throttles', 'errors', 'bytes')
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def _row(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = dict.fromkeys(self.COUNTERS, 0)
+            row['seconds'] = 0.0
+            row['buckets'] = [0] * (len(LATENCY_BUCKETS) + 1)
+        return row
+
+    @staticmethod
+    def _observe(row, latency):
+        row['seconds'] += latency
+        row['buckets'][bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    @staticmethod
+    def _started(context):
+        return (context or {}).get('wastefinder_stats', (None, None))
+
+    def _before_call(self, context=None, **kwargs):
+        if context is not None:
+            context['wastefinder_stats'] = (time.perf_counter(), _current_scanner())
+
+    def _after_call(self, service, region, http_response=None, parsed=None, model=None, context=None, **kwargs):
+        started, scanner = self._started(context)
+        latency = time.perf_counter() - started if started else 0.0
+        retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        size = 0
+        if http_response is not None:
+            size = http_response.headers.get('content-length')
+            if size is None and not model.has_streaming_output:
+                # The body parsing already read; aiobotocore's `content` would be a coroutine
+                size = len(getattr(http_response, '_content', None) or b'')
+        with self._lock:
+            row = self._row((service, model.name, region, scanner or '-'))
+            row['calls'] += 1
+            row['retries'] += retries
+            row['bytes'] += int(size or 0)
+            if http_response is not None and http_response.status_code >= 300:
+                row['errors'] += 1
+            self._observe(row, latency)
+
+    def _after_call_error(self, service, region, model=None, context=None, **kwargs):
+        # Raised before any response was parsed (e.g. connection errors after retries)
+        started, scanner = self._started(context)
+        with self._lock:
+            row = self._row((service, model.name, region, scanner or '-'))
+            row['calls'] += 1
+            row['errors'] += 1
+            self._observe(row, time.perf_counter() - started if started else 0.0)
+
+    def _needs_retry(self, service, region, response=None, operation=None, request_dict=None, **kwargs):
+        if _error_code(response) in THROTTLE_CODES:
+            _, scanner = self._started((request_dict or {}).get('context'))
+            with self._lock:
+                self._row((service, operation.name, region, scanner or '-'))['throttles'] += 1
+
+    def attach(self, client, service, region):
+        region = region or client.meta.region_name
+        events = client.meta.events
+        events.register('before-call', self._before_call)
+        events.register('after-call', lambda **kwargs: self._after_call(service, region, **kwargs))
+        events.register('after-call-error', lambda **kwargs: self._after_call_error(service, region, **kwargs))
+        events.register('needs-retry', lambda **kwargs: self._needs_retry(service, region, **kwargs))
+
+    def snapshot(self):
+        """Picklable copy of the raw rows, e.g. to send back from a worker process"""
+        with self._lock:
+            return {key: dict(row, buckets=list(row['buckets'])) for key, row in self._rows.items()}
+
+    def merge(self, rows):
+        """Add rows from another ApiStats.snapshot()"""
+        with self._lock:
+            for key, other in rows.items():
+                row = self._row(key)
+                for counter in self.COUNTERS + ('seconds',):
+                    row[counter] += other[counter]
+                row['buckets'] = [a + b for a, b in zip(row['buckets'], other['buckets'])]
+
+    @property
+    def total_calls(self):
+        return sum(row['calls'] for row in self._rows.values())
+
+    def group(self, *dimensions):
+        """
+        Aggregate rows by any of 'service', 'operation', 'region' and 'scanner'.
+        Returns summaries (with their LATENCY_BUCKETS counts) sorted by total
+        time spent, slowest first.
+        """
+        names = ('service', 'operation', 'region', 'scanner')
+        groups = {}
+        for key, row in self.snapshot().items():
+            labels = dict(zip(names, key))
+            group_key = tuple(labels[d] for d in dimensions)
+            merged = groups.get(group_key)
+            if merged is None:
+                groups[group_key] = row
+                continue
+            for counter in self.COUNTERS + ('seconds',):
+                merged[counter] += row[counter]
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], row['buckets'])]
+
+        summaries = []
+        for group_key, row in groups.items():
+            summary = dict(zip(dimensions, group_key))
+            summary.update(row)
+            summary['seconds'] = round(row['seconds'], 3)
+            for pct in (50, 95, 99):
+                summary[f'p{pct}_ms'] = round(_percentile(row['buckets'], pct) * 1000, 1)
+            summaries.append(summary)
+        return sorted(summaries, key=lambda s: s['seconds'], reverse=True)
+
+    def to_dict(self):
+        totals = self.group()
+        return {
+            'totals': totals[0] if totals else dict.fromkeys(self.COUNTERS, 0),
+            'latency_buckets': list(LATENCY_BUCKETS),
+            'by_scanner': self.group('scanner'),
+            'by_region': self.group('region'),
+            'by_operation': self.group('service', 'operation'),
+            'calls': self.group('service', 'operation', 'region', 'scanner'),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def print_summary(self, limit=10):
+        """Print call statistics by scanner, by region and by operation"""
+        report = self.to_dict()
+        totals = report['totals']
+        print("\n" + "="*80)
+        print(" API CALL STATISTICS")
+        print("="*80)
+        print(f" {totals['calls']} calls, {totals['retries']} retries, {totals['throttles']} throttled, "
+              f"{totals['errors']} errors, {totals['bytes'] / 1024:.0f} KiB received")
+
+        for title, rows, label in (
+            ('Scanner', report['by_scanner'], lambda r: r['scanner']),
+            ('Region', report['by_region'][:limit], lambda r: r['region']),
+            ('Operation', report['by_operation'][:limit], lambda r: f"{r['service']}:{r['operation']}"),
+        ):
+            print(f"\n {title:<40} {'calls':>7} {'time':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'retry':>6} {'thr':>5}")
+            for row in rows:
+                print(f" {label(row):<40} {row['calls']:>7} {row['seconds']:>8.1f}s "
+                      f"{row['p50_ms']:>6.0f}ms {row['p95_ms']:>6.0f}ms {row['p99_ms']:>6.0f}ms "
+                      f"{row['retries']:>6} {row['throttles']:>5}")
+        print()
+
+
+# One unit of scheduled work: a single scanner in a single region
+ScanTask = namedtuple('ScanTask', ['region', 'scanner'])
+
+
+class ScanTimeout(Exception):
+    """A scan task ran past its region timeout or the scan deadline"""
+
+
+def _timed_out(task):
+    """A finished future holding ScanTimeout for a task that was abandoned or never started"""
+    future = Future()
+    future.set_exception(ScanTimeout(f"{task.scanner} in {task.region} ran out of time"))
+    return future
+
+
+def _check_deadline(**kwargs):
+    """before-send handler: refuse every further HTTP attempt from a scan task past its deadline"""
+    deadline = _scan_deadline()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise ScanTimeout("scan task deadline reached")
+
+
+def _check_retry_deadline(caught_exception=None, response=None, **kwargs):
+    """needs-retry handler: a failed attempt is not retried once its scan task is past its deadline"""
+    if caught_exception is not None or (response is not None and response[0].status_code >= 300):
+        _check_deadline()
+
+
+def _deadline_hook(client, service, region):
+    """
+    ClientPool hook bounding scan tasks by their deadline. Every attempt is
+    checked, not only every call: a new attempt is refused before it waits for
+    a concurrency slot, and a failed attempt is not retried (nor backed off)
+    once the deadline has passed. The client's connect and read timeouts are
+    already capped to the budget (see ClientPool), so no attempt outlives it
+    by more than one timeout.
+    """
+    events = client.meta.events
+    events.register_first('before-send', _check_deadline)
+    # Last, so AdaptiveConcurrency and ApiStats still see the attempt
+    events.register_last('needs-retry', _check_retry_deadline)
+
+
+class _DaemonExecutor:
+    """
+    Minimal ThreadPoolExecutor stand-in running work on daemon threads.
+
+    ThreadPoolExecutor joins its threads at interpreter exit, so a task
+    abandoned at its deadline would still hold up the process until its AWS
+    calls give up. Here abandoned work is simply dropped at exit. Idle threads
+    are reused; a new one is started whenever none is idle, up to max_workers
+    (no limit when None).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._work = queue.SimpleQueue()
+        self._threads = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._work.put((future, fn, args))
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+            elif self.max_workers is None or self._threads < self.max_workers:
+                self._threads += 1
+                threading.Thread(target=self._worker, daemon=True).start()
+        return future
+
+    def map(self, fn, items):
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _worker(self):
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                self._idle += 1
+
+    def shutdown(self):
+        """Stop idle threads once the queued work is done; busy threads finish their task first"""
+        with self._lock:
+            threads = self._threads
+        for _ in range(threads):
+            self._work.put(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+class TaskScheduler:
+    """
+    Runs (region, scanner) tasks on one global pool of daemon worker threads.
+
+    Per-service limits apply to the API calls the tasks make (see
+    AdaptiveConcurrency), not to the tasks themselves.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def run(self, tasks, fn, deadline=None):
+        """
+        Run fn(task) for every task, yielding (task, future) as each one finishes.
+        
+        deadline(task), called as each task is dispatched, returns the
+        time.monotonic() by which it must finish, or None. A task already past
+        its deadline is not started, and one still running at its deadline is
+        abandoned (its daemon thread is left to wind down and never delays
+        interpreter exit); both are yielded with a future holding ScanTimeout.
+        """
+        pending = deque(tasks)
+        in_flight = {}
+        deadlines = {}
+        
+        # Unbounded: in_flight caps the live tasks, and abandoned ones must not take their slots
+        executor = _DaemonExecutor()
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < self.max_workers:
+                    task = pending.popleft()
+                    due = deadline(task) if deadline else None
+                    if due is not None and time.monotonic() >= due:
+                        yield task, _timed_out(task)
+                        continue
+                    future = executor.submit(fn, task)
+                    in_flight[future] = task
+                    if due is not None:
+                        deadlines[future] = due
+                if not in_flight:
+                    continue
+                
+                timeout = max(0, min(deadlines.values()) - time.monotonic()) if deadlines else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                expired = [f for f, due in deadlines.items() if f not in done and due <= now]
+                for future in [*done, *expired]:
+                    task = in_flight.pop(future)
+                    deadlines.pop(future, None)
+                    yield task, future if future in done else _timed_out(task)
+        finally:
+            # Only abandoned tasks can still be running; do not wait for them
+            executor.shutdown()
+
+
+class AsyncScanEngine:
+    """
+    asyncio alternative to TaskScheduler, selected with `--engine asyncio`.
+
+    Every (region, scanner) task is a coroutine, and so is every listing,
+    paginator, metric query and target health check it needs: they run on
+    aiobotocore clients (an AsyncClientPool) whose calls wait for a
+    per-(service, region) slot (AsyncConcurrency) and a rate-limit token, so
+    in-flight calls are bounded by those limits rather than by threads. Once
+    a task's inventories are in, its scanner runs unchanged on the event loop,
+    so both engines produce the same findings. The loop runs on its own
+    thread and results are yielded as tasks finish, so callers consume both
+    engines the same way.
+    """
+
+    def __init__(self, clients, executor=None):
+        self.clients = clients
+        # Threads for blocking work the coroutines hand off (inventory backend and cache)
+        self.executor = executor or _DaemonExecutor()
+
+    def run(self, tasks, fn, deadline=None, prepare=None):
+        """
+        Run fn(task) for every task, yielding (task, future) as each one finishes
+        (see TaskScheduler.run). The coroutine `prepare(task)` is awaited first,
+        e.g. to fetch the task's inventories; a task still preparing at its
+        deadline is cancelled.
+        """
+        import asyncio
+        finished = queue.SimpleQueue()
+        loop_thread = threading.Thread(
+            target=asyncio.run, args=(self._run_all(list(tasks), fn, finished, deadline, prepare),), daemon=True
+        )
+        loop_thread.start()
+        while True:
+            item = finished.get()
+            if item is None:
+                break
+            yield item
+        loop_thread.join()
+
+    async def _run_all(self, tasks, fn, finished, deadline=None, prepare=None):
+        import asyncio
+
+        async def run_one(task):
+            due = deadline(task) if deadline else None
+            future = Future()
+            try:
+                if due is not None and time.monotonic() >= due:
+                    future = _timed_out(task)
+                else:
+                    if prepare is not None:
+                        await asyncio.wait_for(prepare(task), None if due is None else due - time.monotonic())
+                    future.set_result(fn(task))
+            except asyncio.TimeoutError:
+                future = _timed_out(task)
+            except Exception as e:
+                future.set_exception(e)
+            finished.put((task, future))
+
+        try:
+            await asyncio.gather(*(run_one(task) for task in tasks))
+        finally:
+            # Fetches only timed-out tasks were waiting for may still be running
+            current = asyncio.current_task()
+            abandoned = [task for task in asyncio.all_tasks() if task is not current]
+            for task in abandoned:
+                task.cancel()
+            await asyncio.gather(*abandoned, return_exceptions=True)
+            await self.clients.close()
+            self.executor.shutdown()
+            finished.put(None)
+
+
+def _days_since(timestamp):
+    return (datetime.now(timestamp.tzinfo) - timestamp).days
+
+
+class Finding(Mapping):
+    """
+    One waste finding.
+
+    Findings only keep the raw fields they were built from; the display
+    strings (`details`, `age`, `action`) are rendered on access. Repeated
+    strings such as region names and volume types are interned, so large
+    scans hold one copy of each. Behaves as a read-only mapping with the
+    keys 'type', 'id', 'region', 'details', 'age', 'monthly_cost', 'action'
+    and, once set, 'account'.
+    """
+
+    __slots__ = ('id', 'region', 'monthly_cost', 'account')
+    TYPE = None
+    KEYS = ('type', 'id', 'region', 'details', 'age', 'monthly_cost', 'action')
+
+    def __init__(self, id, region, monthly_cost):
+        self.id = id
+        self.region = sys.intern(region)
+        self.monthly_cost = monthly_cost
+        self.account = None
+
+    @property
+    def type(self):
+        return self.TYPE
+
+    def __getitem__(self, key):
+        if key in self.KEYS or (key == 'account' and self.account is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.KEYS
+        if self.account is not None:
+            yield 'account'
+
+    def __len__(self):
+        return len(self.KEYS) + (self.account is not None)
+
+    def as_dict(self):
+        """Plain dict copy, built directly rather than key by key through the mapping interface"""
+        data = {
+            'type': self.TYPE, 'id': self.id, 'region': self.region, 'details': self.details,
+            'age': self.age, 'monthly_cost': self.monthly_cost, 'action': self.action,
+        }
+        if self.account is not None:
+            data['account'] = self.account
+        return data
+
+    def to_state(self):
+        """The raw fields and finding class, JSON-serializable with _json_default (see from_state)"""
+        slots = (slot for cls in type(self).__mro__ for slot in cls.__dict__.get('__slots__', ()))
+        return {'class': type(self).__name__, 'fields': {slot: getattr(self, slot) for slot in slots}}
+
+    @staticmethod
+    def from_state(state):
+        """Rebuild a finding saved with to_state"""
+        cls = {cls.__name__: cls for cls in Finding.__subclasses__()}[state['class']]
+        finding = cls.__new__(cls)
+        for slot, value in state['fields'].items():
+            setattr(finding, slot, value)
+        return finding
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class VolumeFinding(Finding):
+    __slots__ = ('size_gb', 'volume_type', 'created')
+    TYPE = 'EBS Volume'
+
+    def __init__(self, id, region, monthly_cost, size_gb, volume_type, created):
+        super().__init__(id, region, monthly_cost)
+        self.size_gb = size_gb
+        self.volume_type = sys.intern(volume_type)
+        self.created = created
+
+    details = property(lambda self: f"{self.size_gb} GB ({self.volume_type})")
+    age = property(lambda self: f"{_days_since(self.created)} days orphaned")
+    action = property(lambda self: f"aws ec2 delete-volume --volume-id {self.id} --region {self.region}")
+
+
+class AddressFinding(Finding):
+    __slots__ = ('allocation_id',)
+    TYPE = 'Elastic IP'
+
+    def __init__(self, id, region, monthly_cost, allocation_id):
+        super().__init__(id, region, monthly_cost)
+        self.allocation_id = allocation_id
+
+    details = property(lambda self: f"Allocation: {self.allocation_id or 'EC2-Classic'}")
+    age = 'Unattached'
+
+    @property
+    def action(self):
+        if self.allocation_id:
+            return f"aws ec2 release-address --allocation-id {self.allocation_id} --region {self.region}"
+        # EC2-Classic IP (legacy) - use public IP to release
+        return f"aws ec2 release-address --public-ip {self.id} --region {self.region}"
+
+
+class LoadBalancerFinding(Finding):
+    __slots__ = ('arn', 'lb_type')
+    TYPE = 'Load Balancer'
+
+    def __init__(self, id, region, monthly_cost, arn, lb_type):
+        super().__init__(id, region, monthly_cost)
+        self.arn = arn
+        self.lb_type = sys.intern(lb_type)
+
+    details = property(lambda self: f"Type: {self.lb_type.upper()}")
+    age = 'No healthy targets'
+    action = property(
+        lambda self: f"aws elbv2 delete-load-balancer --load-balancer-arn {self.arn} --region {self.region}"
+    )
+
+
+class ClassicLoadBalancerFinding(Finding):
+    __slots__ = ()
+    TYPE = 'Load Balancer'
+
+    details = 'Type: CLASSIC'
+    age = 'No registered instances'
+    action = property(lambda self: f"aws elb delete-load-balancer --load-balancer-name {self.id} --region {self.region}")
+
+
+class SnapshotFinding(Finding):
+    __slots__ = ('size_gb', 'started')
+    TYPE = 'EBS Snapshot'
+
+    def __init__(self, id, region, monthly_cost, size_gb, started):
+        super().__init__(id, region, monthly_cost)
+        self.size_gb = size_gb
+        self.started = started
+
+    details = property(lambda self: f"{self.size_gb} GB from deleted volume (WARNING: may be only backup)")
+    age = property(lambda self: f"{_days_since(self.started)} days old")
+    action = property(lambda self: f"aws ec2 delete-snapshot --snapshot-id {self.id} --region {self.region}")
+
+
+class NatGatewayFinding(Finding):
+    __slots__ = ('subnet_id',)
+    TYPE = 'NAT Gateway'
+
+    def __init__(self, id, region, monthly_cost, subnet_id):
+        super().__init__(id, region, monthly_cost)
+        self.subnet_id = subnet_id
+
+    details = property(lambda self: f"Subnet: {self.subnet_id} (0 bytes in/out in 7 days)")
+    age = 'Idle - no traffic'
+    action = property(lambda self: f"aws ec2 delete-nat-gateway --nat-gateway-id {self.id} --region {self.region}")
+
+
+class NotebookFinding(Finding):
+    __slots__ = ('instance_type', 'last_modified')
+    TYPE = 'SageMaker Notebook'
+
+    def __init__(self, id, region, monthly_cost, instance_type, last_modified):
+        super().__init__(id, region, monthly_cost)
+        self.instance_type = sys.intern(instance_type)
+        self.last_modified = last_modified
+
+    details = property(lambda self: f"Instance: {self.instance_type}")
+    age = property(lambda self: f"Running for {_days_since(self.last_modified)} days")
+    action = property(
+        lambda self: f"aws sagemaker stop-notebook-instance --notebook-instance-name {self.id} --region {self.region}"
+    )
+
+
+class LogGroupFinding(Finding):
+    __slots__ = ('stored_gb',)
+    TYPE = 'CloudWatch Logs'
+
+    def __init__(self, id, region, monthly_cost, stored_gb):
+        super().__init__(id, region, monthly_cost)
+        self.stored_gb = stored_gb
+
+    details = property(lambda self: f"{self.stored_gb:.2f} GB stored (infinite retention)")
+    age = 'No retention policy'
+    action = property(
+        lambda self: f"aws logs put-retention-policy --log-group-name '{self.id}' --retention-in-days 30 --region {self.region}"
+    )
+
+
+class DatabaseFinding(Finding):
+    __slots__ = ('instance_class', 'engine', 'multi_az')
+    TYPE = 'RDS Instance'
+
+    def __init__(self, id, region, monthly_cost, instance_class, engine, multi_az):
+        super().__init__(id, region, monthly_cost)
+        self.instance_class = sys.intern(instance_class)
+        self.engine = sys.intern(engine)
+        self.multi_az = multi_az
+
+    details = property(lambda self: f"{self.instance_class} ({self.engine}){' Multi-AZ' if self.multi_az else ''}")
+    age = '0 connections in 7 days'
+    action = property(lambda self: f"aws rds stop-db-instance --db-instance-identifier {self.id} --region {self.region}")
+
+
+# One encoder for every finding written, instead of one per json.dumps() call
+_finding_encoder = json.JSONEncoder(default=str)
+
+
+def _finding_json(finding):
+    return _finding_encoder.encode(finding.as_dict() if isinstance(finding, Finding) else dict(finding))
+
+
+class JsonlSink:
+    """Writes each finding as one JSON line, line-buffered so readers see it immediately"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', buffering=1)
+
+    def write(self, finding):
+        self._file.write(_finding_json(finding) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class FindingsPipeline:
+    """
+    Receives findings as scanners yield them.
+
+    Each finding is handed to every sink straight away and folded into running
+    totals (overall, per waste type, and per (type, region, account) in
+    `totals`). Findings are only retained in memory
+    when `keep` is set, so a streaming run stays flat regardless of account size.
+    Safe to call from many worker threads.
+    """
+
+    def __init__(self, sinks=(), keep=True):
+        self.sinks = list(sinks)
+        self.findings = [] if keep else None
+        self.count = 0
+        self.total_cost = 0.0
+        self.by_type = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def emit(self, finding):
+        with self._lock:
+            self.count += 1
+            self.total_cost += finding['monthly_cost']
+            key = (finding['type'], finding.get('region'), finding.get('account'))
+            for totals in (self.by_type.setdefault(finding['type'], [0, 0.0]), self.totals.setdefault(key, [0, 0.0])):
+                totals[0] += 1
+                totals[1] += finding['monthly_cost']
+            for sink in self.sinks:
+                sink.write(finding)
+            if self.findings is not None:
+                self.findings.append(finding)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class ScanJournal:
+    """
+    Durable record of finished (account, region, scanner) units and their findings.
+
+    Findings are written one row each as they stream in, committed every
+    BATCH findings, so a unit never holds its findings in memory; the unit
+    itself is committed once it finishes. A crashed or killed run can be
+    resumed with `--resume RUN_ID`: finished units are replayed from the
+    journal and only the missing ones are scanned. Units that failed or ran
+    out of time are never marked finished, so they are retried (and the rows
+    they left are cleared first). Journals are SQLite files under
+    ~/.cache/wastefinder/runs, shared by the worker processes of a
+    multi-account run; journals older than MAX_AGE are removed when a new
+    run starts.
+    """
+
+    MAX_AGE = 7 * 86400
+    BATCH = 1000
+
+    def __init__(self, run_id=None, path=None, resume=False):
+        if run_id is None:
+            run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+            if path is None:
+                self.prune()
+        if path is None:
+            if os.path.basename(run_id) != run_id or run_id in ('', '.', '..'):
+                raise ValueError(f"Invalid run ID {run_id!r}")
+            path = os.path.join(_cache_dir(), 'runs', f"{run_id}.sqlite")
+        if resume and not os.path.exists(path):
+            raise FileNotFoundError(f"No journal for run {run_id} at {path}")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.run_id = run_id
+        self.path = path
+        self._lock = threading.Lock()
+        # Several processes append to one journal; wait for each other's commits
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " account TEXT, region TEXT, scanner TEXT, finished_at REAL, PRIMARY KEY (account, region, scanner))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS findings (account TEXT, region TEXT, scanner TEXT, state TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS findings_unit ON findings (account, region, scanner)")
+        self._conn.commit()
+
+    @classmethod
+    def prune(cls, directory=None, max_age=None):
+        """Delete journals not written to for `max_age` seconds (default MAX_AGE)"""
+        directory = directory or os.path.join(_cache_dir(), 'runs')
+        cutoff = time.time() - (cls.MAX_AGE if max_age is None else max_age)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith(('.sqlite', '.sqlite-wal', '.sqlite-shm')) and os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+
+    def unit(self, account, region, scanner):
+        """Start journaling one unit: returns a JournalUnit to add its findings to as they are found"""
+        key = (account or '', region, scanner)
+        with self._lock:
+            # Rows left by an earlier attempt that failed or ran out of time
+            self._conn.execute("DELETE FROM findings WHERE account = ? AND region = ? AND scanner = ?", key)
+            self._conn.commit()
+        return JournalUnit(self, key)
+
+    def _write(self, key, states, finished=False):
+        with self._lock:
+            self._conn.executemany("INSERT INTO findings VALUES (?, ?, ?, ?)", [key + (state,) for state in states])
+            if finished:
+                self._conn.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?)", key + (time.time(),))
+            self._conn.commit()
+
+    def record(self, account, region, scanner, findings):
+        """Commit one finished unit with its findings"""
+        unit = self.unit(account, region, scanner)
+        for finding in findings:
+            unit.add(finding)
+        unit.finish()
+
+    def completed(self, account):
+        """The (region, scanner) units of `account` already finished"""
+        with self._lock:
+            rows = self._conn.execute("SELECT region, scanner FROM units WHERE account = ?", (account or '',)).fetchall()
+        return {(region, scanner) for region, scanner in rows}
+
+    def findings(self, account, region, scanner):
+        """Iterate over the findings of one finished unit, read from the journal in pages"""
+        key = (account or '', region, scanner)
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, state FROM findings WHERE account = ? AND region = ? AND scanner = ? AND rowid > ?"
+                    " ORDER BY rowid LIMIT ?", key + (last, self.BATCH)
+                ).fetchall()
+            for last, state in rows:
+                yield Finding.from_state(json.loads(state, object_hook=_json_object_hook))
+            if len(rows) < self.BATCH:
+                return
+
+    def options(self):
+        """Constructor arguments, so worker processes can open the same journal"""
+        return {'run_id': self.run_id, 'path': self.path, 'resume': True}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JournalUnit:
+    """Findings of one unit on their way into a ScanJournal, flushed every ScanJournal.BATCH findings"""
+
+    def __init__(self, journal, key):
+        self.journal = journal
+        self.key = key
+        self._batch = []
+
+    def add(self, finding):
+        self._batch.append(json.dumps(finding.to_state(), default=_json_default))
+        if len(self._batch) >= self.journal.BATCH:
+            self.journal._write(self.key, self._batch)
+            self._batch = []
+
+    def finish(self):
+        """Flush the remaining findings and mark the unit finished, in one commit"""
+        self.journal._write(self.key, self._batch, finished=True)
+        self._batch = []
+
+
+class BaselineDiff:
+    """
+    Pipeline sink comparing streamed findings with a previous report (`--baseline`).
+
+    Findings are keyed by (account, region, type, id). The baseline is indexed
+    once into a dict and each streamed finding is one hash lookup, so the
+    comparison is linear in both reports and only the differences are kept:
+    `new` findings, `changed` (previous monthly cost, finding) pairs, and the
+    baseline rows never seen again (see resolved). Accepts JSON reports and
+    NDJSON / --jsonl files. Baselines without account IDs are matched on
+    (region, type, id).
+    """
+
+    # Monthly cost differences below this are rounding, not a change
+    COST_TOLERANCE = 0.01
+
+    def __init__(self, path):
+        self.path = path
+        self.generated = None
+        rows = self._rows(path)
+        self._by_account = any(row.get('account') for row in rows)
+        self.baseline = {self._key(row): row for row in rows}
+        self.total_cost = sum(row['monthly_cost'] for row in rows)
+        self.new = []
+        self.changed = []
+        self._seen = set()
+
+    def _rows(self, path):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        try:
+            document = json.loads(text)
+        except json.JSONDecodeError:
+            # NDJSON report or --jsonl stream: one finding per line
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        if isinstance(document, dict) and 'findings' in document:
+            self.generated = document.get('generated')
+            return document['findings']
+        if isinstance(document, dict) and 'id' in document:
+            return [document]
+        raise ValueError(f"{path} is not a WasteFinder JSON or NDJSON report")
+
+    def _key(self, finding):
+        account = finding.get('account') if self._by_account else None
+        return (account, finding['region'], finding['type'], finding['id'])
+
+    def write(self, finding):
+        key = self._key(finding)
+        before = self.baseline.get(key)
+        if before is None:
+            self.new.append(finding)
+            return
+        self._seen.add(key)
+        if abs(finding['monthly_cost'] - before['monthly_cost']) >= self.COST_TOLERANCE:
+            self.changed.append((before['monthly_cost'], finding))
+
+    def resolved(self, covers=None):
+        """Baseline rows not found again, limited to those `covers(row)` says this run looked for"""
+        return [
+            row for key, row in self.baseline.items()
+            if key not in self._seen and (covers is None or covers(row))
+        ]
+
+    def close(self):
+        pass
+
+
+class Report:
+    """
+    Findings grouped once by waste type, shared by every report format.
+
+    Groups keep first-seen order of types and findings. `multi_account` is set
+    when findings come from more than one account, so renderers show accounts.
+    `incomplete` lists the regions whose scanners ran out of time, as
+    {'account', 'region', 'scanners'} records.
+    """
+
+    def __init__(self, findings, total_waste, generated=None, incomplete=()):
+        self.generated = generated or datetime.now()
+        self.total_waste = total_waste
+        self.incomplete = list(incomplete)
+        self.by_type = {}
+        accounts = set()
+        for finding in findings:
+            self.by_type.setdefault(finding['type'], []).append(finding)
+            accounts.add(finding.get('account'))
+        self.count = sum(len(items) for items in self.by_type.values())
+        self.multi_account = len(accounts) > 1
+
+    def findings(self):
+        for items in self.by_type.values():
+            yield from items
+
+    def columns(self):
+        base = ['type', 'id', 'region', 'details', 'age', 'monthly_cost', 'action']
+        return ['account'] + base if self.multi_account else base
+
+
+def _incomplete_lines(incomplete):
+    """'region (account): scanners' for each region that ran out of time"""
+    for record in incomplete:
+        account = f" ({record['account']})" if record.get('account') else ""
+        yield f"{record['region']}{account}: {', '.join(record['scanners'])}"
+
+
+def _write_text(report, out):
+    out.write("AWS WASTEFINDER - WASTE DETECTION REPORT\n")
+    out.write(f"Generated: {report.generated.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    out.write("="*80 + "\n\n")
+    if report.incomplete:
+        out.write("INCOMPLETE SCAN - these regions ran out of time, findings may be missing:\n")
+        out.writelines(f"  {line}\n" for line in _incomplete_lines(report.incomplete))
+        out.write("\n")
+    if not report.count:
+        out.write("No waste detected. Account is clean!\n")
+        return
+    rule = "-"*80 + "\n"
+    for waste_type, items in report.by_type.items():
+        out.write(f"\n{waste_type.upper()} WASTE\n{rule}")
+        for item in items:
+            account = f"Account: {item.get('account')}\n" if report.multi_account else ""
+            out.write(
+                f"\n{account}"
+                f"Resource ID: {item['id']}\n"
+                f"Region: {item['region']}\n"
+                f"Details: {item['details']}\n"
+                f"Status: {item['age']}\n"
+                f"Monthly Cost: ${item['monthly_cost']:.2f}\n"
+                f"Yearly Cost: ${item['monthly_cost']*12:.2f}\n"
+                f"Cleanup Command: {item['action']}\n"
+                f"{rule}"
+            )
+    out.write("\n\nTOTAL SUMMARY\n")
+    out.write("="*80 + "\n")
+    out.write(f"Total Resources: {report.count}\n")
+    out.write(f"Monthly Waste: ${report.total_waste:.2f}\n")
+    out.write(f"Yearly Waste: ${report.total_waste * 12:.2f}\n")
+
+
+def _write_json(report, out):
+    # Streamed: the header and each finding are serialized separately, never the whole document
+    summary = {
+        'generated': report.generated.isoformat(),
+        'total_resources': report.count,
+        'monthly_waste': round(report.total_waste, 2),
+        'yearly_waste': round(report.total_waste * 12, 2),
+        'by_type': {
+            waste_type: {'count': len(items), 'monthly_cost': round(sum(i['monthly_cost'] for i in items), 2)}
+            for waste_type, items in report.by_type.items()
+        },
+        'incomplete': report.incomplete,
+    }
+    out.write(json.dumps(summary, indent=2)[:-2] + ',\n  "findings": [')
+    for index, finding in enumerate(report.findings()):
+        out.write(("," if index else "") + "\n    " + _finding_json(finding))
+    out.write("\n  ]\n}\n")
+
+
+def _write_ndjson(report, out):
+    for finding in report.findings():
+        out.write(_finding_json(finding) + "\n")
+
+
+def _write_csv(report, out):
+    columns = report.columns()
+    writer = csv.writer(out)
+    writer.writerow(columns + ['yearly_cost'])
+    for finding in report.findings():
+        row = finding.as_dict() if isinstance(finding, Finding) else finding
+        writer.writerow([row.get(column, '') for column in columns] + [round(row['monthly_cost'] * 12, 2)])
+
+
+def _markdown_cell(value):
+    return str(value).replace('|', '\\|').replace('\n', ' ')
+
+
+def _write_markdown(report, out):
+    out.write(f"# AWS WasteFinder Report\n\nGenerated: {report.generated.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    out.write(f"**{report.count} resources**, **${report.total_waste:,.2f}/month** "
+              f"(${report.total_waste * 12:,.2f}/year)\n\n")
+    if report.incomplete:
+        out.write("> **Incomplete scan:** these regions ran out of time, findings may be missing:\n")
+        out.writelines(f"> - {_markdown_cell(line)}\n" for line in _incomplete_lines(report.incomplete))
+        out.write("\n")
+    if not report.count:
+        return
+    out.write("| Waste type | Resources | Monthly cost |\n|---|---:|---:|\n")
+    for waste_type, items in report.by_type.items():
+        out.write(f"| {waste_type} | {len(items)} | ${sum(i['monthly_cost'] for i in items):,.2f} |\n")
+    columns = [c for c in report.columns() if c != 'type']
+    for waste_type, items in report.by_type.items():
+        out.write(f"\n## {waste_type}\n\n| {' | '.join(columns)} |\n|{'---|' * len(columns)}\n")
+        for item in items:
+            cells = (f"${item[c]:.2f}" if c == 'monthly_cost' else f"`{item[c]}`" if c == 'action'
+                     else item.get(c, '') for c in columns)
+            out.write("| " + " | ".join(_markdown_cell(cell) for cell in cells) + " |\n")
+
+
+def _write_html(report, out):
+    escape = html.escape
+    out.write(
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>AWS WasteFinder Report</title>\n"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:2em}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;text-align:left}td.cost{text-align:right}</style>\n"
+        "</head><body>\n<h1>AWS WasteFinder Report</h1>\n"
+        f"<p>Generated: {report.generated.strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+        f"<p><strong>{report.count} resources</strong>, <strong>${report.total_waste:,.2f}/month</strong> "
+        f"(${report.total_waste * 12:,.2f}/year)</p>\n"
+    )
+    if report.incomplete:
+        out.write("<p><strong>Incomplete scan:</strong> these regions ran out of time, findings may be missing:</p>\n<ul>\n")
+        out.writelines(f"<li>{escape(line)}</li>\n" for line in _incomplete_lines(report.incomplete))
+        out.write("</ul>\n")
+    columns = [c for c in report.columns() if c != 'type']
+    header = "".join(f"<th>{escape(c)}</th>" for c in columns)
+    for waste_type, items in report.by_type.items():
+        out.write(f"<h2>{escape(waste_type)} ({len(items)})</h2>\n<table><tr>{header}</tr>\n")
+        for item in items:
+            cells = "".join(
+                f"<td class=\"cost\">${item[c]:.2f}</td>" if c == 'monthly_cost'
+                else f"<td><code>{escape(str(item[c]))}</code></td>" if c == 'action'
+                else f"<td>{escape(str(item.get(c, '')))}</td>"
+                for c in columns
+            )
+            out.write(f"<tr>{cells}</tr>\n")
+        out.write("</table>\n")
+    out.write("</body></html>\n")
+
+
+# --format name -> (file extension, renderer)
+REPORT_FORMATS = {
+    'text': ('txt', _write_text),
+    'json': ('json', _write_json),
+    'csv': ('csv', _write_csv),
+    'ndjson': ('ndjson', _write_ndjson),
+    'markdown': ('md', _write_markdown),
+    'html': ('html', _write_html),
+}
+
+
+@contextlib.contextmanager
+def _atomic_write(path, newline=None):
+    """
+    Open a temporary file next to `path` for writing through a large buffer and
+    rename it into place once the block finishes, so a partial file never
+    appears under the final name. On error the temporary file is removed.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.wastefinder-', suffix='.tmp')
+    try:
+        with open(fd, 'w', buffering=1 << 20, newline=newline, encoding='utf-8') as out:
+            yield out
+        # mkstemp creates the file owner-only; give it the mode open() would have
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_report(report, path, fmt='text'):
+    """Render the report to `path` atomically (see _atomic_write)"""
+    _, render = REPORT_FORMATS[fmt]
+    with _atomic_write(path, newline='' if fmt == 'csv' else None) as out:
+        render(report, out)
+    return path
+
+
+def _metric_labels(**labels):
+    """Prometheus label set, with values escaped per the text exposition format"""
+    def escape(value):
+        return str(value or '').replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_metrics(totals, durations=None, incomplete=(), stats=None, started=None, finished=None):
+    """
+    Prometheus text exposition of one scan, from totals the scan already keeps:
+    finding counts and monthly cost by (type, region, account), wall time per
+    (account, region, scanner) task, incomplete regions, and API call counters
+    and latency histograms by (service, operation, region) when `stats` is given.
+    """
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    family('wastefinder_info', 'gauge', 'WasteFinder version.', [(_metric_labels(version=__version__), 1)])
+    family('wastefinder_findings', 'gauge', 'Resources found wasting money.', [
+        (_metric_labels(account=account, region=region, type=waste_type), count)
+        for (waste_type, region, account), (count, _) in sorted(totals.items(), key=lambda item: str(item[0]))
+    ])
+    family('wastefinder_monthly_cost_dollars', 'gauge', 'Estimated monthly cost of the waste found, in USD.', [
+        (_metric_labels(account=account, region=region, type=waste_type), round(cost, 2))
+        for (waste_type, region, account), (_, cost) in sorted(totals.items(), key=lambda item: str(item[0]))
+    ])
+    family('wastefinder_scanner_duration_seconds', 'gauge', 'Wall time of each scanner in each region.', [
+        (_metric_labels(account=account, region=region, scanner=scanner), round(seconds, 3))
+        for (account, region, scanner), seconds in sorted((durations or {}).items(), key=lambda item: str(item[0]))
+    ])
+    family('wastefinder_region_incomplete', 'gauge', 'Scanners that did not finish before their timeout.', [
+        (_metric_labels(account=entry['account'], region=entry['region'], scanner=scanner), 1)
+        for entry in incomplete for scanner in entry['scanners']
+    ])
+    if started and finished:
+        family('wastefinder_scan_duration_seconds', 'gauge', 'Wall time of the last scan.',
+               [('', round((finished - started).total_seconds(), 3))])
+        family('wastefinder_last_scan_timestamp_seconds', 'gauge', 'When the last scan finished, as a Unix time.',
+               [('', round(finished.timestamp(), 3))])
+    if stats is not None:
+        rows = sorted(stats.group('service', 'operation', 'region'),
+                      key=lambda row: str((row['service'], row['operation'], row['region'])))
+        for counter, help_text in (
+            ('calls', 'AWS API calls made.'),
+            ('retries', 'AWS API call retries.'),
+            ('throttles', 'AWS API attempts that were throttled.'),
+            ('errors', 'AWS API calls that failed.'),
+        ):
+            family(f'wastefinder_api_{counter}_total', 'counter', help_text, [
+                (_metric_labels(service=row['service'], operation=row['operation'], region=row['region']), row[counter])
+                for row in rows
+            ])
+        samples = []
+        for row in rows:
+            labels = {'service': row['service'], 'operation': row['operation'], 'region': row['region']}
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), row['buckets']):
+                cumulative += count
+                samples.append((f"_bucket{_metric_labels(**labels, le=bound)}", cumulative))
+            samples.append((f"_sum{_metric_labels(**labels)}", round(row['seconds'], 6)))
+            samples.append((f"_count{_metric_labels(**labels)}", cumulative))
+        family('wastefinder_api_call_duration_seconds', 'histogram', 'AWS API call latency, retries included.', samples)
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path, text):
+    """Replace `path` atomically, as the node_exporter textfile collector expects"""
+    with _atomic_write(path) as out:
+        out.write(text)
+    return path
+
+
+def _target_groups_by_lb(target_groups):
+    """Target group ARNs indexed by the ARN of each load balancer they belong to"""
+    groups_by_lb = {}
+    for tg in target_groups:
+        for lb_arn in tg.get('LoadBalancerArns', []):
+            groups_by_lb.setdefault(lb_arn, []).append(tg['TargetGroupArn'])
+    return groups_by_lb
+
+
+# One waste check: the AWSWasteFinder generator method that yields its findings,
+# the inventories and AWS services it uses, the IAM actions it needs, the Resource
+# Explorer types behind it (for the empty-region probe), its relative cost in AWS
+# API calls per resource beyond the shared listings, whether it reads metrics, and
+# the finding types it reports
+ScannerSpec = namedtuple(
+    'ScannerSpec',
+    ['name', 'method', 'inventories', 'services', 'permissions', 'resource_types', 'cost', 'metrics',
+     'finding_types']
+)
+
+# Registered scanners by name, in the order they are run and listed
+SCANNERS = {}
+
+
+def register_scanner(name, inventories, services, permissions, resource_types=(), cost=0.0, metrics=False,
+                     findings=()):
+    """
+    Decorator registering an AWSWasteFinder `iter_*` method as the scanner `name`
+    that yields the Finding subclasses in `findings`. The method is looked up by
+    name at scan time, so subclasses can override it.
+    """
+    def decorate(method):
+        SCANNERS[name] = ScannerSpec(
+            name, method.__name__, tuple(inventories), tuple(services), tuple(permissions),
+            tuple(resource_types), cost, metrics, tuple(dict.fromkeys(cls.TYPE for cls in findings)),
+        )
+        return method
+    return decorate
+
+
+def select_scanners(only=None, skip=None):
+    """Names of the registered scanners to run: `only` these (default: all) minus `skip`"""
+    unknown = sorted(set(only or ()).union(skip or ()) - set(SCANNERS))
+    if unknown:
+        raise ValueError(f"Unknown scanner(s) {', '.join(unknown)}; expected {', '.join(SCANNERS)}")
+    selected = [name for name in SCANNERS if (not only or name in only) and name not in (skip or ())]
+    if not selected:
+        raise ValueError("No scanners left to run")
+    return selected
+
+
 class AWSWasteFinder:
     """
     AWS WasteFinder scans for unused/idle resources that cost money.
@@ -64,478 +2649,721 @@ class AWSWasteFinder:
         }
     }
     
-    # Rate limiting: seconds to wait between region scans
-    SCAN_DELAY = 0.3
+    # Starting number of API calls in flight to a service within one region;
+    # adjusted at runtime by AdaptiveConcurrency as calls succeed or get throttled
+    SERVICE_CONCURRENCY = {
+        'ec2': 4,
+        'cloudwatch': 2,
+        'elbv2': 2,
+        'elb': 2,
+        'logs': 2,
+        'rds': 2,
+        'sagemaker': 2,
+    }
+    
+    # Global worker budget shared by every (region, scanner) task
+    DEFAULT_WORKERS = 10
     
-    def __init__(self):
+    # Rate limiting: (requests per second, burst) per service and region,
+    # seeded from the published API request quotas
+    API_RATE_LIMITS = {
+        'ec2': (20, 100),        # Non-mutating Describe* actions
+        'cloudwatch': (50, 50),  # GetMetricData
+        'elbv2': (10, 20),
+        'elb': (10, 20),
+        'logs': (10, 10),        # DescribeLogGroups
+        'rds': (10, 20),
+        'sagemaker': (10, 20),
+        'sts': (50, 50),
+    }
+    
+    ENGINES = ('threads', 'asyncio')
+    
+    # Inventories computed from other inventories with further AWS calls, never cached:
+    # name -> (method, coroutine method for AsyncScanEngine), each taking the region inventory
+    DERIVED_INVENTORIES = {
+        'target_health': ('_target_health', '_target_health_async'),
+        'nat_traffic': ('_nat_traffic', '_nat_traffic_async'),
+        'db_connections': ('_db_connections', '_db_connections_async'),
+    }
+    
+    def __init__(self, max_workers=DEFAULT_WORKERS, session_factory=None, service_limits=None, engine='threads',
+                 cache=None, stats=None, prices=None, report_formats=('text',), regions=None,
+                 exclude_regions=None, probe=True, backend=None, scanners=None, region_timeout=None,
+                 scan_deadline=None, journal=None, baseline=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(self.ENGINES)}")
+        self.scanners = select_scanners(scanners)
         self.total_waste = 0
         self.findings = []
+        self.finding_count = 0
+        self.totals_by_type = {}
+        # Running totals by (type, region, account), and (account, region, scanner) task wall times
+        self.totals = {}
+        self.task_durations = {}
+        self.scan_started = None
+        self.scan_finished = None
+        self.max_workers = max_workers
+        self.engine = engine
+        self.cache = cache
+        self.account_id = None
+        self.stats = stats
+        self.prices = prices
+        self.report_formats = tuple(report_formats)
+        self.regions = list(regions or [])
+        self.exclude_regions = set(exclude_regions or [])
+        self.probe = probe
+        self.backend = backend
+        # Seconds each region may take from its first task, and the whole scan may take
+        self.region_timeout = region_timeout
+        self.scan_deadline = scan_deadline
+        self.incomplete = []
+        self.journal = journal
+        self.baseline = baseline
+        # Accounts scanned, and (account, region, scanner) units that hit an error
+        self.scanned_accounts = set()
+        self.failed_units = set()
+        self.rate_limiter = RateLimiter(self.API_RATE_LIMITS)
+        self.concurrency = AdaptiveConcurrency(dict(self.SERVICE_CONCURRENCY, **(service_limits or {})))
+        self._session_factory = session_factory
+        self.clients = self.client_pool(session_factory)
+    
+    def _budget(self):
+        budgets = [budget for budget in (self.region_timeout, self.scan_deadline) if budget is not None]
+        return min(budgets) if budgets else None
+    
+    def client_pool(self, session_factory=None):
+        """
+        A ClientPool whose clients go through this scanner's rate limits,
+        adaptive concurrency, deadline and API statistics hooks
+        """
+        clients = ClientPool(
+            max_workers=self.max_workers,
+            session_factory=session_factory,
+            hooks=[self.concurrency.attach, self.rate_limiter.attach],
+            timeout=self._budget(),
+        )
+        if self._budget() is not None:
+            clients.add_hook(_deadline_hook)
+        if self.stats is not None:
+            clients.add_hook(self.stats.attach)
+        return clients
+    
+    def async_client_pool(self):
+        """client_pool() for AsyncScanEngine: aiobotocore clients with the same limits and hooks"""
+        # Enough connections for the most calls any one service's limit may ever allow
+        ceiling = max(self.concurrency.ceiling(service) for service in self.concurrency.initial)
+        clients = AsyncClientPool(
+            max_connections=max(self.max_workers, ceiling),
+            account=self.clients.account,
+            session_factory=self._session_factory,
+            hooks=[AsyncConcurrency(self.concurrency).attach, self.rate_limiter.attach_async],
+            timeout=self._budget(),
+        )
+        if self._budget() is not None:
+            clients.add_hook(_deadline_hook)
+        if self.stats is not None:
+            clients.add_hook(self.stats.attach)
+        return clients
+    
+    def price(self, service, region, key, default, engine='', deployment='', license=''):
+        """Monthly price from the offline PriceList, or `default` (us-east-1 list prices) without one"""
+        if self.prices is not None:
+            monthly = self.prices.monthly(service, region, key, engine, deployment, license)
+            if monthly is not None:
+                return monthly
+        return default
+    
+    def region_inventory(self, region, scanners=None, engine=None):
+        """Create the shared inventory for one region scan, fetched through `engine` (an AsyncScanEngine) if given"""
+        # The cache is keyed by account, so it is only used once the account is known
+        cache = self.cache if self.account_id else None
+        dependencies = {name: SCANNERS[name].inventories for name in self.scanners}
+        if engine is not None:
+            derived = {name: getattr(self, method) for name, (_, method) in self.DERIVED_INVENTORIES.items()}
+            return AsyncRegionInventory(engine.clients, region, scanners, dependencies, cache, self.account_id,
+                                        self.backend, derived, executor=engine.executor)
+        derived = {name: getattr(self, method) for name, (method, _) in self.DERIVED_INVENTORIES.items()}
+        return RegionInventory(self.clients, region, scanners, dependencies, cache, self.account_id, self.backend,
+                               derived)
         
     def print_banner(self):
-        banner = """
+        categories = f"Scan for Cloud Waste in {len(self.scanners)} Categories"
+        banner = f"""
 ╔═══════════════════════════════════════════════════════════╗
 ║                                                           ║
 ║                 AWS WASTEFINDER                           ║
 ║                                                           ║
-║          Scan for Cloud Waste in 8 Categories             ║
+║          {categories:<49}║
 ║                                                           ║
 ╚═══════════════════════════════════════════════════════════╝
 """
         print(banner)
         
     def get_all_regions(self):
-        """Get list of all AWS regions"""
+        """
+        Get the AWS regions enabled for this account, narrowed to `regions` and
+        without `exclude_regions` when those are set. Opt-in regions the account
+        has not enabled are skipped, since every call there would fail.
+        """
         try:
-            ec2 = boto3.client('ec2', region_name='us-east-1')
-            regions = [region['RegionName'] for region in ec2.describe_regions()['Regions']]
-            return regions
+            ec2 = self.clients.get('ec2', 'us-east-1')
+            regions = [
+                region['RegionName'] for region in ec2.describe_regions(AllRegions=True)['Regions']
+                if region.get('OptInStatus') != 'not-opted-in'
+            ]
         except Exception as e:
             print(f"Error fetching regions: {e}")
-            return ['us-east-1']  # Fallback to default region
+            regions = list(self.regions or ['us-east-1'])  # Fallback to requested or default region
+        
+        if self.regions:
+            disabled = [region for region in self.regions if region not in regions]
+            if disabled:
+                print(f"Skipping regions that are not enabled for this account: {', '.join(disabled)}")
+            regions = [region for region in self.regions if region in regions]
+        return [region for region in regions if region not in self.exclude_regions]
+    
+    def probe_regions(self, regions):
+        """
+        Return the regions that may hold resources, dropping empty ones before any scanner runs.
+        
+        Uses one Resource Explorer search per region against the account's
+        aggregator index (free, and covers the resource types of every selected
+        scanner). Only regions with their own index can be reported empty: a
+        region without one (e.g. newly opted in) returns nothing and is always
+        scanned. Without an aggregator index, or if Resource Explorer fails,
+        every region is kept.
+        """
+        if not self.probe or len(regions) < 2:
+            return regions
+        try:
+            client = self.clients.get('resource-explorer-2', 'us-east-1')
+            indexes = []
+            kwargs = {}
+            while True:
+                page = client.list_indexes(**kwargs)
+                indexes.extend(page['Indexes'])
+                if not page.get('NextToken'):
+                    break
+                kwargs['NextToken'] = page['NextToken']
+        except Exception as e:
+            logger.debug(f"Resource Explorer unavailable, scanning every region: {e}")
+            return regions
+        aggregators = [index['Region'] for index in indexes if index.get('Type') == 'AGGREGATOR']
+        if not aggregators:
+            logger.debug("No Resource Explorer aggregator index, scanning every region")
+            return regions
+        explorer = self.clients.get('resource-explorer-2', aggregators[0])
+        indexed = {index['Region'] for index in indexes}
+        
+        resource_types = dict.fromkeys(t for name in self.scanners for t in SCANNERS[name].resource_types)
+        types = ' '.join(f"resourcetype:{t}" for t in resource_types)
+        
+        def has_resources(region):
+            if region not in indexed:
+                logger.debug(f"No Resource Explorer index in {region}, scanning it")
+                return True
+            try:
+                found = explorer.search(QueryString=f"region:{region} {types}", MaxResults=1)
+                return bool(found['Resources'])
+            except Exception as e:
+                logger.debug(f"Resource Explorer probe failed in {region}, scanning it: {e}")
+                return True
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(regions))) as executor:
+            keep = list(executor.map(has_resources, regions))
+        non_empty = [region for region, found in zip(regions, keep) if found]
+        if len(non_empty) < len(regions):
+            print(f"   Skipping {len(regions) - len(non_empty)} regions with no scannable resources\n")
+        return non_empty
     
-    def scan_ebs_volumes(self, region):
+    @register_scanner('ebs', inventories=('volumes',), services=('ec2',),
+                      permissions=('ec2:DescribeVolumes',), resource_types=('ec2:volume',),
+                      findings=(VolumeFinding,))
+    def iter_ebs_volumes(self, region, inventory=None):
         """
         WASTE TYPE 1: Orphaned EBS Volumes
         These are storage volumes not attached to any EC2 instance
         Cost: $0.08-0.125 per GB/month depending on type
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            ec2 = boto3.client('ec2', region_name=region)
-            paginator = ec2.get_paginator('describe_volumes')
-            
-            for page in paginator.paginate():
-                for vol in page['Volumes']:
-                    if vol['State'] == 'available':  # Not attached to anything
-                        vol_id = vol['VolumeId']
-                        size_gb = vol['Size']
-                        vol_type = vol['VolumeType']
-                        create_time = vol['CreateTime']
-                        
-                        # Cost calculation based on volume type
-                        monthly_cost = size_gb * self.PRICING['ebs_per_gb'].get(vol_type, 0.10)
-                        
-                        days_orphaned = (datetime.now(create_time.tzinfo) - create_time).days
-                        
-                        findings.append({
-                            'type': 'EBS Volume',
-                            'id': vol_id,
-                            'region': region,
-                            'details': f"{size_gb} GB ({vol_type})",
-                            'age': f"{days_orphaned} days orphaned",
-                            'monthly_cost': monthly_cost,
-                            'action': f"aws ec2 delete-volume --volume-id {vol_id} --region {region}"
-                        })
+            for vol in inventory.get('volumes'):
+                if vol['State'] == 'available':  # Not attached to anything
+                    vol_id = vol['VolumeId']
+                    size_gb = vol['Size']
+                    vol_type = vol['VolumeType']
+                    create_time = vol['CreateTime']
+                    
+                    # Cost calculation based on volume type
+                    per_gb = self.price('AmazonEC2', region, f"ebs:{vol_type}", self.PRICING['ebs_per_gb'].get(vol_type, 0.10))
+                    monthly_cost = size_gb * per_gb
+                    
+                    yield VolumeFinding(vol_id, region, monthly_cost, size_gb, vol_type, create_time)
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e):
                 logger.warning(f"Error scanning EBS in {region}: {e}")
         except Exception as e:
-            logger.debug(f"Unexpected error scanning EBS in {region}: {e}")
-            
-        return findings
+            _scan_failed(e)
+            logger.debug(f"Unexpected error scanning EBS in {region}: {e}")
+    
+    def scan_ebs_volumes(self, region, inventory=None):
+        """List form of iter_ebs_volumes"""
+        return list(self.iter_ebs_volumes(region, inventory))
     
-    def scan_elastic_ips(self, region):
+    @register_scanner('eip', inventories=('addresses',), services=('ec2',),
+                      permissions=('ec2:DescribeAddresses',), resource_types=('ec2:elastic-ip',),
+                      findings=(AddressFinding,))
+    def iter_elastic_ips(self, region, inventory=None):
         """
         WASTE TYPE 2: Unused Elastic IPs
         AWS charges $3.60/month for EACH unattached IP (since Feb 2024)
         Cost: $3.60/month per unused IP
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            ec2 = boto3.client('ec2', region_name=region)
-            addresses = ec2.describe_addresses()['Addresses']
-            
-            for addr in addresses:
+            for addr in inventory.get('addresses'):
                 # If no AssociationId, the IP is not attached to anything
                 if 'AssociationId' not in addr:
                     public_ip = addr['PublicIp']
+                    # EC2-Classic IPs don't have AllocationId; the finding releases them by public IP
                     allocation_id = addr.get('AllocationId')
                     
-                    # EC2-Classic IPs don't have AllocationId - handle differently
-                    if allocation_id:
-                        action = f"aws ec2 release-address --allocation-id {allocation_id} --region {region}"
-                    else:
-                        # EC2-Classic IP (legacy) - use public IP to release
-                        action = f"aws ec2 release-address --public-ip {public_ip} --region {region}"
+                    monthly_cost = self.price('AmazonVPC', region, 'elastic_ip', self.PRICING['elastic_ip'])
                     
-                    findings.append({
-                        'type': 'Elastic IP',
-                        'id': public_ip,
-                        'region': region,
-                        'details': f"Allocation: {allocation_id or 'EC2-Classic'}",
-                        'age': 'Unattached',
-                        'monthly_cost': self.PRICING['elastic_ip'],
-                        'action': action
-                    })
+                    yield AddressFinding(public_ip, region, monthly_cost, allocation_id)
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e):
                 logger.warning(f"Error scanning IPs in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning IPs in {region}: {e}")
-            
-        return findings
     
-    def scan_load_balancers(self, region):
+    def scan_elastic_ips(self, region, inventory=None):
+        """List form of iter_elastic_ips"""
+        return list(self.iter_elastic_ips(region, inventory))
+    
+    @register_scanner('load_balancers', inventories=('load_balancers', 'target_health', 'classic_load_balancers'),
+                      services=('elbv2', 'elb'),
+                      permissions=('elasticloadbalancing:DescribeLoadBalancers',
+                                   'elasticloadbalancing:DescribeTargetGroups',
+                                   'elasticloadbalancing:DescribeTargetHealth'),
+                      resource_types=('elasticloadbalancing:loadbalancer', 'elasticloadbalancing:loadbalancer/app',
+                                      'elasticloadbalancing:loadbalancer/net'),
+                      cost=1.0,  # DescribeTargetHealth per target group
+                      findings=(LoadBalancerFinding, ClassicLoadBalancerFinding))
+    def iter_load_balancers(self, region, inventory=None):
         """
         WASTE TYPE 3: Idle Load Balancers
         Load balancers with no active targets cost $16-25/month
         Cost: ~$18/month average
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
             # Check ELBv2 (Application/Network Load Balancers)
-            elbv2 = boto3.client('elbv2', region_name=region)
-            load_balancers = elbv2.describe_load_balancers()['LoadBalancers']
+            load_balancers = inventory.get('load_balancers')
+            if load_balancers:
+                healthy = inventory.get('target_health')
             
             for lb in load_balancers:
                 lb_arn = lb['LoadBalancerArn']
                 lb_name = lb['LoadBalancerName']
                 lb_type = lb['Type']
                 
-                # Check if it has any healthy targets
-                target_groups = elbv2.describe_target_groups(LoadBalancerArn=lb_arn)['TargetGroups']
-                
-                has_healthy_targets = False
-                for tg in target_groups:
-                    tg_arn = tg['TargetGroupArn']
-                    health = elbv2.describe_target_health(TargetGroupArn=tg_arn)['TargetHealthDescriptions']
-                    
-                    if any(t['TargetHealth']['State'] == 'healthy' for t in health):
-                        has_healthy_targets = True
-                        break
-                
-                if not has_healthy_targets:
-                    cost = self.PRICING['load_balancer'].get(lb_type, 18.0)
+                if not healthy[lb_arn]:
+                    cost = self.price('AWSELB', region, f"lb:{lb_type}", self.PRICING['load_balancer'].get(lb_type, 18.0))
                     
-                    findings.append({
-                        'type': 'Load Balancer',
-                        'id': lb_name,
-                        'region': region,
-                        'details': f"Type: {lb_type.upper()}",
-                        'age': 'No healthy targets',
-                        'monthly_cost': cost,
-                        'action': f"aws elbv2 delete-load-balancer --load-balancer-arn {lb_arn} --region {region}"
-                    })
+                    yield LoadBalancerFinding(lb_name, region, cost, lb_arn, lb_type)
             
             # Also check Classic Load Balancers (ELB)
-            elb = boto3.client('elb', region_name=region)
-            classic_lbs = elb.describe_load_balancers()['LoadBalancerDescriptions']
-            
-            for clb in classic_lbs:
+            for clb in inventory.get('classic_load_balancers'):
                 clb_name = clb['LoadBalancerName']
                 instances = clb.get('Instances', [])
                 
                 # Check if Classic LB has any registered instances
                 if not instances:
-                    findings.append({
-                        'type': 'Load Balancer',
-                        'id': clb_name,
-                        'region': region,
-                        'details': 'Type: CLASSIC',
-                        'age': 'No registered instances',
-                        'monthly_cost': self.PRICING['load_balancer']['classic'],
-                        'action': f"aws elb delete-load-balancer --load-balancer-name {clb_name} --region {region}"
-                    })
+                    cost = self.price('AWSELB', region, 'lb:classic', self.PRICING['load_balancer']['classic'])
+                    yield ClassicLoadBalancerFinding(clb_name, region, cost)
                     
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e) and 'AccessDenied' not in str(e):
                 logger.warning(f"Error scanning Load Balancers in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning Load Balancers in {region}: {e}")
-            
-        return findings
     
-    def scan_snapshots(self, region):
+    def scan_load_balancers(self, region, inventory=None):
+        """List form of iter_load_balancers"""
+        return list(self.iter_load_balancers(region, inventory))
+    
+    def _target_health(self, inventory):
+        """Derived inventory: whether each ELBv2 load balancer has any healthy target"""
+        load_balancers = inventory.get('load_balancers')
+        if not load_balancers:
+            return {}
+        return self._elbv2_health(inventory.region, load_balancers, inventory.get('target_groups'))
+    
+    async def _target_health_async(self, inventory):
+        """_target_health() for AsyncScanEngine"""
+        import asyncio
+        load_balancers = await inventory.fetch('load_balancers')
+        if not load_balancers:
+            return {}
+        target_groups = await inventory.fetch('target_groups')
+        elbv2 = await inventory.clients.get('elbv2', inventory.region)
+        groups_by_lb = _target_groups_by_lb(target_groups)
+        
+        async def has_healthy_targets(lb_arn):
+            for tg_arn in groups_by_lb[lb_arn]:
+                health = (await elbv2.describe_target_health(TargetGroupArn=tg_arn))['TargetHealthDescriptions']
+                if any(t['TargetHealth']['State'] == 'healthy' for t in health):
+                    return True
+            return False
+        
+        lb_arns = [lb['LoadBalancerArn'] for lb in load_balancers]
+        healthy = {arn: False for arn in lb_arns if arn not in groups_by_lb}
+        to_check = [arn for arn in lb_arns if arn in groups_by_lb]
+        # One coroutine per load balancer; AsyncConcurrency gates their calls
+        healthy.update(zip(to_check, await asyncio.gather(*(has_healthy_targets(arn) for arn in to_check))))
+        return healthy
+    
+    def _elbv2_health(self, region, load_balancers, target_groups):
+        """
+        Map each ELBv2 load balancer ARN to whether it has any healthy target.
+        
+        Target groups come from one region-wide listing indexed by load balancer,
+        and target health is checked concurrently across load balancers, stopping
+        at the first healthy target group of each one.
+        """
+        elbv2 = self.clients.get('elbv2', region)
+        groups_by_lb = _target_groups_by_lb(target_groups)
+        
+        scanner = _current_scanner()
+        deadline = _scan_deadline()
+        
+        def has_healthy_targets(lb_arn):
+            _scan_context.scanner = scanner
+            _scan_context.deadline = deadline
+            for tg_arn in groups_by_lb.get(lb_arn, []):
+                health = elbv2.describe_target_health(TargetGroupArn=tg_arn)['TargetHealthDescriptions']
+                if any(t['TargetHealth']['State'] == 'healthy' for t in health):
+                    return True
+            return False
+        
+        lb_arns = [lb['LoadBalancerArn'] for lb in load_balancers]
+        healthy = {arn: False for arn in lb_arns if arn not in groups_by_lb}
+        to_check = [arn for arn in lb_arns if arn in groups_by_lb]
+        if to_check:
+            # As many threads as the elbv2 limit may grow to; the limit itself gates their calls
+            workers = min(self.concurrency.ceiling('elbv2'), len(to_check))
+            with _DaemonExecutor(max_workers=workers) as executor:
+                healthy.update(zip(to_check, executor.map(has_healthy_targets, to_check)))
+        return healthy
+    
+    @register_scanner('snapshots', inventories=('volumes', 'snapshots'), services=('ec2',),
+                      permissions=('ec2:DescribeSnapshots', 'ec2:DescribeVolumes'), resource_types=('ec2:snapshot',),
+                      findings=(SnapshotFinding,))
+    def iter_snapshots(self, region, inventory=None):
         """
         WASTE TYPE 4: Old EBS Snapshots
         Snapshots from deleted volumes accumulate costs
         Cost: $0.05 per GB/month
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            ec2 = boto3.client('ec2', region_name=region)
-            
-            # Get all current volume IDs using pagination
-            current_volume_ids = set()
-            vol_paginator = ec2.get_paginator('describe_volumes')
-            for page in vol_paginator.paginate():
-                for v in page['Volumes']:
-                    current_volume_ids.add(v['VolumeId'])
+            # Volume inventory is shared with the EBS scanner, so it is only paged once
+            current_volume_ids = {v['VolumeId'] for v in inventory.get('volumes')}
             
             ninety_days_ago = datetime.now(timezone.utc) - timedelta(days=90)
             
-            # Get snapshots owned by this account using pagination
-            snap_paginator = ec2.get_paginator('describe_snapshots')
-            for page in snap_paginator.paginate(OwnerIds=['self']):
-                for snap in page['Snapshots']:
-                    snap_id = snap['SnapshotId']
-                    volume_id = snap.get('VolumeId', 'unknown')
-                    size_gb = snap['VolumeSize']
-                    start_time = snap['StartTime']
+            # Snapshots owned by this account
+            for snap in inventory.get('snapshots'):
+                snap_id = snap['SnapshotId']
+                volume_id = snap.get('VolumeId', 'unknown')
+                size_gb = snap['VolumeSize']
+                start_time = snap['StartTime']
+                
+                # Flag if snapshot is from a deleted volume AND is older than 90 days
+                if volume_id not in current_volume_ids and start_time < ninety_days_ago:
+                    monthly_cost = size_gb * self.price('AmazonEC2', region, 'snapshot', self.PRICING['snapshot_per_gb'])
                     
-                    # Flag if snapshot is from a deleted volume AND is older than 90 days
-                    if volume_id not in current_volume_ids and start_time < ninety_days_ago:
-                        monthly_cost = size_gb * self.PRICING['snapshot_per_gb']
-                        age_days = (datetime.now(start_time.tzinfo) - start_time).days
-                        
-                        findings.append({
-                            'type': 'EBS Snapshot',
-                            'id': snap_id,
-                            'region': region,
-                            'details': f"{size_gb} GB from deleted volume (WARNING: may be only backup)",
-                            'age': f"{age_days} days old",
-                            'monthly_cost': monthly_cost,
-                            'action': f"aws ec2 delete-snapshot --snapshot-id {snap_id} --region {region}"
-                        })
+                    yield SnapshotFinding(snap_id, region, monthly_cost, size_gb, start_time)
                     
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e):
                 logger.warning(f"Error scanning Snapshots in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning Snapshots in {region}: {e}")
-            
-        return findings
     
-    def scan_nat_gateways(self, region):
+    def scan_snapshots(self, region, inventory=None):
+        """List form of iter_snapshots"""
+        return list(self.iter_snapshots(region, inventory))
+    
+    @register_scanner('nat', inventories=('nat_gateways', 'nat_traffic'), services=('ec2', 'cloudwatch'),
+                      permissions=('ec2:DescribeNatGateways', 'cloudwatch:GetMetricData'),
+                      resource_types=('ec2:natgateway',),
+                      cost=2 / MetricBatch.MAX_QUERIES,  # Two metrics per gateway
+                      metrics=True, findings=(NatGatewayFinding,))
+    def iter_nat_gateways(self, region, inventory=None):
         """
         WASTE TYPE 5: Idle NAT Gateways
         NAT Gateways cost $32/month + data charges even if idle
         Cost: ~$32/month
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            ec2 = boto3.client('ec2', region_name=region)
-            cloudwatch = boto3.client('cloudwatch', region_name=region)
-            
-            nat_gateways = ec2.describe_nat_gateways(
-                Filters=[{'Name': 'state', 'Values': ['available']}]
-            )['NatGateways']
-            
-            end_time = datetime.now(timezone.utc)
-            start_time = end_time - timedelta(days=7)
+            nat_gateways = inventory.get('nat_gateways')
+            if not nat_gateways:
+                return
+            traffic = inventory.get('nat_traffic')
             
             for nat in nat_gateways:
                 nat_id = nat['NatGatewayId']
                 subnet_id = nat['SubnetId']
                 
-                # Check BOTH outbound AND inbound traffic
-                # NAT is only idle if both are zero
-                bytes_out_response = cloudwatch.get_metric_statistics(
-                    Namespace='AWS/NATGateway',
-                    MetricName='BytesOutToDestination',
-                    Dimensions=[{'Name': 'NatGatewayId', 'Value': nat_id}],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=86400,  # 1 day
-                    Statistics=['Sum']
-                )
-                
-                bytes_in_response = cloudwatch.get_metric_statistics(
-                    Namespace='AWS/NATGateway',
-                    MetricName='BytesInFromDestination',
-                    Dimensions=[{'Name': 'NatGatewayId', 'Value': nat_id}],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=86400,  # 1 day
-                    Statistics=['Sum']
-                )
-                
-                bytes_out = sum([dp['Sum'] for dp in bytes_out_response.get('Datapoints', [])], 0)
-                bytes_in = sum([dp['Sum'] for dp in bytes_in_response.get('Datapoints', [])], 0)
+                bytes_out = sum(traffic[(nat_id, 'out')], 0)
+                bytes_in = sum(traffic[(nat_id, 'in')], 0)
                 
                 # Only flag if BOTH inbound and outbound are 0 (truly idle)
                 if bytes_out == 0 and bytes_in == 0:
-                    findings.append({
-                        'type': 'NAT Gateway',
-                        'id': nat_id,
-                        'region': region,
-                        'details': f"Subnet: {subnet_id} (0 bytes in/out in 7 days)",
-                        'age': 'Idle - no traffic',
-                        'monthly_cost': self.PRICING['nat_gateway'],
-                        'action': f"aws ec2 delete-nat-gateway --nat-gateway-id {nat_id} --region {region}"
-                    })
+                    monthly_cost = self.price('AmazonEC2', region, 'nat_gateway', self.PRICING['nat_gateway'])
+                    yield NatGatewayFinding(nat_id, region, monthly_cost, subnet_id)
                 
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e):
                 logger.warning(f"Error scanning NAT Gateways in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning NAT Gateways in {region}: {e}")
-            
-        return findings
     
-    def scan_sagemaker(self, region):
+    def scan_nat_gateways(self, region, inventory=None):
+        """List form of iter_nat_gateways"""
+        return list(self.iter_nat_gateways(region, inventory))
+    
+    @staticmethod
+    def _nat_metrics(cloudwatch, nat_gateways):
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(days=7)
+        
+        # Check BOTH outbound AND inbound traffic for every gateway in one batch
+        # NAT is only idle if both are zero
+        metrics = MetricBatch(cloudwatch, start_time, end_time)
+        for nat in nat_gateways:
+            dimensions = [{'Name': 'NatGatewayId', 'Value': nat['NatGatewayId']}]
+            metrics.add((nat['NatGatewayId'], 'out'), 'AWS/NATGateway', 'BytesOutToDestination', dimensions, 'Sum')
+            metrics.add((nat['NatGatewayId'], 'in'), 'AWS/NATGateway', 'BytesInFromDestination', dimensions, 'Sum')
+        return metrics
+    
+    def _nat_traffic(self, inventory):
+        """Derived inventory: each NAT gateway's bytes out and in over the last 7 days"""
+        nat_gateways = inventory.get('nat_gateways')
+        if not nat_gateways:
+            return {}
+        return self._nat_metrics(self.clients.get('cloudwatch', inventory.region), nat_gateways).execute()
+    
+    async def _nat_traffic_async(self, inventory):
+        """_nat_traffic() for AsyncScanEngine"""
+        nat_gateways = await inventory.fetch('nat_gateways')
+        if not nat_gateways:
+            return {}
+        cloudwatch = await inventory.clients.get('cloudwatch', inventory.region)
+        return await self._nat_metrics(cloudwatch, nat_gateways).execute_async()
+    
+    @register_scanner('sagemaker', inventories=('notebook_instances',), services=('sagemaker',),
+                      permissions=('sagemaker:ListNotebookInstances',),
+                      resource_types=('sagemaker:notebook-instance',),
+                      findings=(NotebookFinding,))
+    def iter_sagemaker(self, region, inventory=None):
         """
         WASTE TYPE 6: Forgotten SageMaker Notebooks
         ML notebook instances cost $50-500/month if left running
         Cost: Varies by instance type (~$70/month average for ml.t3.medium)
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            sagemaker = boto3.client('sagemaker', region_name=region)
-            notebooks = sagemaker.list_notebook_instances()['NotebookInstances']
-            
-            for nb in notebooks:
+            for nb in inventory.get('notebook_instances'):
                 if nb['NotebookInstanceStatus'] == 'InService':
                     nb_name = nb['NotebookInstanceName']
                     instance_type = nb['InstanceType']
                     last_modified = nb['LastModifiedTime']
                     
-                    days_running = (datetime.now(last_modified.tzinfo) - last_modified).days
-                    
                     # Cost estimation (approximate)
                     sagemaker_pricing = self.PRICING['sagemaker_instances']
-                    monthly_cost = sagemaker_pricing.get(instance_type, sagemaker_pricing['default'])
+                    monthly_cost = self.price('AmazonSageMaker', region, f"notebook:{instance_type}",
+                                              sagemaker_pricing.get(instance_type, sagemaker_pricing['default']))
                     
-                    findings.append({
-                        'type': 'SageMaker Notebook',
-                        'id': nb_name,
-                        'region': region,
-                        'details': f"Instance: {instance_type}",
-                        'age': f"Running for {days_running} days",
-                        'monthly_cost': monthly_cost,
-                        'action': f"aws sagemaker stop-notebook-instance --notebook-instance-name {nb_name} --region {region}"
-                    })
+                    yield NotebookFinding(nb_name, region, monthly_cost, instance_type, last_modified)
                     
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e):
                 logger.warning(f"Error scanning SageMaker in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning SageMaker in {region}: {e}")
-            
-        return findings
     
-    def scan_cloudwatch_logs(self, region):
+    def scan_sagemaker(self, region, inventory=None):
+        """List form of iter_sagemaker"""
+        return list(self.iter_sagemaker(region, inventory))
+    
+    @register_scanner('logs', inventories=('log_groups',), services=('logs',),
+                      permissions=('logs:DescribeLogGroups',), resource_types=('logs:log-group',),
+                      findings=(LogGroupFinding,))
+    def iter_cloudwatch_logs(self, region, inventory=None):
         """
         WASTE TYPE 7: CloudWatch Log Groups with Infinite Retention
         Log groups without retention policy accumulate storage costs forever
         Cost: $0.03 per GB/month
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            logs = boto3.client('logs', region_name=region)
-            paginator = logs.get_paginator('describe_log_groups')
-            
-            for page in paginator.paginate():
-                for group in page['logGroups']:
-                    # If retentionInDays is not set, retention is infinite
-                    if 'retentionInDays' not in group:
-                        group_name = group['logGroupName']
-                        stored_bytes = group.get('storedBytes', 0)
-                        stored_gb = stored_bytes / (1024 ** 3)
+            for group in inventory.get('log_groups'):
+                # If retentionInDays is not set, retention is infinite
+                if 'retentionInDays' not in group:
+                    group_name = group['logGroupName']
+                    stored_bytes = group.get('storedBytes', 0)
+                    stored_gb = stored_bytes / (1024 ** 3)
+                    
+                    # Only flag if there's actual data stored
+                    if stored_bytes > 0:
+                        per_gb = self.price('AmazonCloudWatch', region, 'logs_storage', self.PRICING['cloudwatch_logs_per_gb'])
+                        monthly_cost = stored_gb * per_gb
                         
-                        # Only flag if there's actual data stored
-                        if stored_bytes > 0:
-                            monthly_cost = stored_gb * self.PRICING['cloudwatch_logs_per_gb']
-                            
-                            findings.append({
-                                'type': 'CloudWatch Logs',
-                                'id': group_name,
-                                'region': region,
-                                'details': f"{stored_gb:.2f} GB stored (infinite retention)",
-                                'age': 'No retention policy',
-                                'monthly_cost': monthly_cost,
-                                'action': f"aws logs put-retention-policy --log-group-name '{group_name}' --retention-in-days 30 --region {region}"
-                            })
+                        yield LogGroupFinding(group_name, region, monthly_cost, stored_gb)
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e) and 'AccessDenied' not in str(e):
                 logger.warning(f"Error scanning CloudWatch Logs in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning CloudWatch Logs in {region}: {e}")
-            
-        return findings
     
-    def scan_rds_instances(self, region):
+    def scan_cloudwatch_logs(self, region, inventory=None):
+        """List form of iter_cloudwatch_logs"""
+        return list(self.iter_cloudwatch_logs(region, inventory))
+    
+    @register_scanner('rds', inventories=('db_instances', 'db_connections'), services=('rds', 'cloudwatch'),
+                      permissions=('rds:DescribeDBInstances', 'cloudwatch:GetMetricData'),
+                      resource_types=('rds:db',),
+                      cost=1 / MetricBatch.MAX_QUERIES,  # One metric per instance
+                      metrics=True, findings=(DatabaseFinding,))
+    def iter_rds_instances(self, region, inventory=None):
         """
         WASTE TYPE 8: Idle RDS Instances
         RDS databases with zero connections for 7+ days
         Cost: $12-350+/month depending on instance type
         """
-        findings = []
+        inventory = inventory or self.region_inventory(region)
         try:
-            rds = boto3.client('rds', region_name=region)
-            cloudwatch = boto3.client('cloudwatch', region_name=region)
+            db_instances = inventory.get('db_instances')
+            if not db_instances:
+                return
+            connections = inventory.get('db_connections')
             
-            # Get all RDS instances using pagination
-            paginator = rds.get_paginator('describe_db_instances')
-            
-            end_time = datetime.now(timezone.utc)
-            start_time = end_time - timedelta(days=7)
-            
-            for page in paginator.paginate():
-                for db in page['DBInstances']:
-                    db_id = db['DBInstanceIdentifier']
-                    db_status = db['DBInstanceStatus']
-                    instance_class = db['DBInstanceClass']
-                    engine = db['Engine']
-                    
-                    # Only check running instances
-                    if db_status != 'available':
-                        continue
-                    
-                    # Skip Read Replicas - they may have 0 connections intentionally
-                    if db.get('ReadReplicaSourceDBInstanceIdentifier'):
-                        continue
-                    
-                    # Check CloudWatch for database connections in last 7 days
-                    response = cloudwatch.get_metric_statistics(
-                        Namespace='AWS/RDS',
-                        MetricName='DatabaseConnections',
-                        Dimensions=[{'Name': 'DBInstanceIdentifier', 'Value': db_id}],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=86400,  # 1 day
-                        Statistics=['Maximum']
-                    )
+            for db in self._rds_candidates(db_instances):
+                db_id = db['DBInstanceIdentifier']
+                instance_class = db['DBInstanceClass']
+                engine = db['Engine']
+                
+                # Check if there were any connections
+                max_connections = max(connections[db_id], default=0)
+                
+                if max_connections == 0:
+                    # No connections in 7 days - this is idle!
+                    rds_pricing = self.PRICING['rds_instances']
+                    monthly_cost = rds_pricing.get(instance_class, rds_pricing['default'])
                     
-                    # Check if there were any connections
-                    datapoints = response.get('Datapoints', [])
-                    max_connections = max([dp['Maximum'] for dp in datapoints], default=0)
+                    # Check if Multi-AZ (doubles the cost)
+                    if db.get('MultiAZ', False):
+                        monthly_cost *= 2
                     
-                    if max_connections == 0:
-                        # No connections in 7 days - this is idle!
-                        rds_pricing = self.PRICING['rds_instances']
-                        monthly_cost = rds_pricing.get(instance_class, rds_pricing['default'])
-                        
-                        # Check if Multi-AZ (doubles the cost)
-                        if db.get('MultiAZ', False):
-                            monthly_cost *= 2
-                        
-                        findings.append({
-                            'type': 'RDS Instance',
-                            'id': db_id,
-                            'region': region,
-                            'details': f"{instance_class} ({engine}){' Multi-AZ' if db.get('MultiAZ') else ''}",
-                            'age': '0 connections in 7 days',
-                            'monthly_cost': monthly_cost,
-                            'action': f"aws rds stop-db-instance --db-instance-identifier {db_id} --region {region}"
-                        })
+                    # The price list has real per-engine, per-deployment and per-license prices
+                    deployment = 'Multi-AZ' if db.get('MultiAZ', False) else 'Single-AZ'
+                    monthly_cost = self.price('AmazonRDS', region, f"rds:{instance_class}", monthly_cost,
+                                              engine=_rds_engine(engine), deployment=deployment,
+                                              license=_rds_license(engine, db.get('LicenseModel')))
                     
+                    yield DatabaseFinding(db_id, region, monthly_cost, instance_class, engine, db.get('MultiAZ', False))
+                
         except ClientError as e:
+            _scan_failed(e)
             if 'AuthFailure' not in str(e) and 'AccessDenied' not in str(e):
                 logger.warning(f"Error scanning RDS in {region}: {e}")
         except Exception as e:
+            _scan_failed(e)
             logger.debug(f"Unexpected error scanning RDS in {region}: {e}")
+    
+    def scan_rds_instances(self, region, inventory=None):
+        """List form of iter_rds_instances"""
+        return list(self.iter_rds_instances(region, inventory))
+    
+    @staticmethod
+    def _rds_candidates(db_instances):
+        candidates = []
+        for db in db_instances:
+            # Only check running instances
+            if db['DBInstanceStatus'] != 'available':
+                continue
             
-        return findings
+            # Skip Read Replicas - they may have 0 connections intentionally
+            if db.get('ReadReplicaSourceDBInstanceIdentifier'):
+                continue
+            
+            candidates.append(db)
+        return candidates
+    
+    @staticmethod
+    def _rds_metrics(cloudwatch, candidates):
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(days=7)
+        
+        # Check CloudWatch for database connections in last 7 days, all instances in one batch
+        metrics = MetricBatch(cloudwatch, start_time, end_time)
+        for db in candidates:
+            db_id = db['DBInstanceIdentifier']
+            metrics.add(db_id, 'AWS/RDS', 'DatabaseConnections',
+                        [{'Name': 'DBInstanceIdentifier', 'Value': db_id}], 'Maximum')
+        return metrics
+    
+    def _db_connections(self, inventory):
+        """Derived inventory: each candidate RDS instance's peak connections over the last 7 days"""
+        db_instances = inventory.get('db_instances')
+        if not db_instances:
+            return {}
+        candidates = self._rds_candidates(db_instances)
+        return self._rds_metrics(self.clients.get('cloudwatch', inventory.region), candidates).execute()
+    
+    async def _db_connections_async(self, inventory):
+        """_db_connections() for AsyncScanEngine"""
+        db_instances = await inventory.fetch('db_instances')
+        if not db_instances:
+            return {}
+        cloudwatch = await inventory.clients.get('cloudwatch', inventory.region)
+        return await self._rds_metrics(cloudwatch, self._rds_candidates(db_instances)).execute_async()
     
     def scan_region(self, region):
-        """Scan all waste types in a single region"""
+        """Scan every selected waste type in a single region"""
         findings = []
-        findings.extend(self.scan_ebs_volumes(region))
-        findings.extend(self.scan_elastic_ips(region))
-        findings.extend(self.scan_load_balancers(region))
-        findings.extend(self.scan_snapshots(region))
-        findings.extend(self.scan_nat_gateways(region))
-        findings.extend(self.scan_sagemaker(region))
-        findings.extend(self.scan_cloudwatch_logs(region))
-        findings.extend(self.scan_rds_instances(region))
+        inventory = self.region_inventory(region, self.scanners)
+        for name in self.scanners:
+            findings.extend(getattr(self, SCANNERS[name].method)(region, inventory))
+            inventory.release(name)
         return findings
     
     def generate_report(self):
         """Generate formatted console and file report"""
         print("\n" + "="*80)
+        self._print_incomplete()
         
-        if not self.findings:
+        total_count = len(self.findings) or self.finding_count
+        if not total_count:
+            self._print_changes()
             print("\n EXCELLENT NEWS! No waste detected in your AWS account.")
             print("   Your infrastructure is clean and optimized!\n")
             print("="*80)
@@ -544,85 +3372,128 @@ class AWSWasteFinder:
         print("\n WASTE DETECTED - Resources Costing You Money\n")
         print("="*80 + "\n")
         
-        # Group by type
-        by_type = {}
-        for finding in self.findings:
-            waste_type = finding['type']
-            if waste_type not in by_type:
-                by_type[waste_type] = []
-            by_type[waste_type].append(finding)
+        if not self.findings:
+            # Streaming run: findings were not kept, only running totals
+            for waste_type, (count, cost) in self.totals_by_type.items():
+                print(f"  {waste_type:<20} {count:>8} resources   ${cost:,.2f}/month")
+            self._print_changes()
+            self._print_summary(total_count)
+            return
         
-        # Print findings by type
+        # Findings are grouped once and shared by the console and every file format
+        report = Report(self.findings, self.total_waste, incomplete=self.incomplete)
+        
+        # Print findings by type, one buffered write per finding; with a baseline only the changes are shown
+        self._print_changes()
+        out = sys.stdout
+        by_type = report.by_type if self.baseline is None else {}
         for waste_type, items in by_type.items():
-            print(f"\n{'='*80}")
-            print(f"  {waste_type.upper()} WASTE")
-            print(f"{'='*80}\n")
-            
+            out.write(f"\n{'='*80}\n  {waste_type.upper()} WASTE\n{'='*80}\n\n")
             for item in items:
-                print(f"  Resource ID: {item['id']}")
-                print(f"  Region:      {item['region']}")
-                print(f"  Details:     {item['details']}")
-                print(f"  Status:      {item['age']}")
-                print(f"  Cost:     ${item['monthly_cost']:.2f}/month (${item['monthly_cost']*12:.2f}/year)")
-                print(f"  Action:      {item['action']}")
-                print(f"  {'-'*76}")
-        
-        # Summary
-        print(f"\n{'='*80}")
-        print(f"  SUMMARY")
-        print(f"{'='*80}\n")
-        print(f"  Total Resources Found: {len(self.findings)}")
-        print(f"  MONTHLY WASTE:      ${self.total_waste:.2f}")
-        print(f"  YEARLY WASTE:       ${self.total_waste * 12:.2f}")
-        print(f"\n{'='*80}\n")
+                account = f"  Account:     {item.get('account')}\n" if report.multi_account else ""
+                out.write(
+                    f"{account}"
+                    f"  Resource ID: {item['id']}\n"
+                    f"  Region:      {item['region']}\n"
+                    f"  Details:     {item['details']}\n"
+                    f"  Status:      {item['age']}\n"
+                    f"  Cost:     ${item['monthly_cost']:.2f}/month (${item['monthly_cost']*12:.2f}/year)\n"
+                    f"  Action:      {item['action']}\n"
+                    f"  {'-'*76}\n"
+                )
+        
+        self._print_summary(total_count)
         
         # Save to file
-        self.save_report()
+        self.save_report(report)
         
         # Upsell message
         # self.print_upsell()
     
-    def save_report(self):
-        """Save detailed report to file"""
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"aws_waste_report_{timestamp}.txt"
+    def _print_incomplete(self):
+        """Warn about regions that ran out of time, so missing findings are not read as no waste"""
+        if not self.incomplete:
+            return
+        print(f"\n INCOMPLETE SCAN - {len(self.incomplete)} regions ran out of time, findings may be missing:\n")
+        for line in _incomplete_lines(self.incomplete):
+            print(f"  {line}")
+    
+    def _coverage(self):
+        """
+        Predicate: did this run look where a baseline finding was, so that its
+        absence means it was resolved? Timed-out and failed units did not look.
+        """
+        scanner_of = {t: name for name in self.scanners for t in SCANNERS[name].finding_types}
+        incomplete = {(r['account'], r['region'], name) for r in self.incomplete for name in r['scanners']}
+        # A scanner that errored (access denied, throttled, expired credentials) found nothing, which proves nothing
+        incomplete |= self.failed_units
+        incomplete_anywhere = {(region, name) for _, region, name in incomplete}
         
-        with open(filename, 'w') as f:
-            f.write("AWS WASTEFINDER - WASTE DETECTION REPORT\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("="*80 + "\n\n")
-            
-            if not self.findings:
-                f.write("No waste detected. Account is clean!\n")
-            else:
-                by_type = {}
-                for finding in self.findings:
-                    waste_type = finding['type']
-                    if waste_type not in by_type:
-                        by_type[waste_type] = []
-                    by_type[waste_type].append(finding)
-                
-                for waste_type, items in by_type.items():
-                    f.write(f"\n{waste_type.upper()} WASTE\n")
-                    f.write("-"*80 + "\n")
-                    
-                    for item in items:
-                        f.write(f"\nResource ID: {item['id']}\n")
-                        f.write(f"Region: {item['region']}\n")
-                        f.write(f"Details: {item['details']}\n")
-                        f.write(f"Status: {item['age']}\n")
-                        f.write(f"Monthly Cost: ${item['monthly_cost']:.2f}\n")
-                        f.write(f"Yearly Cost: ${item['monthly_cost']*12:.2f}\n")
-                        f.write(f"Cleanup Command: {item['action']}\n")
-                        f.write("-"*80 + "\n")
-                
-                f.write(f"\n\nTOTAL SUMMARY\n")
-                f.write("="*80 + "\n")
-                f.write(f"Total Resources: {len(self.findings)}\n")
-                f.write(f"Monthly Waste: ${self.total_waste:.2f}\n")
-                f.write(f"Yearly Waste: ${self.total_waste * 12:.2f}\n")
+        def covers(row):
+            scanner = scanner_of.get(row['type'])
+            region = row['region']
+            account = row.get('account')
+            if scanner is None or region in self.exclude_regions or (self.regions and region not in self.regions):
+                return False
+            if account:
+                return account in self.scanned_accounts and (account, region, scanner) not in incomplete
+            return (region, scanner) not in incomplete_anywhere
+        return covers
+    
+    def _print_changes(self):
+        """Print what changed since the --baseline report: new, resolved and cost-changed findings"""
+        if self.baseline is None:
+            return
+        diff = self.baseline
+        resolved = diff.resolved(self._coverage())
+        since = f", generated {diff.generated}" if diff.generated else ""
+        print(f"\n CHANGES SINCE BASELINE ({diff.path}{since})\n")
+        
+        def line(row, cost):
+            account = f"{row['account']}  " if row.get('account') else ""
+            return f"    {account}{row['region']:<16} {row['type']:<20} {row['id']:<40} {cost}\n"
+        
+        def signed(amount):
+            return f"{'-' if amount < 0 else '+'}${abs(amount):,.2f}/month"
+        
+        out = sys.stdout
+        sections = [
+            ('NEW', [(f, f['monthly_cost'], f"${f['monthly_cost']:,.2f}/month") for f in diff.new]),
+            ('RESOLVED', [(r, -r['monthly_cost'], f"${r['monthly_cost']:,.2f}/month") for r in resolved]),
+            ('COST CHANGED', [
+                (f, f['monthly_cost'] - before, f"${before:,.2f} -> ${f['monthly_cost']:,.2f}/month")
+                for before, f in diff.changed
+            ]),
+        ]
+        net = 0.0
+        for title, rows in sections:
+            delta = sum(change for _, change, _ in rows)
+            net += delta
+            out.write(f"  {title + f' ({len(rows)})':<24} {signed(delta)}\n")
+            for row, _, cost in rows:
+                out.write(line(row, cost))
+            out.write("\n")
+        print(f"  {'Net change':<24} {signed(net)} (baseline ${diff.total_cost:,.2f}/month)")
+    
+    def _print_summary(self, total_count):
+        print(f"\n{'='*80}")
+        print(f"  SUMMARY")
+        print(f"{'='*80}\n")
+        print(f"  Total Resources Found: {total_count}")
+        print(f"  MONTHLY WASTE:      ${self.total_waste:.2f}")
+        print(f"  YEARLY WASTE:       ${self.total_waste * 12:.2f}")
+        print(f"\n{'='*80}\n")
+    
+    def save_report(self, report=None):
+        """Save the report to one file per configured format (see REPORT_FORMATS)"""
+        report = report or Report(self.findings, self.total_waste, incomplete=self.incomplete)
+        timestamp = report.generated.strftime("%Y-%m-%d_%H-%M-%S")
         
-        print(f" Detailed report saved to: {filename}\n")
+        for fmt in self.report_formats:
+            extension, _ = REPORT_FORMATS[fmt]
+            filename = write_report(report, f"aws_waste_report_{timestamp}.{extension}", fmt)
+            print(f" Detailed report saved to: {filename}")
+        print()
     
     def print_upsell(self):
         """Print upgrade message"""
@@ -641,74 +3512,941 @@ class AWSWasteFinder:
         print("║                                                                         ║")
         print("╚═════════════════════════════════════════════════════════════════════════╝")
     
-    def run(self):
-        """Main execution"""
-        self.print_banner()
+    def scan_regions(self, regions, pipeline=None, progress=True):
+        """
+        Scan every region with every selected scanner, printing progress as regions finish.
+        Findings stream into the pipeline as they are found; returns the pipeline.
         
-        print("Starting comprehensive waste scan...")
-        print("   This will check all AWS regions for 8 types of waste.\n")
+        With `region_timeout` or `scan_deadline`, tasks still running when their
+        budget is spent are abandoned and the scan finishes with the findings it
+        has; regions with abandoned scanners are recorded in `incomplete`.
         
-        # Verify AWS credentials
+        With a `journal`, each finished (region, scanner) unit is recorded with
+        its findings, and units the journal already holds are replayed instead
+        of scanned again.
+        """
+        # Every (region, scanner) pair is its own task on one global worker pool
+        pipeline = pipeline or FindingsPipeline()
+        region_counts = {}
+        completed_count = 0
+        total_regions = len(regions)
+        scanners = self.scanners
+        
+        self.scanned_accounts.add(self.account_id)
+        
+        def unit_failed(task):
+            self.failed_units.add((self.account_id, task.region, task.scanner))
+        
+        # Units finished by an earlier attempt of this run
+        journaled = self.journal.completed(self.account_id) if self.journal else set()
+        to_run = {region: [name for name in scanners if (region, name) not in journaled] for region in regions}
+        for region in regions:
+            for name in scanners:
+                if (region, name) not in journaled:
+                    continue
+                for finding in self.journal.findings(self.account_id, region, name):
+                    pipeline.emit(finding)
+                    region_counts[region] = region_counts.get(region, 0) + 1
+        
+        engine = AsyncScanEngine(self.async_client_pool()) if self.engine == 'asyncio' else None
+        inventories = {
+            region: self.region_inventory(region, names, engine) for region, names in to_run.items() if names
+        }
+        remaining = {region: len(names) for region, names in to_run.items()}
+        failed = set()
+        timed_out = {}
+        
+        scan_due = None if self.scan_deadline is None else time.monotonic() + self.scan_deadline
+        region_started = {}
+        
+        def deadline(task):
+            """The scan deadline, or the task's region timeout counted from the region's first task"""
+            due = scan_due
+            if self.region_timeout is not None:
+                region_due = region_started.setdefault(task.region, time.monotonic()) + self.region_timeout
+                due = region_due if due is None else min(due, region_due)
+            return due
+        timed = self.region_timeout is not None or self.scan_deadline is not None
+        tasks = [
+            ScanTask(region, name)
+            for region in regions
+            for name in to_run[region]
+        ]
+        
+        def run_task(task):
+            inventory = inventories[task.region]
+            count = 0
+            journal = self.journal.unit(self.account_id, task.region, task.scanner) if self.journal else None
+            due = deadline(task) if timed else None
+            started = time.perf_counter()
+            _scan_context.scanner = task.scanner
+            _scan_context.deadline = due
+            _scan_context.error = None
+            try:
+                for finding in getattr(self, SCANNERS[task.scanner].method)(task.region, inventory):
+                    # Nothing is emitted past the deadline, when the task may already be abandoned
+                    if due is not None and time.monotonic() >= due:
+                        raise ScanTimeout(f"{task.scanner} in {task.region} ran out of time")
+                    if self.account_id:
+                        finding.account = self.account_id
+                    pipeline.emit(finding)
+                    if journal:
+                        journal.add(finding)
+                    count += 1
+                # Scanners log and swallow errors, including a ScanTimeout from their AWS calls
+                if due is not None and time.monotonic() >= due:
+                    raise ScanTimeout(f"{task.scanner} in {task.region} ran out of time")
+                # A failed unit is left out of the journal so that --resume scans it again
+                if _scan_context.error is not None:
+                    unit_failed(task)
+                elif journal:
+                    journal.finish()
+            finally:
+                self.task_durations[(self.account_id, task.region, task.scanner)] = time.perf_counter() - started
+                _scan_context.scanner = None
+                _scan_context.deadline = None
+                _scan_context.error = None
+                inventory.release(task.scanner)
+            return count
+        
+        def region_done(region):
+            # Print progress as each region completes
+            nonlocal completed_count
+            inventories.pop(region, None)
+            completed_count += 1
+            if region in timed_out:
+                self.incomplete.append({
+                    'account': self.account_id,
+                    'region': region,
+                    'scanners': [name for name in scanners if name in timed_out[region]],
+                })
+            if not progress:
+                return
+            found = region_counts.get(region, 0)
+            if region in timed_out:
+                print(f"  [{completed_count}/{total_regions}] {region}: Incomplete, found {found} waste items "
+                      f"(timed out: {', '.join(self.incomplete[-1]['scanners'])})")
+            elif region in failed:
+                print(f"  [{completed_count}/{total_regions}] {region}: Error")
+            elif found:
+                print(f"  [{completed_count}/{total_regions}] {region}: Found {found} waste items")
+            else:
+                print(f"  [{completed_count}/{total_regions}] {region}: ✓")
+        
+        # Regions the journal fully covers are done before anything runs
+        for region in regions:
+            if not remaining[region]:
+                region_done(region)
+        
+        async def prefetch(task):
+            # Listings are charged to, and bounded by the deadline of, the scanner that first needs them
+            _scan_context.scanner = task.scanner
+            _scan_context.deadline = deadline(task) if timed else None
+            await inventories[task.region].prefetch(task.scanner)
+        
+        if engine is not None:
+            results = engine.run(tasks, run_task, deadline if timed else None, prefetch)
+        else:
+            results = TaskScheduler(self.max_workers).run(tasks, run_task, deadline if timed else None)
+        for task, future in results:
+            region = task.region
+            try:
+                region_counts[region] = region_counts.get(region, 0) + future.result()
+            except ScanTimeout:
+                timed_out.setdefault(region, set()).add(task.scanner)
+            except Exception as e:
+                logger.warning(f"Error running {task.scanner} in {region}: {e}")
+                failed.add(region)
+                unit_failed(task)
+            
+            remaining[region] -= 1
+            if not remaining[region]:
+                region_done(region)
+        
+        return pipeline
+    
+    def _print_run_id(self):
+        if self.journal:
+            print(f"Run ID: {self.journal.run_id} (if interrupted, continue with --resume {self.journal.run_id})\n")
+    
+    def _connect(self):
+        """Verify AWS credentials and return the caller's account ID (exits on failure)"""
         try:
-            sts = boto3.client('sts')
+            sts = self.clients.get('sts')
             account_id = sts.get_caller_identity()['Account']
             print(f"Connected to AWS Account: {account_id}\n")
+            return account_id
         except Exception as e:
             print("ERROR: Could not connect to AWS.")
             print("\nPlease configure your AWS credentials:")
             print("  Option 1: Run 'aws configure'")
             print("  Option 2: Set environment variables AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY\n")
             sys.exit(1)
+    
+    def _finish(self, pipeline, jsonl_path):
+        """Fold a finished pipeline into the scanner totals and print the report"""
+        pipeline.close()
+        self.scan_finished = datetime.now()
+        
+        # Totals were accumulated as findings streamed in
+        if pipeline.findings:
+            self.findings.extend(pipeline.findings)
+        self.finding_count += pipeline.count
+        self.total_waste += pipeline.total_cost
+        for waste_type, (count, cost) in pipeline.by_type.items():
+            totals = self.totals_by_type.setdefault(waste_type, [0, 0.0])
+            totals[0] += count
+            totals[1] += cost
+        for key, (count, cost) in pipeline.totals.items():
+            totals = self.totals.setdefault(key, [0, 0.0])
+            totals[0] += count
+            totals[1] += cost
+        
+        print("="*80)
+        if jsonl_path:
+            print(f" Findings streamed to: {jsonl_path}")
+        
+        # Generate report
+        self.generate_report()
+    
+    def metrics(self):
+        """The last scan's totals, task times and API counters in Prometheus text format"""
+        totals = {}
+        for (waste_type, region, account), (count, cost) in self.totals.items():
+            entry = totals.setdefault((waste_type, region, account or self.account_id), [0, 0.0])
+            entry[0] += count
+            entry[1] += cost
+        return render_metrics(
+            totals, self.task_durations, self.incomplete, self.stats, self.scan_started, self.scan_finished
+        )
+    
+    def run(self, jsonl_path=None, keep_findings=True):
+        """
+        Main execution.
+        
+        jsonl_path: stream every finding to this file as soon as it is found
+        keep_findings: hold findings in memory for the detailed report; when False
+                       only running totals are kept and the report is a summary
+        """
+        self.print_banner()
+        self._print_run_id()
+        self.scan_started = datetime.now()
+        
+        print("Starting comprehensive waste scan...")
+        print(f"   This will check all AWS regions for {len(self.scanners)} types of waste.\n")
+        
+        # Verify AWS credentials
+        self.account_id = self._connect()
         
         # Get regions and scan
         print("Fetching AWS regions...\n")
         regions = self.get_all_regions()
         print(f"   Found {len(regions)} regions to scan\n")
+        regions = self.probe_regions(regions)
         print("="*80)
         
-        # Use ThreadPoolExecutor for parallel scanning (5 concurrent regions)
-        results = {}
-        completed_count = 0
-        total_regions = len(regions)
-        
-        print(f"Scanning {total_regions} regions in parallel...\n")
+        print(f"Scanning {len(regions)} regions in parallel ({self.max_workers} workers, {self.engine} engine)...\n")
+        sinks = [JsonlSink(jsonl_path)] if jsonl_path else []
+        if self.baseline is not None:
+            sinks.append(self.baseline)
+        pipeline = FindingsPipeline(sinks, keep=keep_findings)
+        try:
+            self.scan_regions(regions, pipeline)
+        finally:
+            self._finish(pipeline, jsonl_path)
+    
+    def run_accounts(self, account_ids, role_name, processes=4, jsonl_path=None, keep_findings=True):
+        """
+        Scan several accounts and produce one merged report.
         
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_region = {
-                executor.submit(self.scan_region, region): region
-                for region in regions
-            }
-            
-            for future in as_completed(future_to_region):
-                region = future_to_region[future]
-                completed_count += 1
-                try:
-                    region_findings = future.result()
-                    results[region] = region_findings
-                    
-                    # Print progress as each region completes
-                    if region_findings:
-                        print(f"  [{completed_count}/{total_regions}] {region}: Found {len(region_findings)} waste items")
-                    else:
-                        print(f"  [{completed_count}/{total_regions}] {region}: ✓")
-                        
-                except Exception as e:
-                    logger.warning(f"Error scanning {region}: {e}")
-                    results[region] = []
-                    print(f"  [{completed_count}/{total_regions}] {region}: Error")
+        Each account is scanned in its own worker process (with its own sessions)
+        through sts:AssumeRole into `role_name`; the caller's own account uses the
+        caller's credentials. Every finding carries its account ID.
+        """
+        self.print_banner()
+        self._print_run_id()
+        self.scan_started = datetime.now()
+        caller_account = self._connect()
+        account_ids = list(dict.fromkeys(account_ids))
+        print(f"Scanning {len(account_ids)} accounts as role '{role_name}' ({processes} processes)...\n")
+        print("="*80)
         
-        # Calculate totals
-        for region in regions:
-            region_findings = results.get(region, [])
-            if region_findings:
-                self.findings.extend(region_findings)
-                self.total_waste += sum(f['monthly_cost'] for f in region_findings)
+        options = {
+            'caller_account': caller_account,
+            'role_name': role_name,
+            'max_workers': self.max_workers,
+            'service_limits': self.concurrency.initial,
+            'engine': self.engine,
+            'cache': self.cache.options() if self.cache else None,
+            'stats': self.stats is not None,
+            'prices': self.prices.path if self.prices else None,
+            'regions': self.regions,
+            'exclude_regions': sorted(self.exclude_regions),
+            'probe': self.probe,
+            'backend': self.backend.options() if self.backend else None,
+            'scanners': self.scanners,
+            'region_timeout': self.region_timeout,
+            'journal': self.journal.options() if self.journal else None,
+            # Wall clock, so accounts that start late share the same overall deadline
+            'scan_deadline_at': None if self.scan_deadline is None else time.time() + self.scan_deadline,
+        }
+        sinks = [JsonlSink(jsonl_path)] if jsonl_path else []
+        if self.baseline is not None:
+            sinks.append(self.baseline)
+        pipeline = FindingsPipeline(sinks, keep=keep_findings)
         
-        print("="*80)
+        def collect(done, account_id, outcome):
+            try:
+                result = outcome()
+            except Exception as e:
+                logger.warning(f"Error scanning account {account_id}: {e}")
+                print(f"  [{done}/{len(account_ids)}] {account_id}: Error")
+                return
+            findings, incomplete = result['findings'], result['incomplete']
+            for finding in findings:
+                pipeline.emit(finding)
+            if result['stats']:
+                self.stats.merge(result['stats'])
+            self.incomplete.extend(incomplete)
+            self.task_durations.update(result['durations'])
+            self.failed_units.update(result['failed'])
+            self.scanned_accounts.add(account_id)
+            cost = sum(f['monthly_cost'] for f in findings)
+            status = f", incomplete in {len(incomplete)} regions" if incomplete else ""
+            print(f"  [{done}/{len(account_ids)}] {account_id}: {len(findings)} waste items (${cost:.2f}/month){status}")
         
-        # Generate report
-        self.generate_report()
+        try:
+            if processes > 1 and len(account_ids) > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    futures = {
+                        executor.submit(_scan_account, account_id, options): account_id
+                        for account_id in account_ids
+                    }
+                    for done, future in enumerate(as_completed(futures), 1):
+                        collect(done, futures[future], future.result)
+            else:
+                for done, account_id in enumerate(account_ids, 1):
+                    collect(done, account_id, lambda: _scan_account(account_id, options))
+        finally:
+            self._finish(pipeline, jsonl_path)
+
+
+def read_account_ids(path):
+    """Read account IDs from a file: one per line, blank lines and # comments ignored"""
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def list_organization_accounts(session=None):
+    """Return the IDs of all ACTIVE accounts in the caller's AWS Organization"""
+    organizations = (session or _load_sdk().Session()).client('organizations')
+    account_ids = []
+    for page in organizations.get_paginator('list_accounts').paginate():
+        account_ids.extend(a['Id'] for a in page['Accounts'] if a['Status'] == 'ACTIVE')
+    return account_ids
+
+
+def assume_role_session_factory(account_id, role_name, base_session=None, session_name='WasteFinder'):
+    """
+    Return a ClientPool session factory for `role_name` in `account_id`.
+    
+    The temporary credentials from sts:AssumeRole are fetched once, shared by
+    every session the factory creates, and refreshed by botocore before expiry.
+    """
+    boto3 = _load_sdk()
+    import botocore.session
+    from botocore.credentials import RefreshableCredentials
+    sts = (base_session or boto3.Session()).client('sts')
+    role_arn = f"arn:aws:iam::{account_id}:role/{role_name}"
+    
+    def fetch():
+        creds = sts.assume_role(RoleArn=role_arn, RoleSessionName=session_name)['Credentials']
+        return {
+            'access_key': creds['AccessKeyId'],
+            'secret_key': creds['SecretAccessKey'],
+            'token': creds['SessionToken'],
+            'expiry_time': creds['Expiration'].isoformat(),
+        }
+    
+    credentials = RefreshableCredentials.create_from_metadata(
+        metadata=fetch(), refresh_using=fetch, method='sts-assume-role'
+    )
+    
+    def factory():
+        botocore_session = botocore.session.get_session()
+        botocore_session._credentials = credentials
+        return boto3.Session(botocore_session=botocore_session)
+    return factory
+
+
+class ScanSnapshot:
+    """
+    Results of one finished scan, as served by `--serve`.
+
+    Every finding is serialized once when the snapshot is built and indexed by
+    region, type and account, so filtered API responses are joined from
+    ready-made JSON instead of re-encoding findings on every request.
+    """
+
+    FILTERS = ('region', 'type', 'account')
+
+    def __init__(self, findings, started, finished, account=None, regions=(), incomplete=(), metrics=None):
+        self.started = started
+        self.finished = finished
+        self.account = account
+        self.regions = list(regions)
+        self.incomplete = list(incomplete)
+        self.metrics = metrics
+        self._json = [_finding_json(finding) for finding in findings]
+        self._costs = [finding['monthly_cost'] for finding in findings]
+        self._types = [finding['type'] for finding in findings]
+        self._regions = [finding['region'] for finding in findings]
+        self._index = {name: {} for name in self.FILTERS}
+        for i, finding in enumerate(findings):
+            for name in self.FILTERS:
+                self._index[name].setdefault(finding.get(name), []).append(i)
+
+    def select(self, **filters):
+        """Indexes of the findings matching every filter (each a collection of accepted values)"""
+        selected = None
+        for name, values in filters.items():
+            if not values:
+                continue
+            matches = set()
+            for value in values:
+                matches.update(self._index[name].get(value, ()))
+            selected = matches if selected is None else selected & matches
+        return range(len(self._json)) if selected is None else sorted(selected)
+
+    def findings_json(self, **filters):
+        """The matching findings with their totals, as a JSON document"""
+        selected = self.select(**filters)
+        cost = sum(self._costs[i] for i in selected)
+        head = json.dumps({
+            'generated': self.finished.isoformat(),
+            'count': len(selected),
+            'monthly_waste': round(cost, 2),
+        })
+        return f"{head[:-1]}, \"findings\": [{', '.join(self._json[i] for i in selected)}]}}"
+
+    def summary(self, **filters):
+        """Totals by type and region for the matching findings, with the scan's metadata"""
+        selected = self.select(**filters)
+        by_type = {}
+        by_region = {}
+        for i in selected:
+            for totals, key in ((by_type, self._types[i]), (by_region, self._regions[i])):
+                entry = totals.setdefault(key, {'count': 0, 'monthly_cost': 0.0})
+                entry['count'] += 1
+                entry['monthly_cost'] += self._costs[i]
+        for totals in (by_type, by_region):
+            for entry in totals.values():
+                entry['monthly_cost'] = round(entry['monthly_cost'], 2)
+        cost = sum(self._costs[i] for i in selected)
+        return {
+            'generated': self.finished.isoformat(),
+            'duration_seconds': round((self.finished - self.started).total_seconds(), 1),
+            'account': self.account,
+            'regions_scanned': len(self.regions),
+            'total_resources': len(selected),
+            'monthly_waste': round(cost, 2),
+            'yearly_waste': round(cost * 12, 2),
+            'by_type': by_type,
+            'by_region': by_region,
+            'incomplete': self.incomplete,
+        }
+
+
+class WasteFinderService:
+    """
+    Resident scanner for `--serve`.
+
+    One AWSWasteFinder is kept for the life of the process, so the SDK, its
+    clients and the account ID are loaded once; the enabled-region list is
+    refreshed every REGION_TTL seconds. A scan runs every `interval` seconds and
+    the latest finished one is served over a small HTTP API:
+
+        GET /findings   findings with totals
+        GET /summary    totals by type and region, scan time and incomplete regions
+        GET /health     200 once a scan has finished, 503 before
+        GET /metrics    the scan's totals and timings in Prometheus text format
+
+    /findings and /summary accept `region`, `type` and `account` filters,
+    repeated or comma-separated. A failed scan keeps the previous results.
+    The metrics are also written to `metrics_file` after each scan if given.
+    """
+
+    REGION_TTL = 6 * 3600
+
+    def __init__(self, scanner, interval=3600, host='127.0.0.1', port=8080, metrics_file=None):
+        self.scanner = scanner
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.metrics_file = metrics_file
+        self.snapshot = None
+        self.next_scan = None
+        self._regions = None
+        self._regions_at = 0.0
+        self._stop = threading.Event()
+        self._server = None
+
+    def regions(self):
+        """Enabled regions, rediscovered once they are REGION_TTL old"""
+        if self._regions is None or time.monotonic() - self._regions_at > self.REGION_TTL:
+            self._regions = self.scanner.get_all_regions()
+            self._regions_at = time.monotonic()
+        return self._regions
+
+    def scan(self):
+        """Run one scan and publish its results"""
+        scanner = self.scanner
+        if scanner.account_id is None:
+            scanner.account_id = scanner._connect()
+        started = scanner.scan_started = datetime.now()
+        regions = scanner.probe_regions(self.regions())
+        scanner.incomplete = []
+        scanner.task_durations = {}
+        pipeline = scanner.scan_regions(regions, FindingsPipeline(), progress=False)
+        scanner.totals = pipeline.totals
+        scanner.scan_finished = datetime.now()
+        metrics = scanner.metrics()
+        snapshot = ScanSnapshot(
+            pipeline.findings, started, scanner.scan_finished, scanner.account_id, regions, scanner.incomplete,
+            metrics,
+        )
+        self.snapshot = snapshot
+        if self.metrics_file:
+            write_metrics(self.metrics_file, metrics)
+        print(f"[{snapshot.finished:%Y-%m-%d %H:%M:%S}] Scan of {len(regions)} regions finished in "
+              f"{(snapshot.finished - started).total_seconds():.0f}s: {pipeline.count} findings, "
+              f"${pipeline.total_cost:,.2f}/month")
+        return snapshot
+
+    def start(self):
+        """Start answering HTTP requests on a background thread; returns the bound (host, port)"""
+        from http.server import ThreadingHTTPServer
+        self._server = ThreadingHTTPServer((self.host, self.port), _results_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[:2]
+
+    def run(self):
+        """Serve and scan on schedule until stop() or Ctrl-C"""
+        host, port = self.start()
+        print(f"Serving results on http://{host}:{port}/ (scanning every {self.interval}s, Ctrl-C to stop)\n")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.scan()
+                except Exception as e:
+                    logger.warning(f"Scheduled scan failed, keeping the previous results: {e}")
+                self.next_scan = datetime.now() + timedelta(seconds=self.interval)
+                self._stop.wait(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _results_handler(service):
+    """HTTP request handler class for a WasteFinderService (http.server is imported only when serving)"""
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlsplit
+
+    class ResultsHandler(BaseHTTPRequestHandler):
+        server_version = f"WasteFinder/{__version__}"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            filters = {
+                name: {value.strip() for values in query.get(name, ()) for value in values.split(',') if value.strip()}
+                for name in ScanSnapshot.FILTERS
+            }
+            snapshot = service.snapshot
+            if url.path not in ('/findings', '/summary', '/health', '/metrics'):
+                return self._send(404, {'error': f"unknown path {url.path}"})
+            if snapshot is None:
+                return self._send(503, {'error': 'no scan has finished yet'})
+            if url.path == '/metrics':
+                return self._send(200, snapshot.metrics, 'text/plain; version=0.0.4; charset=utf-8')
+            if url.path == '/findings':
+                return self._send(200, snapshot.findings_json(**filters))
+            if url.path == '/summary':
+                summary = snapshot.summary(**filters)
+                summary['next_scan'] = service.next_scan.isoformat() if service.next_scan else None
+                return self._send(200, summary)
+            return self._send(200, {'status': 'ok', 'generated': snapshot.finished.isoformat()})
+
+        def _send(self, status, body, content_type='application/json'):
+            data = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return ResultsHandler
+
+
+def _scan_account(account_id, options):
+    """Scan one account's regions (process pool worker): findings, API stats rows, incomplete regions, task times"""
+    session_factory = None
+    if account_id != options['caller_account']:
+        session_factory = assume_role_session_factory(account_id, options['role_name'])
+    cache = InventoryCache(**options['cache']) if options['cache'] else None
+    stats = ApiStats() if options.get('stats') else None
+    prices = PriceList(options['prices']) if options.get('prices') else None
+    deadline_at = options.get('scan_deadline_at')
+    journal = ScanJournal(**options['journal']) if options.get('journal') else None
+    scanner = AWSWasteFinder(
+        max_workers=options['max_workers'],
+        session_factory=session_factory,
+        service_limits=options['service_limits'],
+        engine=options['engine'],
+        cache=cache,
+        stats=stats,
+        prices=prices,
+        regions=options['regions'],
+        exclude_regions=options['exclude_regions'],
+        probe=options['probe'],
+        scanners=options.get('scanners'),
+        region_timeout=options.get('region_timeout'),
+        scan_deadline=None if deadline_at is None else max(0.0, deadline_at - time.time()),
+        journal=journal,
+    )
+    if options.get('backend'):
+        # The aggregator is queried with the caller's own credentials, not the assumed role
+        clients = scanner.clients if session_factory is None else scanner.client_pool()
+        scanner.backend = ConfigInventoryBackend(**options['backend'], clients=clients)
+    scanner.account_id = account_id
+    try:
+        regions = scanner.probe_regions(scanner.get_all_regions())
+        findings = scanner.scan_regions(regions, progress=False).findings
+        return {
+            'findings': findings,
+            'stats': stats.snapshot() if stats else None,
+            'incomplete': scanner.incomplete,
+            'durations': scanner.task_durations,
+            'failed': scanner.failed_units,
+        }
+    finally:
+        if cache is not None:
+            cache.close()
+        if prices is not None:
+            prices.close()
+        if journal is not None:
+            journal.close()
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _region_list(value):
+    regions = [region.strip() for region in value.split(',') if region.strip()]
+    if not regions:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of regions")
+    return regions
+
+
+def _scanner_list(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of scanners")
+    unknown = [name for name in names if name not in SCANNERS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scanner {', '.join(unknown)}; expected {', '.join(SCANNERS)}")
+    return names
+
+
+def print_scanners(out=None):
+    """Print the registered scanners with what each one calls and needs"""
+    out = out or sys.stdout
+    out.write(f"{'SCANNER':<16}{'SERVICES':<20}{'CALLS/RESOURCE':<16}{'METRICS':<9}PERMISSIONS\n")
+    for spec in SCANNERS.values():
+        out.write(f"{spec.name:<16}{','.join(spec.services):<20}{spec.cost:<16g}{'yes' if spec.metrics else 'no':<9}"
+                  f"{','.join(spec.permissions)}\n")
+
+
+def _service_limit(value):
+    service, _, limit = value.partition('=')
+    if not service or not limit:
+        raise argparse.ArgumentTypeError(f"expected SERVICE=N, got {value}")
+    return service, _positive_int(limit)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Scan all AWS regions for unused resources that cost money.'
+    )
+    parser.add_argument('--version', action='version', version=f"%(prog)s {__version__}")
+    parser.add_argument(
+        '--workers', type=_positive_int, default=AWSWasteFinder.DEFAULT_WORKERS,
+        help=f"total concurrent (region, scanner) tasks (default: {AWSWasteFinder.DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        '--service-limit', type=_service_limit, action='append', default=[], metavar='SERVICE=N',
+        help='starting number of concurrent API calls to SERVICE per region (repeatable, e.g. ec2=6)'
+    )
+    parser.add_argument(
+        '--engine', choices=AWSWasteFinder.ENGINES, default='threads',
+        help='scan engine: worker threads, or asyncio coroutines on aiobotocore clients (default: threads)'
+    )
+    parser.add_argument(
+        '--regions', type=_region_list, metavar='REGION[,REGION...]',
+        help='scan only these regions (default: every region enabled for the account)'
+    )
+    parser.add_argument(
+        '--exclude-regions', type=_region_list, default=[], metavar='REGION[,REGION...]',
+        help='skip these regions'
+    )
+    parser.add_argument(
+        '--only', type=_scanner_list, metavar='SCANNER[,SCANNER...]',
+        help=f"run only these scanners: {', '.join(SCANNERS)} (default: all)"
+    )
+    parser.add_argument(
+        '--skip', type=_scanner_list, default=[], metavar='SCANNER[,SCANNER...]',
+        help='do not run these scanners'
+    )
+    parser.add_argument(
+        '--list-scanners', action='store_true',
+        help='list the available scanners with their services, cost and IAM permissions, and exit'
+    )
+    parser.add_argument(
+        '--region-timeout', type=_positive_int, metavar='SECONDS',
+        help="give up on a region's unfinished scanners SECONDS after its scan starts and report it incomplete"
+    )
+    parser.add_argument(
+        '--scan-deadline', type=_positive_int, metavar='SECONDS',
+        help='stop the scan after SECONDS and report the findings so far; unfinished regions are marked incomplete'
+    )
+    parser.add_argument(
+        '--no-probe', action='store_true',
+        help='scan every region instead of skipping regions Resource Explorer reports as empty'
+    )
+    parser.add_argument(
+        '--backend', choices=('describe', 'config'), default='describe',
+        help='inventory source: per-region Describe calls, or an AWS Config aggregator where it can answer '
+             '(volumes, Elastic IPs, RDS) with Describe calls for the rest (default: describe)'
+    )
+    parser.add_argument(
+        '--config-aggregator', metavar='NAME',
+        help='AWS Config aggregator for --backend config (default: the first one in --config-region)'
+    )
+    parser.add_argument(
+        '--config-region', metavar='REGION',
+        help='region holding the AWS Config aggregator (default: your default AWS region)'
+    )
+    parser.add_argument(
+        '--jsonl', metavar='PATH',
+        help='stream each finding to PATH as one JSON line as soon as it is found'
+    )
+    parser.add_argument(
+        '--summary-only', action='store_true',
+        help='keep only running totals in memory and print a per-type summary; writes no report files (use with --jsonl)'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='do not read or write the local inventory cache (~/.cache/wastefinder)'
+    )
+    parser.add_argument(
+        '--refresh', action='store_true',
+        help='ignore cached inventory and re-fetch everything (the cache is still updated)'
+    )
+    parser.add_argument(
+        '--max-age', type=int, metavar='SECONDS',
+        help='reuse cached inventory up to SECONDS old instead of the per-API defaults'
+    )
+    parser.add_argument(
+        '--resume', metavar='RUN_ID',
+        help='continue an interrupted run: reuse its finished (account, region, scanner) units and scan the rest'
+    )
+    parser.add_argument(
+        '--no-checkpoint', action='store_true',
+        help='do not journal finished units to ~/.cache/wastefinder/runs (the run cannot be resumed)'
+    )
+    parser.add_argument(
+        '--serve', action='store_true',
+        help='stay resident: scan every --interval seconds and serve the latest results over HTTP'
+    )
+    parser.add_argument(
+        '--interval', type=_positive_int, default=3600, metavar='SECONDS',
+        help='seconds between scans with --serve (default: 3600)'
+    )
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='address the --serve HTTP API listens on (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port', type=int, default=8080,
+        help='port the --serve HTTP API listens on (default: 8080)'
+    )
+    parser.add_argument(
+        '--accounts-file', metavar='PATH',
+        help='scan every account ID listed in PATH (one per line) via --role-name'
+    )
+    parser.add_argument(
+        '--org-accounts', action='store_true',
+        help='scan every active account in the AWS Organization (organizations:ListAccounts)'
+    )
+    parser.add_argument(
+        '--role-name', default='OrganizationAccountAccessRole',
+        help='role to assume in each account for multi-account scans (default: OrganizationAccountAccessRole)'
+    )
+    parser.add_argument(
+        '--account-processes', type=_positive_int, default=4,
+        help='accounts scanned in parallel, one process each (default: 4)'
+    )
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='print AWS API call statistics (calls, latency percentiles, retries, throttles) after the scan'
+    )
+    parser.add_argument(
+        '--stats-json', metavar='PATH',
+        help='write AWS API call statistics by service, operation, region and scanner to PATH as JSON'
+    )
+    parser.add_argument(
+        '--metrics-file', metavar='PATH',
+        help='write scan timings, API call counters and waste totals to PATH in Prometheus text format '
+             '(e.g. for the node_exporter textfile collector)'
+    )
+    parser.add_argument(
+        '--format', dest='formats', action='append', choices=sorted(REPORT_FORMATS), metavar='FORMAT',
+        help=f"report file format, repeatable: {', '.join(REPORT_FORMATS)} (default: text)"
+    )
+    parser.add_argument(
+        '--baseline', metavar='REPORT',
+        help='print only what changed since a previous JSON or NDJSON report: new, resolved and cost-changed findings'
+    )
+    parser.add_argument(
+        '--price-db', metavar='PATH',
+        help='compiled price list for regional prices (default: ~/.cache/wastefinder/prices.sqlite, used if present)'
+    )
+    parser.add_argument(
+        '--ingest-prices', action='append', default=[], metavar='OFFER_FILE',
+        help='compile an AWS Price List bulk offer file (JSON or CSV) into --price-db and exit (repeatable)'
+    )
+    args = parser.parse_args(argv)
+    
+    if args.list_scanners:
+        print_scanners()
+        return
+    try:
+        scanners = select_scanners(args.only, args.skip)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.resume and args.no_checkpoint:
+        parser.error("--resume cannot be combined with --no-checkpoint")
+    if args.engine == 'asyncio':
+        import importlib.util
+        if importlib.util.find_spec('aiobotocore') is None:
+            parser.error("--engine asyncio needs aiobotocore (pip install aiobotocore)")
+    if args.summary_only and args.formats:
+        parser.error("--summary-only keeps no findings to write report files from; use --jsonl instead of --format")
+    if args.serve and (args.accounts_file or args.org_accounts or args.resume or args.baseline
+                       or args.stats or args.stats_json or args.formats or args.jsonl or args.summary_only):
+        parser.error("--serve scans the current account on a schedule; it cannot be combined with "
+                     "--accounts-file, --org-accounts, --resume, --baseline, --stats, --stats-json, "
+                     "--format, --jsonl or --summary-only")
+    
+    prices = PriceList(args.price_db)
+    if args.ingest_prices:
+        try:
+            for path in args.ingest_prices:
+                print(f"{path}: {prices.ingest(path)} prices")
+            print(f"Price list compiled to: {prices.path}")
+        finally:
+            prices.close()
+        return
+    if not prices.exists():
+        prices = None
+    
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = BaselineDiff(args.baseline)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"cannot read baseline {args.baseline}: {e}")
+    
+    stats = ApiStats() if args.stats or args.stats_json or args.serve or args.metrics_file else None
+    journal = None
+    if args.resume:
+        try:
+            journal = ScanJournal(args.resume, resume=True)
+        except (ValueError, FileNotFoundError) as e:
+            parser.error(str(e))
+    elif not args.no_checkpoint and not args.serve:
+        journal = ScanJournal()
+    cache = None if args.no_cache else InventoryCache(max_age=args.max_age, refresh=args.refresh)
+    scanner = AWSWasteFinder(
+        max_workers=args.workers,
+        service_limits=dict(args.service_limit),
+        engine=args.engine,
+        cache=cache,
+        stats=stats,
+        prices=prices,
+        report_formats=args.formats or ['text'],
+        regions=args.regions,
+        exclude_regions=args.exclude_regions,
+        probe=not args.no_probe,
+        scanners=scanners,
+        region_timeout=args.region_timeout,
+        scan_deadline=args.scan_deadline,
+        journal=journal,
+        baseline=baseline,
+    )
+    if args.backend == 'config':
+        # Config calls share the scanner's clients, so they are rate limited and counted like the rest
+        scanner.backend = ConfigInventoryBackend(args.config_aggregator, clients=scanner.clients,
+                                                 region=args.config_region)
+    try:
+        if args.serve:
+            scanner.print_banner()
+            WasteFinderService(scanner, args.interval, args.host, args.port, args.metrics_file).run()
+        elif args.accounts_file or args.org_accounts:
+            account_ids = read_account_ids(args.accounts_file) if args.accounts_file else []
+            if args.org_accounts:
+                account_ids.extend(list_organization_accounts())
+            scanner.run_accounts(
+                account_ids, args.role_name, processes=args.account_processes,
+                jsonl_path=args.jsonl, keep_findings=not args.summary_only,
+            )
+        else:
+            scanner.run(jsonl_path=args.jsonl, keep_findings=not args.summary_only)
+        if args.stats:
+            stats.print_summary()
+        if args.stats_json:
+            stats.write_json(args.stats_json)
+            print(f"API call statistics saved to: {args.stats_json}")
+        if args.metrics_file and not args.serve:
+            write_metrics(args.metrics_file, scanner.metrics())
+            print(f"Metrics saved to: {args.metrics_file}")
+    finally:
+        if cache is not None:
+            cache.close()
+        if prices is not None:
+            prices.close()
+        if journal is not None:
+            journal.close()
+
 
 if __name__ == "__main__":
-    scanner = AWSWasteFinder()
-    scanner.run()
\ No newline at end of file
+    main()
\ No newline at end of file